@@ -31,6 +31,8 @@ DEFAULT_BENCHMARK_WARMUP = 1
 DEFAULT_BENCHMARK_MARKDOWN = "docs-src/benchmark.md"
 DEFAULT_BENCHMARK_SAMPLE_SIZE = 1000
 DEFAULT_BENCHMARK_WORKERS = 1
+DEFAULT_BENCHMARK_PROFILES = ("safe",)
+DEFAULT_BENCHMARK_CODECS = ("msgpack",)
 
 
 @dataclass(frozen=True)
@@ -42,6 +44,8 @@ class BenchmarkSettings:
     markdown: str
     sample_size: int
     workers: int
+    profiles: tuple[str, ...] = DEFAULT_BENCHMARK_PROFILES
+    codecs: tuple[str, ...] = DEFAULT_BENCHMARK_CODECS
 
 
 @dataclass(frozen=True)
@@ -60,6 +64,8 @@ class BenchmarkCaseSpec:
     repeats: int
     warmup: int
     sample_size: int
+    profile: str = "safe"
+    codec: str = "msgpack"
 
 
 @dataclass(frozen=True)
@@ -76,6 +82,9 @@ class BenchmarkCaseResult:
     median_ms: float
     min_ms: float
     max_ms: float
+    profile: str = "safe"
+    codec: str = "msgpack"
+    disk_bytes: int | None = None
 
 
 def benchmark_environment() -> BenchmarkEnvironment:
@@ -307,8 +316,20 @@ def run_tinydb_operation(
     return units
 
 
-def populate_shelfdb(path: Path, documents: list[dict[str, Any]]) -> None:
-    with DB(str(path)) as db:
+def disk_usage_bytes(path: Path) -> int:
+    """Return the bytes allocated on disk for a file or directory tree."""
+    paths = [path] if path.is_file() else [p for p in path.rglob("*") if p.is_file()]
+    return sum(p.stat().st_blocks * 512 for p in paths)
+
+
+def populate_shelfdb(
+    path: Path,
+    documents: list[dict[str, Any]],
+    profile: str = "safe",
+    codec: str = "msgpack",
+) -> None:
+    with DB(str(path), profile=profile) as db:
+        db.set_codec(BENCHMARK_SHELF, codec)
         with db.transaction(write=True) as tx:
             tx.shelf(BENCHMARK_SHELF).put_many(
                 [Item(doc["id"], doc) for doc in documents]
@@ -320,11 +341,13 @@ def run_shelfdb_operation(
     documents: list[dict[str, Any]],
     sample_ids: list[str],
     db_path: Path,
+    profile: str = "safe",
+    codec: str = "msgpack",
 ) -> int:
     category, tenant, active = benchmark_query_filters()
     docs_by_id = {doc["id"]: doc for doc in documents}
 
-    with DB(str(db_path)) as db:
+    with DB(str(db_path), profile=profile) as db:
         if operation == "point_lookup":
             with db.transaction(write=False) as tx:
                 shelf = tx.shelf(BENCHMARK_SHELF)
@@ -358,6 +381,7 @@ def run_shelfdb_operation(
                     shelf.key(item_id).delete()
             units = len(sample_ids)
         elif operation == "bulk_insert":
+            db.set_codec(BENCHMARK_SHELF, codec)
             with db.transaction(write=True) as tx:
                 tx.shelf(BENCHMARK_SHELF).put_many(
                     [Item(doc["id"], doc) for doc in documents]
@@ -374,13 +398,17 @@ def run_backend_operation(
     documents: list[dict[str, Any]],
     sample_ids: list[str],
     db_path: Path,
+    profile: str = "safe",
+    codec: str = "msgpack",
 ) -> int:
     if backend == "sqlite":
         return run_sqlite_operation(operation, documents, sample_ids, db_path)
     if backend == "tinydb":
         return run_tinydb_operation(operation, documents, sample_ids, db_path)
     if backend == "shelfdb":
-        return run_shelfdb_operation(operation, documents, sample_ids, db_path)
+        return run_shelfdb_operation(
+            operation, documents, sample_ids, db_path, profile, codec
+        )
     raise ValueError(f"Unsupported backend: {backend}")
 
 
@@ -389,6 +417,8 @@ def prepare_backend_database(
     operation: str,
     db_path: Path,
     documents: list[dict[str, Any]],
+    profile: str = "safe",
+    codec: str = "msgpack",
 ) -> None:
     if backend == "sqlite":
         if operation == "bulk_insert":
@@ -402,7 +432,7 @@ def prepare_backend_database(
         return
     if backend == "shelfdb":
         if operation != "bulk_insert":
-            populate_shelfdb(db_path, documents)
+            populate_shelfdb(db_path, documents, profile, codec)
         return
     raise ValueError(f"Unsupported backend: {backend}")
 
@@ -415,9 +445,12 @@ def benchmark_operation(
     sample_ids: list[str],
     repeats: int,
     warmup: int,
+    profile: str = "safe",
+    codec: str = "msgpack",
 ) -> BenchmarkCaseResult:
     runs_ms: list[float] = []
     units = 0
+    disk_bytes = None
     db_name = "benchmark.json" if backend == "tinydb" else "benchmark.db"
 
     for _ in range(warmup):
@@ -425,20 +458,27 @@ def benchmark_operation(
             prefix=f"bench-{backend}-{operation}-"
         ) as tmpdir:
             db_path = Path(tmpdir) / db_name
-            prepare_backend_database(backend, operation, db_path, documents)
-            run_backend_operation(backend, operation, documents, sample_ids, db_path)
+            prepare_backend_database(
+                backend, operation, db_path, documents, profile, codec
+            )
+            run_backend_operation(
+                backend, operation, documents, sample_ids, db_path, profile, codec
+            )
 
     for _ in range(repeats):
         with tempfile.TemporaryDirectory(
             prefix=f"bench-{backend}-{operation}-"
         ) as tmpdir:
             db_path = Path(tmpdir) / db_name
-            prepare_backend_database(backend, operation, db_path, documents)
+            prepare_backend_database(
+                backend, operation, db_path, documents, profile, codec
+            )
             start = time.perf_counter()
             units = run_backend_operation(
-                backend, operation, documents, sample_ids, db_path
+                backend, operation, documents, sample_ids, db_path, profile, codec
             )
             runs_ms.append(round((time.perf_counter() - start) * 1000, 3))
+            disk_bytes = disk_usage_bytes(db_path)
 
     return BenchmarkCaseResult(
         backend=backend,
@@ -453,6 +493,9 @@ def benchmark_operation(
         median_ms=round(statistics.median(runs_ms), 3),
         min_ms=round(min(runs_ms), 3),
         max_ms=round(max(runs_ms), 3),
+        profile=profile,
+        codec=codec,
+        disk_bytes=disk_bytes,
     )
 
 
@@ -467,15 +510,51 @@ def run_benchmark_case(spec: BenchmarkCaseSpec) -> BenchmarkCaseResult:
         sample_ids=sample_ids,
         repeats=spec.repeats,
         warmup=spec.warmup,
+        profile=spec.profile,
+        codec=spec.codec,
     )
 
 
+def benchmark_variants(settings: BenchmarkSettings) -> list[tuple[str, str, str]]:
+    """Return ``(backend, profile, codec)`` triples; only ShelfDB varies."""
+    return [
+        (backend, profile, codec)
+        for backend in settings.backends
+        for profile in (
+            settings.profiles if backend == "shelfdb" else DEFAULT_BENCHMARK_PROFILES
+        )
+        for codec in (
+            settings.codecs if backend == "shelfdb" else DEFAULT_BENCHMARK_CODECS
+        )
+    ]
+
+
+def benchmark_variant_label(backend: str, profile: str, codec: str = "msgpack") -> str:
+    options = [
+        option
+        for option, default in ((profile, "safe"), (codec, "msgpack"))
+        if option != default
+    ]
+    if backend != "shelfdb" or not options:
+        return backend
+    return f"{backend} ({', '.join(options)})"
+
+
 def render_metric(result: BenchmarkCaseResult | None) -> str:
     if result is None:
         return "-"
     return f"{result.average_ms:.3f} ms"
 
 
+def render_disk_size(by_operation: dict[str, BenchmarkCaseResult]) -> str:
+    """Render the database size after loading every document."""
+    for operation in ("bulk_insert", "point_lookup"):
+        result = by_operation.get(operation)
+        if result is not None and result.disk_bytes is not None:
+            return f"{result.disk_bytes / (1024 * 1024):.2f} MiB"
+    return "-"
+
+
 def render_benchmark_markdown(
     *,
     settings: BenchmarkSettings,
@@ -505,6 +584,8 @@ def render_benchmark_markdown(
         f"- Sizes: {', '.join(str(size) for size in settings.sizes)}",
         f"- Runs: {settings.warmup} warmup + {settings.repeats} measured repetitions per case",
         f"- Workers: {settings.workers}",
+        f"- ShelfDB profiles: {', '.join(settings.profiles)}",
+        f"- ShelfDB value codecs: {', '.join(settings.codecs)}",
         "- Isolation: fresh temporary database per backend, size, operation, and repetition",
         "- Query filter: category='books' AND meta.tenant='acme' AND active=true",
         f"- Batch sample size for lookup/update/delete: up to {settings.sample_size} ids",
@@ -512,7 +593,7 @@ def render_benchmark_markdown(
         "",
         "## Results",
         "",
-        "Average time across measured runs is shown for each operation.",
+        "Average time across measured runs is shown for each operation. Size on disk is the space allocated for the database after loading every document.",
         "",
     ]
 
@@ -536,24 +617,28 @@ def render_benchmark_markdown(
             [
                 f"### Size {size}",
                 "",
-                "| Backend | Bulk insert | Point lookup | Filtered query | Update by id | Delete by id |",
-                "| --- | --- | --- | --- | --- | --- |",
+                "| Backend | Bulk insert | Point lookup | Filtered query | Update by id | Delete by id | Size on disk |",
+                "| --- | --- | --- | --- | --- | --- | --- |",
             ]
         )
-        for backend in settings.backends:
+        for backend, profile, codec in benchmark_variants(settings):
             by_operation = {
                 result.operation: result
                 for result in results
-                if result.backend == backend and result.size == size
+                if result.backend == backend
+                and result.profile == profile
+                and result.codec == codec
+                and result.size == size
             }
             lines.append(
                 "| "
                 + " | ".join(
-                    [backend]
+                    [benchmark_variant_label(backend, profile, codec)]
                     + [
                         render_metric(by_operation.get(operation))
                         for operation in operations
                     ]
+                    + [render_disk_size(by_operation)]
                 )
                 + " |"
             )
@@ -602,8 +687,20 @@ def write_text_file(path: Path, content: str) -> None:
 
 
 @app.command
-def benchmark() -> None:
-    """Run the project benchmark and update docs-src/benchmark.md."""
+def benchmark(
+    profiles: tuple[str, ...] = DEFAULT_BENCHMARK_PROFILES,
+    codecs: tuple[str, ...] = DEFAULT_BENCHMARK_CODECS,
+) -> None:
+    """Run the project benchmark and update docs-src/benchmark.md.
+
+    Parameters
+    ----------
+    profiles
+        ShelfDB durability profiles to benchmark, for example safe, fast-commit,
+        bulk and random-read.
+    codecs
+        ShelfDB value codecs to benchmark: msgpack, zlib and lzma.
+    """
     backends = DEFAULT_BENCHMARK_BACKENDS
     sizes = DEFAULT_BENCHMARK_SIZES
     repeats = DEFAULT_BENCHMARK_REPEATS
@@ -620,6 +717,8 @@ def benchmark() -> None:
         markdown=markdown,
         sample_size=sample_size,
         workers=workers,
+        profiles=profiles,
+        codecs=codecs,
     )
     operations = (
         "bulk_insert",
@@ -637,22 +736,26 @@ def benchmark() -> None:
             repeats=repeats,
             warmup=warmup,
             sample_size=sample_size,
+            profile=profile,
+            codec=codec,
         )
         for size in sizes
-        for backend in backends
+        for backend, profile, codec in benchmark_variants(settings)
         for operation in operations
     ]
 
     results: list[BenchmarkCaseResult] = []
     case_order = {
-        (case.backend, case.operation, case.size): index
+        (case.backend, case.profile, case.codec, case.operation, case.size): index
         for index, case in enumerate(cases)
     }
 
     if workers == 1:
         for case in cases:
             print(
-                f"Benchmarking backend={case.backend} operation={case.operation} size={case.size}"
+                f"Benchmarking backend={case.backend} profile={case.profile}"
+                f" codec={case.codec}"
+                f" operation={case.operation} size={case.size}"
             )
             results.append(run_benchmark_case(case))
     else:
@@ -665,12 +768,18 @@ def benchmark() -> None:
                 result = future.result()
                 print(
                     "Completed"
-                    f" backend={case.backend} operation={case.operation} size={case.size}"
+                    f" backend={case.backend} profile={case.profile}"
+                    f" codec={case.codec}"
+                    f" operation={case.operation} size={case.size}"
                     f" average={result.average_ms:.3f}ms"
                 )
                 results.append(result)
 
-    results.sort(key=lambda item: case_order[(item.backend, item.operation, item.size)])
+    results.sort(
+        key=lambda item: case_order[
+            (item.backend, item.profile, item.codec, item.operation, item.size)
+        ]
+    )
 
     root = repo_root()
     markdown_path = root / markdown
@@ -11,6 +11,7 @@ from cyclopts import App
 
 from shelfdb.protocol import serve, serve_unix
 from shelfdb.shelf import DB
+from shelfdb.shelf.shelf.spill import DEFAULT_SORT_BUFFER
 from shelfdb.target import parse_target, parse_tcp_location, parse_unix_location
 
 app = App("shelfdb")
@@ -44,7 +45,9 @@ def install_ai_skill(destination: Path) -> Path:
     return destination
 
 
-def prompt_ai_skill_install_path(default_path: str = DEFAULT_AI_SKILL_INSTALL_PATH) -> Path:
+def prompt_ai_skill_install_path(
+    default_path: str = DEFAULT_AI_SKILL_INSTALL_PATH,
+) -> Path:
     response = input(f"Install ShelfDB AI skill to [{default_path}]: ").strip()
     return Path(response or default_path)
 
@@ -53,11 +56,17 @@ async def run_server(
     *,
     db_path: str,
     url: str = "tcp://127.0.0.1:31337",
+    max_map_size: int | None = None,
+    profile: str = "safe",
+    sort_buffer: int | None = DEFAULT_SORT_BUFFER,
 ) -> None:
     scheme, location = parse_target(url)
     socket_path = None
 
-    with DB(db_path) as db:
+    with DB(
+        db_path, max_map_size=max_map_size, profile=profile, sort_buffer=sort_buffer
+    ) as db:
+        db.open_shelves()
         if scheme == "tcp":
             host, port = parse_tcp_location(location)
             server = await serve(db, host=host, port=port)
@@ -79,9 +88,28 @@ async def run_server(
 async def server(
     db_path: str = "db",
     url: str = "tcp://127.0.0.1:31337",
+    max_map_size: int | None = None,
+    profile: str = "safe",
+    sort_buffer: int | None = DEFAULT_SORT_BUFFER,
 ) -> None:
-    """Run the ShelfDB protocol server."""
-    await run_server(db_path=db_path, url=url)
+    """Run the ShelfDB protocol server.
+
+    Parameters
+    ----------
+    max_map_size
+        Grow the LMDB memory map up to this many bytes when it fills up.
+    profile
+        Durability profile: safe, fast-commit, bulk or random-read.
+    sort_buffer
+        Items a sort holds in memory before spilling sorted runs to disk.
+    """
+    await run_server(
+        db_path=db_path,
+        url=url,
+        max_map_size=max_map_size,
+        profile=profile,
+        sort_buffer=sort_buffer,
+    )
 
 
 @app.command(name="ai-skill-install")
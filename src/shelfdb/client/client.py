@@ -8,7 +8,7 @@ from typing import Any
 
 from shelfdb.protocol import read_response, write_request
 from shelfdb.protocol.query_result import denormalize_query_result
-from shelfdb.shelf import Item
+from shelfdb.shelf import Change, Expr, Item, Key
 from shelfdb.target import parse_target, parse_tcp_location, parse_unix_location
 
 
@@ -43,15 +43,18 @@ class Client:
         await write_request(self._writer, command)
         return await read_response(self._reader)
 
-    async def begin(self, mode: str) -> dict[str, Any]:
-        return await self._result({"cmd": "begin", "mode": mode})
+    async def begin(self, mode: str, *, buffers: bool = False) -> dict[str, Any]:
+        command: dict[str, Any] = {"cmd": "begin", "mode": mode}
+        if buffers:
+            command["buffers"] = True
+        return await self._result(command)
 
-    async def put(self, shelf: str, key: str, value: Any) -> dict[str, Any]:
+    async def put(self, shelf: str, key: Key, value: Any) -> dict[str, Any]:
         return await self._result(
             {"cmd": "put", "shelf": shelf, "key": key, "value": value}
         )
 
-    async def get(self, shelf: str, key: str) -> dict[str, Any]:
+    async def get(self, shelf: str, key: Key) -> dict[str, Any]:
         return await self._result({"cmd": "get", "shelf": shelf, "key": key})
 
     async def commit(self) -> dict[str, Any]:
@@ -60,13 +63,27 @@ class Client:
     async def rollback(self) -> dict[str, Any]:
         return await self._result({"cmd": "rollback"})
 
+    async def watch(self, since: int = 0, *, limit: int | None = None) -> list[Change]:
+        command: dict[str, Any] = {"cmd": "watch", "since": since}
+        if limit is not None:
+            command["limit"] = limit
+        return denormalize_query_result(await self._result(command))
+
+    async def truncate_changes(self, before: int) -> int:
+        return await self._result({"cmd": "truncate_changes", "before": before})
+
     def query(self, shelf: str) -> RemoteShelfQuery:
         return RemoteShelfQuery(self, shelf)
 
-    def transaction(self, *, write: bool = False) -> ClientTransaction:
-        return ClientTransaction(self, write=write)
+    def transaction(
+        self,
+        *,
+        write: bool = False,
+        buffers: bool = False,
+    ) -> ClientTransaction:
+        return ClientTransaction(self, write=write, buffers=buffers)
 
-    async def _result(self, command: dict[str, Any]) -> dict[str, Any]:
+    async def _result(self, command: dict[str, Any]) -> Any:
         response = await self.send(command)
         if not response.get("ok"):
             raise ClientError(response.get("error", "unknown client error"))
@@ -76,13 +93,23 @@ class Client:
 class ClientTransaction:
     """Async context wrapper around one client transaction."""
 
-    def __init__(self, client: Client, *, write: bool = False):
+    def __init__(
+        self,
+        client: Client,
+        *,
+        write: bool = False,
+        buffers: bool = False,
+    ):
         self._client = client
         self._write = write
+        self._buffers = buffers
         self._active = False
 
     async def __aenter__(self) -> ClientTransaction:
-        await self._client.begin("write" if self._write else "read")
+        await self._client.begin(
+            "write" if self._write else "read",
+            buffers=self._buffers,
+        )
         self._active = True
         return self
 
@@ -100,10 +127,10 @@ class ClientTransaction:
         with suppress(Exception):
             await self.rollback()
 
-    async def put(self, shelf: str, key: str, value: Any) -> dict[str, Any]:
+    async def put(self, shelf: str, key: Key, value: Any) -> dict[str, Any]:
         return await self._client.put(shelf, key, value)
 
-    async def get(self, shelf: str, key: str) -> dict[str, Any]:
+    async def get(self, shelf: str, key: Key) -> dict[str, Any]:
         return await self._client.get(shelf, key)
 
     async def commit(self) -> dict[str, Any]:
@@ -173,21 +200,35 @@ class RemoteShelfQuery:
     def desc(self) -> RemoteShelfQuery:
         return self._new("desc")
 
-    def key(self, key: str) -> RemoteShelfQuery:
+    def key(self, key: Key) -> RemoteShelfQuery:
         return self._new("key", key)
 
-    def keys_range(self, start: str, stop: str | None = None) -> RemoteShelfQuery:
+    def keys_range(self, start: Key, stop: Key | None = None) -> RemoteShelfQuery:
         return self._new("keys_range", start, stop)
 
+    def prefix(self, *prefixes: str | bytes | tuple[Any, ...]) -> RemoteShelfQuery:
+        return self._new("prefix", *prefixes)
+
+    def index(self, name: str, *, covered: bool = False) -> RemoteIndexSelector:
+        return RemoteIndexSelector(self._new("index", name, covered=covered))
+
     def keys(self) -> RemoteShelfQuery:
         return self._new("keys")
 
-    def items(self) -> RemoteShelfQuery:
-        return self._new("items")
+    def items(self, *, fields: list[str] | None = None) -> RemoteShelfQuery:
+        if fields is None:
+            return self._new("items")
+        return self._new("items", fields=list(fields))
 
     def filter(self, fn) -> RemoteShelfQuery:
+        if isinstance(fn, Expr):
+            # Expressions travel as plain data instead of pickled code.
+            return self._new("filter", fn.to_wire())
         return self._new("filter", fn)
 
+    def filter_keys(self, fn) -> RemoteShelfQuery:
+        return self._new("filter_keys", fn)
+
     def slice(
         self,
         start: int | None = None,
@@ -196,18 +237,36 @@ class RemoteShelfQuery:
     ) -> RemoteShelfQuery:
         return self._new("slice", start, stop, step)
 
-    def sort(self, key=None, reverse: bool = False) -> RemoteShelfQuery:
-        return self._new("sort", key, reverse=reverse)
+    def sort(
+        self,
+        key=None,
+        reverse: bool = False,
+        *,
+        by: str | tuple[str, ...] | None = None,
+        buffer: int | None = None,
+    ) -> RemoteShelfQuery:
+        kwargs: dict[str, Any] = {"reverse": reverse}
+        if by is not None:
+            kwargs["by"] = by
+        if buffer is not None:
+            kwargs["buffer"] = buffer
+        return self._new("sort", key, **kwargs)
 
     async def query(self) -> Any:
         action = self._action or {"op": "query", "args": [], "kwargs": {}}
         return await self._execute(action)
 
-    def put(self, key: str, value: Any) -> RemoteShelfQuery:
+    def put(self, key: Key, value: Any) -> RemoteShelfQuery:
         return self._with_action("put", key, value)
 
-    def put_many(self, items: list[Item]) -> RemoteShelfQuery:
-        return self._with_action("put_many", items)
+    def put_many(
+        self,
+        items: list[Item],
+        *,
+        bulk: bool = False,
+        results: bool = True,
+    ) -> RemoteShelfQuery:
+        return self._with_action("put_many", items, bulk=bulk, results=results)
 
     def count(self) -> RemoteShelfQuery:
         return self._with_action("count")
@@ -218,8 +277,85 @@ class RemoteShelfQuery:
     def item(self) -> RemoteShelfQuery:
         return self._with_action("item")
 
-    def update(self, fn) -> RemoteShelfQuery:
-        return self._with_action("update", fn)
+    def explain(self) -> RemoteShelfQuery:
+        return self._with_action("explain")
+
+    def page(self, size: int, after: str | None = None) -> RemoteShelfQuery:
+        return self._with_action("page", size, after=after)
+
+    def aggregate(self, **fields: Any) -> RemoteShelfQuery:
+        return self._with_action("aggregate", **fields)
+
+    def group_by(self, key) -> RemoteGroupBy:
+        self._ensure_no_action()
+        return RemoteGroupBy(self, key)
+
+    def update(
+        self,
+        fn,
+        *,
+        results: bool = True,
+        chunk_size: int | None = None,
+        after: Key | None = None,
+        max_chunks: int | None = None,
+    ) -> RemoteShelfQuery:
+        if chunk_size is None:
+            return self._with_action("update", fn, results=results)
+        return self._with_action(
+            "update", fn, **_chunk_options(chunk_size, after, max_chunks)
+        )
+
+    def delete(
+        self,
+        *,
+        results: bool = True,
+        chunk_size: int | None = None,
+        after: Key | None = None,
+        max_chunks: int | None = None,
+    ) -> RemoteShelfQuery:
+        if chunk_size is None:
+            return self._with_action("delete", results=results)
+        return self._with_action(
+            "delete", **_chunk_options(chunk_size, after, max_chunks)
+        )
+
+
+def _chunk_options(
+    chunk_size: int, after: Key | None, max_chunks: int | None
+) -> dict[str, Any]:
+    options: dict[str, Any] = {"chunk_size": chunk_size}
+    if after is not None:
+        options["after"] = after
+    if max_chunks is not None:
+        options["max_chunks"] = max_chunks
+    return options
+
+
+class RemoteIndexSelector:
+    """Remote counterpart of `IndexSelector`, returned by `RemoteShelfQuery.index()`."""
+
+    def __init__(self, query: RemoteShelfQuery):
+        self._query = query
+
+    def eq(self, value: Any) -> RemoteShelfQuery:
+        return self._query._new("eq", value)
+
+    def range(
+        self,
+        start: Any = None,
+        stop: Any = None,
+        *,
+        prefix: tuple[Any, ...] = (),
+    ) -> RemoteShelfQuery:
+        return self._query._new("range", start, stop, prefix=list(prefix))
+
+
+class RemoteGroupBy:
+    """Remote counterpart of `GroupBy`, returned by `RemoteShelfQuery.group_by()`."""
+
+    def __init__(self, query: RemoteShelfQuery, key):
+        self._query = query
+        self._key = key
 
-    def delete(self) -> RemoteShelfQuery:
-        return self._with_action("delete")
+    def agg(self, **fields: Any) -> RemoteShelfQuery:
+        return self._query._with_action("group_by", self._key, **fields)
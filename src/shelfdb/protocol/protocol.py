@@ -7,7 +7,8 @@ from asyncio import StreamReader
 from typing import Any, Final, Protocol
 
 import dill
-import msgpack
+
+from shelfdb.shelf.shelf.codec import packb, unpackb
 
 _FRAME_HEADER: Final = struct.Struct(">I")
 MAX_FRAME_SIZE: Final = 1024 * 1024
@@ -37,13 +38,13 @@ def decode_request(data: bytes) -> Any:
 
 
 def encode_response(obj: Any) -> bytes:
-    """Serialize a server->client response with MessagePack."""
-    return msgpack.packb(obj, use_bin_type=True)
+    """Serialize a server->client response with the shelf MessagePack codec."""
+    return packb(obj)
 
 
 def decode_response(data: bytes) -> Any:
-    """Deserialize a server->client response with MessagePack."""
-    return msgpack.unpackb(data, raw=False)
+    """Deserialize a server->client response with the shelf MessagePack codec."""
+    return unpackb(data)
 
 
 async def read_payload(reader: StreamReader) -> bytes:
@@ -4,7 +4,16 @@ from __future__ import annotations
 
 from typing import Any
 
-from shelfdb.shelf import UNDEF, Item, MutationResult
+from shelfdb.shelf import (
+    UNDEF,
+    Change,
+    ChunkProgress,
+    Group,
+    Item,
+    MutationResult,
+    MutationSummary,
+    Page,
+)
 
 _TYPE_KEY = "__shelfdb_type__"
 
@@ -24,6 +33,41 @@ def normalize_query_result(result: Any) -> Any:
             "key": result.key,
             "ok": result.ok,
         }
+    if isinstance(result, MutationSummary):
+        return {
+            _TYPE_KEY: "summary",
+            "total": result.total,
+            "ok": result.ok,
+        }
+    if isinstance(result, Page):
+        return {
+            _TYPE_KEY: "page",
+            "items": normalize_query_result(result.items),
+            "token": result.token,
+        }
+    if isinstance(result, Group):
+        return {
+            _TYPE_KEY: "group",
+            "key": result.key,
+            "aggregates": normalize_query_result(result.aggregates),
+        }
+    if isinstance(result, ChunkProgress):
+        return {
+            _TYPE_KEY: "progress",
+            "chunks": result.chunks,
+            "total": result.total,
+            "ok": result.ok,
+            "last_key": result.last_key,
+            "done": result.done,
+        }
+    if isinstance(result, Change):
+        return {
+            _TYPE_KEY: "change",
+            "seq": result.seq,
+            "shelf": result.shelf,
+            "key": result.key,
+            "op": result.op,
+        }
     if isinstance(result, tuple):
         return [normalize_query_result(value) for value in result]
     if isinstance(result, list):
@@ -46,4 +90,20 @@ def denormalize_query_result(result: Any) -> Any:
         return Item(result["key"], denormalize_query_result(result["value"]))
     if marker == "mutation":
         return MutationResult(result["key"], result["ok"])
+    if marker == "summary":
+        return MutationSummary(result["total"], result["ok"])
+    if marker == "page":
+        return Page(denormalize_query_result(result["items"]), result["token"])
+    if marker == "group":
+        return Group(result["key"], denormalize_query_result(result["aggregates"]))
+    if marker == "progress":
+        return ChunkProgress(
+            result["chunks"],
+            result["total"],
+            result["ok"],
+            result["last_key"],
+            result["done"],
+        )
+    if marker == "change":
+        return Change(result["seq"], result["shelf"], result["key"], result["op"])
     return {key: denormalize_query_result(value) for key, value in result.items()}
@@ -33,7 +33,12 @@ async def handle_client(
                 break
 
             try:
-                response = session.handle(command)
+                if session.is_chunked(command):
+                    # A long chunked job must not stall the event loop, so
+                    # other clients keep being served while it runs.
+                    response = await asyncio.to_thread(session.handle, command)
+                else:
+                    response = session.handle(command)
             except Exception as exc:
                 response = {"ok": False, "error": str(exc)}
 
@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
 from typing import Any
 
-from shelfdb.shelf.db import Transaction
+from shelfdb.shelf.db import Transaction, is_map_full_error
 from shelfdb.shelf import DB, Item, MutationResult
+from shelfdb.shelf.shelf.expr import from_wire
 
 from .query_result import normalize_query_result
 
@@ -29,13 +31,46 @@ def _normalize_result(result: Any) -> Any:
     return result
 
 
+type _Operation = Callable[[], dict[str, Any]]
+
+# Change records one ``watch`` command answers with at most.
+_WATCH_LIMIT = 1000
+
+
+def _is_chunked(action: Any) -> bool:
+    # Malformed actions are left to the query path, which reports them.
+    kwargs = action.get("kwargs") if isinstance(action, dict) else None
+    return isinstance(kwargs, dict) and "chunk_size" in kwargs
+
+
+def _watch_limit(limit: Any) -> int:
+    if limit is None:
+        return _WATCH_LIMIT
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+        raise ValueError("watch limit must be a non-negative integer")
+    return min(limit, _WATCH_LIMIT)
+
+
 class Session:
-    """Handle simple protocol commands against one current transaction."""
+    """Handle simple protocol commands against one current transaction.
+
+    Write transactions keep a journal of their successful operations. When a
+    write hits a full memory map, the session aborts, grows the map, replays
+    the journal in a fresh transaction, and answers with a ``retry`` entry
+    instead of an error.
+
+    Query ``update`` and ``delete`` actions with a ``chunk_size`` run outside
+    any session transaction, committing one write transaction per chunk.
+
+    ``watch`` reads one batch of the change log in its own read transaction,
+    and ``truncate_changes`` runs outside any session transaction.
+    """
 
     def __init__(self, db: DB):
         self._db = db
         self._tx: Transaction | None = None
         self._mode: str | None = None
+        self._journal: list[_Operation] = []
 
     @property
     def active(self) -> bool:
@@ -54,17 +89,46 @@ class Session:
         if name == "begin":
             if self.active:
                 return _error("transaction already active")
-            return self._begin(command.get("mode"))
+            return self._begin(
+                command.get("mode"),
+                buffers=bool(command.get("buffers", False)),
+            )
 
         if name == "query":
+            if _is_chunked(command.get("action")):
+                if self.active:
+                    return _error("chunked mutations run outside a transaction")
+                try:
+                    return self._chunked_query(
+                        shelf=command["shelf"],
+                        ops=command.get("ops", []),
+                        action=command["action"],
+                    )
+                except Exception as exc:
+                    return _error(str(exc))
             if not self.active:
                 return _error("no active transaction")
-            try:
-                return self._query(
+            return self._run(
+                lambda: self._query(
                     shelf=command["shelf"],
                     ops=command.get("ops", []),
                     action=command["action"],
                 )
+            )
+
+        if name == "watch":
+            try:
+                limit = _watch_limit(command.get("limit"))
+                changes = list(self._db.watch(command.get("since", 0), limit=limit))
+            except Exception as exc:
+                return _error(str(exc))
+            return _ok(normalize_query_result(changes))
+
+        if name == "truncate_changes":
+            if self.active:
+                return _error("truncate_changes runs outside a transaction")
+            try:
+                return _ok(self._db.truncate_changes(command["before"]))
             except Exception as exc:
                 return _error(str(exc))
 
@@ -80,31 +144,93 @@ class Session:
         if name == "rollback":
             return self._rollback()
 
-        try:
-            if name == "put":
-                return self._put(
+        if name == "put":
+            return self._run(
+                lambda: self._put(
                     shelf=command["shelf"],
                     key=command["key"],
                     value=command["value"],
                 )
-            return self._get(shelf=command["shelf"], key=command["key"])
-        except Exception as exc:
-            return _error(str(exc))
+            )
+        return self._run(lambda: self._get(shelf=command["shelf"], key=command["key"]))
+
+    def is_chunked(self, command: Any) -> bool:
+        """Return whether ``command`` is a chunked mutation to run.
+
+        Chunked mutations commit a write transaction per chunk outside the
+        session transaction, so the server runs them in a worker thread.
+        """
+        return (
+            isinstance(command, dict)
+            and command.get("cmd") == "query"
+            and not self.active
+            and "chunk_size" in command.get("action", {}).get("kwargs", {})
+        )
 
     def close(self) -> None:
         tx = self._tx
         if tx is not None:
-            tx.tx.abort()
+            tx.abort()
             self._clear_transaction()
 
-    def _begin(self, mode: str | None) -> dict[str, Any]:
+    def _begin(self, mode: str | None, *, buffers: bool = False) -> dict[str, Any]:
         if mode not in {"read", "write"}:
             return _error("unsupported transaction mode")
+        if buffers and mode != "read":
+            return _error("buffers require a read transaction")
 
-        self._tx = self._db.transaction(write=mode == "write")
+        self._tx = self._db.transaction(write=mode == "write", buffers=buffers)
         self._mode = mode
         return _ok({"mode": mode})
 
+    def _run(self, operation: _Operation) -> dict[str, Any]:
+        try:
+            response = operation()
+        except Exception as exc:
+            if self._mode == "write" and is_map_full_error(exc):
+                return self._retry_after_resize(operation)
+            return _error(str(exc))
+        if self._mode == "write":
+            self._journal.append(operation)
+        return response
+
+    def _retry_after_resize(self, operation: _Operation | None) -> dict[str, Any]:
+        """Grow the map, then replay the journal plus ``operation``.
+
+        Growth does not wait for other sessions' transactions, which can not
+        end while this command holds the event loop.
+        """
+        self._require_tx().abort()
+        while True:
+            try:
+                map_size = self._db.grow_map_size()
+            except RuntimeError as exc:
+                self._clear_transaction()
+                return _error(str(exc))
+            if map_size is None:
+                break
+            self._tx = self._db.transaction(write=True)
+            try:
+                for journaled in self._journal:
+                    journaled()
+                if operation is None:
+                    self._require_tx().commit()
+                    self._clear_transaction()
+                    return _ok({"committed": True, "retry": {"map_size": map_size}})
+                response = operation()
+            except Exception as exc:
+                self._require_tx().abort()
+                if is_map_full_error(exc):
+                    continue
+                self._clear_transaction()
+                return _error(f"transaction replay failed: {exc}")
+            self._journal.append(operation)
+            response["retry"] = {"map_size": map_size}
+            return response
+
+        self._clear_transaction()
+        return _error("database map is full")
+
     def _put(self, *, shelf: str, key: str, value: Any) -> dict[str, Any]:
         result = self._require_tx().shelf(shelf).put(key, value)
         return _ok(_normalize_result(result))
@@ -116,14 +242,21 @@ class Session:
     def _commit(self) -> dict[str, Any]:
         tx = self._require_tx()
         if tx.is_write:
-            tx.commit()
+            try:
+                tx.commit()
+            except Exception as exc:
+                if is_map_full_error(exc):
+                    return self._retry_after_resize(None)
+                tx.abort()
+                self._clear_transaction()
+                return _error(str(exc))
         else:
-            tx.tx.abort()
+            tx.abort()
         self._clear_transaction()
         return _ok({"committed": True})
 
     def _rollback(self) -> dict[str, Any]:
-        self._require_tx().tx.abort()
+        self._require_tx().abort()
         self._clear_transaction()
         return _ok({"rolled_back": True})
 
@@ -135,6 +268,27 @@ class Session:
         result = self._apply_query_action(query, action)
         return _ok(normalize_query_result(result))
 
+    def _chunked_query(
+        self, *, shelf: str, ops: list[dict[str, Any]], action: dict[str, Any]
+    ) -> dict[str, Any]:
+        def select(query: Any) -> Any:
+            for op in ops:
+                query = self._apply_query_operation(query, op)
+            return query
+
+        name = action["op"]
+        kwargs = dict(action.get("kwargs", {}))
+        # Chunked runs always answer with `ChunkProgress` totals.
+        kwargs.pop("results", None)
+        if name == "delete":
+            result = self._db.delete_chunked(shelf, select, **kwargs)
+        elif name == "update":
+            (fn,) = action.get("args", [])
+            result = self._db.update_chunked(shelf, fn, select, **kwargs)
+        else:
+            raise ValueError(f"query action does not support chunk_size: {name}")
+        return _ok(normalize_query_result(result))
+
     def _apply_query_operation(self, query: Any, op: dict[str, Any]) -> Any:
         name = op["op"]
         if name not in {
@@ -142,23 +296,38 @@ class Session:
             "desc",
             "key",
             "keys_range",
+            "prefix",
+            "index",
+            "eq",
+            "range",
             "keys",
             "items",
             "filter",
+            "filter_keys",
             "slice",
             "sort",
         }:
             raise ValueError(f"unsupported query operation: {name}")
-        return getattr(query, name)(*op.get("args", []), **op.get("kwargs", {}))
+        args = op.get("args", [])
+        if name == "filter" and args and isinstance(args[0], list):
+            # Field expressions arrive as plain data and compile here.
+            args = [from_wire(args[0])]
+        return getattr(query, name)(*args, **op.get("kwargs", {}))
 
     def _apply_query_action(self, query: Any, action: dict[str, Any]) -> Any:
         name = action["op"]
         if name == "query":
             return list(query)
+        if name == "group_by":
+            (key,) = action.get("args", [])
+            return query.group_by(key).agg(**action.get("kwargs", {}))
         if name not in {
+            "aggregate",
             "count",
             "exists",
+            "explain",
             "item",
+            "page",
             "put",
             "put_many",
             "update",
@@ -170,6 +339,7 @@ class Session:
     def _clear_transaction(self) -> None:
         self._tx = None
         self._mode = None
+        self._journal = []
 
     def _require_tx(self) -> Transaction:
         tx = self._tx
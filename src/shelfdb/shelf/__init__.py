@@ -1,4 +1,31 @@
 from .db import DB
-from .shelf import UNDEF, Item, MutationResult, ShelfQuery
+from .shelf import (
+    UNDEF,
+    Change,
+    ChunkProgress,
+    Expr,
+    F,
+    Group,
+    Item,
+    Key,
+    MutationResult,
+    MutationSummary,
+    Page,
+    ShelfQuery,
+)
 
-__all__ = ["DB", "UNDEF", "Item", "MutationResult", "ShelfQuery"]
+__all__ = [
+    "DB",
+    "UNDEF",
+    "Change",
+    "ChunkProgress",
+    "Expr",
+    "F",
+    "Group",
+    "Item",
+    "Key",
+    "MutationResult",
+    "MutationSummary",
+    "Page",
+    "ShelfQuery",
+]
@@ -3,17 +3,122 @@
 # lib: built-in
 from __future__ import annotations
 
-from typing import Any
+import threading
+import time
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
+from itertools import islice
+from typing import Any, NamedTuple
 
 # lib: external
 import lmdb
 
 # lib: local
+from .shelf.changes import ChangeLog, ShelfChanges, read_changes, truncate_changes
+from .shelf.codec import MSGPACK, Codec, get_codec, packb, unpack_value, unpackb
+from .shelf.columns import ColumnCache
+from .shelf.index import Index, field_getter, index_db_name
 from .shelf.query import ShelfQuery
+from .shelf.schema import Change, ChunkProgress, Item, Key, MutationResult
 from .shelf.shelf import ShelfCursor, ShelfStore
+from .shelf.spill import DEFAULT_SORT_BUFFER
 
 LmdbEnvironment = Any
 LmdbTransaction = Any
+LmdbDatabase = Any
+
+# Named database holding index specs, keyed by packed ``(shelf, name)``.
+_INDEX_META_DB = b"__shelfdb_indexes__"
+# Named database holding value codec names, keyed by shelf name.
+_CODEC_META_DB = b"__shelfdb_codecs__"
+# Named database holding the names of shelves that record changes.
+_CHANGES_META_DB = b"__shelfdb_change_shelves__"
+# Named database holding the change log, keyed by sequence number.
+_CHANGES_DB = b"__shelfdb_changes__"
+# Change records read per read transaction by `DB.watch()`.
+_WATCH_BATCH = 1000
+# Seconds a failed transaction waits for others to end before growing the map.
+_MAP_GROWTH_WAIT = 5.0
+_INTERNAL_PREFIX = "__shelfdb"
+
+
+class Profile(NamedTuple):
+    """Durability and throughput settings applied when opening a database.
+
+    Attributes
+    ----------
+    sync : bool
+        Flush buffers to disk on every commit.
+    metasync : bool
+        Flush the meta page on every commit. Disabling it keeps the database
+        consistent but may lose the last committed transaction on a crash.
+    writemap : bool
+        Write through a writable memory map instead of ``write()`` calls.
+    map_async : bool
+        With ``writemap``, flush the map asynchronously instead of on commit.
+    readahead : bool
+        Let the OS read ahead on page faults. Disable it for random reads on
+        databases larger than RAM.
+    sync_interval : float | None
+        Seconds between explicit ``env.sync()`` calls after commits, or
+        ``None`` to rely on per-commit flushing alone.
+    """
+
+    sync: bool = True
+    metasync: bool = True
+    writemap: bool = False
+    map_async: bool = False
+    readahead: bool = True
+    sync_interval: float | None = None
+
+
+PROFILES: dict[str, Profile] = {
+    "safe": Profile(),
+    "fast-commit": Profile(metasync=False),
+    "bulk": Profile(writemap=True, map_async=True, sync_interval=1.0),
+    "random-read": Profile(readahead=False),
+}
+
+
+def _make_index(
+    name: str,
+    db: LmdbDatabase,
+    spec: dict[str, Any],
+    key: Callable[[Any], Any] | None = None,
+) -> Index:
+    # Stored specs only describe field indexes; key indexes pass ``key``.
+    if key is not None:
+        return Index(name, db, key, include=tuple(spec["include"]))
+    field = spec["field"]
+    fields = (field,) if isinstance(field, str) else tuple(field)
+    return Index(
+        name,
+        db,
+        field_getter(field),
+        fields=fields,
+        include=tuple(spec["include"]),
+    )
+
+
+def is_map_full_error(exc: BaseException) -> bool:
+    """Return ``True`` when ``exc`` was caused by a full LMDB memory map.
+
+    Parameters
+    ----------
+    exc : BaseException
+        Exception raised by a write or commit.
+
+    Returns
+    -------
+    bool
+        ``True`` for ``lmdb.MapFullError`` and for errors chained from it,
+        such as the ``RuntimeError`` raised on transaction commit failure.
+    """
+    current: BaseException | None = exc
+    while current is not None:
+        if isinstance(current, lmdb.MapFullError):  # type: ignore[attr-defined]
+            return True
+        current = current.__cause__
+    return False
 
 
 class DB:
@@ -27,11 +132,37 @@ class DB:
         Maximum size of the memory map in bytes, by default 1 GiB.
     max_dbs : int, optional
         Maximum number of named databases in the environment, by default 128.
+    max_map_size : int | None, optional
+        Ceiling for automatic memory map growth in bytes. When greater than
+        ``map_size``, a full map is grown geometrically up to this ceiling
+        instead of failing every later write. By default ``None``, which
+        disables growth.
+    map_growth : float, optional
+        Factor applied to the current map size on each growth step, by
+        default 2.0.
+    profile : str, optional
+        Name of a `Profile` in ``PROFILES``, by default ``"safe"``.
+    sort_buffer : int | None, optional
+        Items a `sort()` holds in memory before it spills sorted runs to
+        temporary files and merges them, by default ``DEFAULT_SORT_BUFFER``.
+        ``None`` always sorts in memory.
 
     Notes
     -----
     This class supports context manager usage.
 
+    Growing the map calls ``lmdb.Environment.set_mapsize``, which LMDB only
+    allows while no other transaction in this process is active. The database
+    counts the transactions begun by `transaction()`; `grow_map_size()` holds
+    back new ones and waits for the active ones to end, and fails instead of
+    resizing under them.
+
+    Named database handles are cached per shelf name once they are known to
+    outlive a transaction: after `open_shelves()` or after the write
+    transaction that first opened them commits. Handles opened by read
+    transactions are closed by LMDB when the transaction ends, so they are
+    not cached.
+
     Examples
     --------
     >>> with DB("/tmp/mydb") as db:
@@ -45,9 +176,47 @@ class DB:
         *,
         map_size: int = 1024 * 1024 * 1024,
         max_dbs: int = 128,
+        max_map_size: int | None = None,
+        map_growth: float = 2.0,
+        profile: str = "safe",
+        sort_buffer: int | None = DEFAULT_SORT_BUFFER,
     ) -> None:
+        if map_growth <= 1:
+            raise ValueError("map_growth must be greater than 1")
+        if profile not in PROFILES:
+            raise ValueError(f"unknown database profile: {profile}")
+        if sort_buffer is not None and sort_buffer < 1:
+            raise ValueError("sort_buffer must be positive")
+        self._sort_buffer = sort_buffer
         self._path = path
-        self.lmdb_env = lmdb.open(path, map_size=map_size, max_dbs=max_dbs)
+        self._max_map_size = map_size if max_map_size is None else max_map_size
+        self._map_growth = map_growth
+        self._profile = PROFILES[profile]
+        self._last_sync = time.monotonic()
+        # Transactions begun by `transaction()` and not yet ended, guarded by
+        # a condition that `grow_map_size()` waits on.
+        self._active = 0
+        self._resizing = False
+        self._txn_state = threading.Condition()
+        self._shelf_dbs: dict[str, LmdbDatabase] = {}
+        self._indexes: dict[str, dict[str, Index]] = {}
+        self._codecs: dict[str, Codec] = {}
+        self._columns: dict[str, ColumnCache] = {}
+        self._tracked: frozenset[str] = frozenset()
+        self._changes_db: LmdbDatabase | None = None
+        self.lmdb_env = lmdb.open(
+            path,
+            map_size=map_size,
+            max_dbs=max_dbs,
+            sync=self._profile.sync,
+            metasync=self._profile.metasync,
+            writemap=self._profile.writemap,
+            map_async=self._profile.map_async,
+            readahead=self._profile.readahead,
+        )
+        self._load_field_indexes()
+        self._load_codecs()
+        self._load_change_tracking()
 
     @property
     def path(self) -> str:
@@ -60,24 +229,603 @@ class DB:
         """
         return self._path
 
-    def transaction(self, *, write: bool = True) -> Transaction:
+    @property
+    def profile(self) -> Profile:
+        """Return the durability profile this database was opened with.
+
+        Returns
+        -------
+        Profile
+            Settings applied to the LMDB environment.
+        """
+        return self._profile
+
+    @property
+    def map_size(self) -> int:
+        """Return the current memory map size.
+
+        Returns
+        -------
+        int
+            Current LMDB memory map size in bytes.
+        """
+        return self.lmdb_env.info()["map_size"]
+
+    def grow_map_size(self, *, timeout: float = 0.0) -> int | None:
+        """Grow the memory map by one geometric step, up to the ceiling.
+
+        LMDB can only resize the map while no transaction is active, so new
+        transactions wait until growth ends, and growth first waits for the
+        active ones to end. Callers must end their own transaction first.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for active transactions to end, by default 0.0.
+
+        Returns
+        -------
+        int | None
+            New memory map size in bytes, or ``None`` when the map is already
+            at ``max_map_size``.
+
+        Raises
+        ------
+        RuntimeError
+            If transactions are still active after ``timeout`` seconds.
+        """
+        with self._txn_state:
+            self._resizing = True
+            try:
+                if not self._txn_state.wait_for(lambda: not self._active, timeout):
+                    raise RuntimeError(
+                        "cannot grow the memory map while other transactions are active"
+                    )
+                current = self.map_size
+                if current >= self._max_map_size:
+                    return None
+                new_size = min(int(current * self._map_growth), self._max_map_size)
+                self.lmdb_env.set_mapsize(new_size)
+                return new_size
+            finally:
+                self._resizing = False
+                self._txn_state.notify_all()
+
+    def run_transaction(
+        self,
+        fn: Callable[[Transaction], Any],
+        *,
+        write: bool = True,
+    ) -> Any:
+        """Run ``fn`` in a transaction, retrying after map growth.
+
+        Parameters
+        ----------
+        fn : Callable[[Transaction], Any]
+            Transaction body. It may be called more than once, so it should
+            not have side effects outside the transaction.
+        write : bool, optional
+            Whether to run a writable transaction, by default ``True``.
+
+        Returns
+        -------
+        Any
+            Value returned by ``fn`` from the committed attempt.
+
+        Raises
+        ------
+        lmdb.MapFullError | RuntimeError
+            If the map is full and already at ``max_map_size``, or other
+            transactions stay open for five seconds while the map must grow.
+        """
+        while True:
+            map_size = self.map_size
+            try:
+                with self.transaction(write=write) as tx:
+                    return fn(tx)
+            except Exception as exc:
+                if not is_map_full_error(exc):
+                    raise
+                if self.map_size != map_size:
+                    continue
+                # Growth on exit does not wait for other transactions. This
+                # call has none open now, so it can wait for them here.
+                try:
+                    grown = self.grow_map_size(timeout=_MAP_GROWTH_WAIT)
+                except RuntimeError as growth_error:
+                    raise growth_error from exc
+                if grown is None:
+                    raise
+
+    def delete_chunked(
+        self,
+        shelf: str,
+        select: Callable[[ShelfQuery], ShelfQuery] | None = None,
+        *,
+        chunk_size: int = 10_000,
+        after: Key | None = None,
+        max_chunks: int | None = None,
+        progress: Callable[[ChunkProgress], None] | None = None,
+    ) -> ChunkProgress:
+        """Delete selected items in chunks, one write transaction per chunk.
+
+        Each chunk deletes up to ``chunk_size`` items and commits, so the
+        writer lock is released between chunks and no transaction grows
+        without bound. The next chunk resumes after the last deleted key.
+
+        Parameters
+        ----------
+        shelf : str
+            Shelf name.
+        select : Callable[[ShelfQuery], ShelfQuery] | None, optional
+            Builds the selection from the shelf query of each chunk
+            transaction, such as ``lambda q: q.keys_range("a", "m")``. By
+            default ``None``, which selects the whole shelf. The selection
+            may use key selectors, ``asc()`` / ``desc()``, ``keys()``,
+            ``items()`` and ``filter()``.
+        chunk_size : int, optional
+            Items mutated per transaction, by default 10,000.
+        after : Key | None, optional
+            Resume after this key, as reported by `ChunkProgress.last_key`.
+        max_chunks : int | None, optional
+            Stop after this many chunks, even if items remain.
+        progress : Callable[[ChunkProgress], None] | None, optional
+            Called with the running totals after every committed chunk.
+
+        Returns
+        -------
+        ChunkProgress
+            Totals of this run. ``done`` is ``False`` when ``max_chunks``
+            stopped it early.
+
+        Raises
+        ------
+        ValueError
+            If ``chunk_size`` is not positive, or the selection scans an index
+            or uses ``slice()`` or ``sort()``.
+        """
+        return self._run_chunked(
+            shelf,
+            select,
+            lambda query: query._delete_mutations(ordered=True),
+            chunk_size=chunk_size,
+            after=after,
+            max_chunks=max_chunks,
+            progress=progress,
+        )
+
+    def update_chunked(
+        self,
+        shelf: str,
+        fn: Callable[[Item], Any],
+        select: Callable[[ShelfQuery], ShelfQuery] | None = None,
+        *,
+        chunk_size: int = 10_000,
+        after: Key | None = None,
+        max_chunks: int | None = None,
+        progress: Callable[[ChunkProgress], None] | None = None,
+    ) -> ChunkProgress:
+        """Update selected items using ``fn`` in chunks, like `delete_chunked()`.
+
+        Parameters
+        ----------
+        shelf : str
+            Shelf name.
+        fn : Callable[[Item], Any]
+            Returns the new value for a selected item.
+        select, chunk_size, after, max_chunks, progress
+            As for `delete_chunked()`.
+
+        Returns
+        -------
+        ChunkProgress
+            Totals of this run.
+
+        Raises
+        ------
+        ValueError
+            As for `delete_chunked()`.
+        """
+        return self._run_chunked(
+            shelf,
+            select,
+            lambda query: query._update_mutations(fn, ordered=True),
+            chunk_size=chunk_size,
+            after=after,
+            max_chunks=max_chunks,
+            progress=progress,
+        )
+
+    def _run_chunked(
+        self,
+        shelf: str,
+        select: Callable[[ShelfQuery], ShelfQuery] | None,
+        mutate: Callable[[ShelfQuery], Generator[MutationResult, None, None]],
+        *,
+        chunk_size: int,
+        after: Key | None,
+        max_chunks: int | None,
+        progress: Callable[[ChunkProgress], None] | None,
+    ) -> ChunkProgress:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+
+        def run_chunk(tx: Transaction) -> list[MutationResult]:
+            query = tx.shelf(shelf)
+            if select is not None:
+                query = select(query)
+            # Chunks resume after the last key, so mutate() plans for key
+            # order rather than picking a range index scan.
+            mutations = mutate(query._resume_after(state.last_key))
+            try:
+                return list(islice(mutations, chunk_size))
+            finally:
+                # Close the scan cursor before the transaction commits.
+                mutations.close()
+
+        state = ChunkProgress(chunks=0, total=0, ok=0, last_key=after, done=False)
+        while not state.done and (max_chunks is None or state.chunks < max_chunks):
+            chunk = self.run_transaction(run_chunk)
+            state = ChunkProgress(
+                chunks=state.chunks + 1,
+                total=state.total + len(chunk),
+                ok=state.ok + sum(mutation.ok for mutation in chunk),
+                last_key=chunk[-1].key if chunk else state.last_key,
+                done=len(chunk) < chunk_size,
+            )
+            if progress is not None:
+                progress(state)
+        return state
+
+    def open_shelves(self, names: Iterable[str] | None = None) -> None:
+        """Open and cache named database handles ahead of time.
+
+        Call this at startup, before any transaction is active, so that
+        ``tx.shelf(name)`` skips ``open_db`` for every later transaction.
+
+        Parameters
+        ----------
+        names : Iterable[str] | None, optional
+            Shelf names to open, creating missing shelves. By default
+            ``None``, which opens every shelf that already exists.
+        """
+        if names is None:
+            with self.lmdb_env.begin() as tx:
+                names = [
+                    key.decode()
+                    for key in tx.cursor().iternext(values=False)
+                    if not key.startswith(_INTERNAL_PREFIX.encode())
+                ]
+        self._cache_shelf_dbs(
+            {name: self.lmdb_env.open_db(name.encode()) for name in names}
+        )
+
+    def create_index(
+        self,
+        shelf: str,
+        name: str,
+        *,
+        field: str | Sequence[str] | None = None,
+        key: Callable[[Any], Any] | None = None,
+        include: Sequence[str] = (),
+        rebuild: bool = False,
+    ) -> None:
+        """Declare a secondary index and backfill it from existing items.
+
+        Index entries are then kept up to date by every write made through
+        this database. Call this at startup, before any transaction is active,
+        like `open_shelves()`.
+
+        Field indexes are recorded in the database and loaded again when it is
+        reopened. Indexes built from a ``key`` callable cannot be stored, so
+        declare them again on every `DB` that writes the shelf.
+
+        Parameters
+        ----------
+        shelf : str
+            Shelf name.
+        name : str
+            Index name, unique per shelf.
+        field : str | Sequence[str] | None, optional
+            Dotted path of the indexed value field, such as ``"meta.tenant"``,
+            or a sequence of paths for a composite index over their tuple.
+        key : Callable[[Any], Any] | None, optional
+            Function returning the indexed value for a shelf value.
+        include : Sequence[str], optional
+            Dotted field paths to store in every index entry. Covered queries
+            then read these fields without loading shelf values.
+        rebuild : bool, optional
+            Rebuild entries even if the index already exists with the same
+            definition, by default ``False``. Use it after changing a ``key``
+            callable.
+
+        Raises
+        ------
+        ValueError
+            If not exactly one of ``field`` and ``key`` is given.
+        """
+        if (field is None) == (key is None):
+            raise ValueError("create_index requires exactly one of field or key")
+        if field is not None and not isinstance(field, str):
+            field = list(field)
+        spec = {
+            "field": field,
+            "key": None if key is None else getattr(key, "__qualname__", ""),
+            "include": list(include),
+        }
+        with self.lmdb_env.begin(write=True) as txn:
+            meta_db = self.lmdb_env.open_db(_INDEX_META_DB, txn=txn)
+            shelf_db = self.lmdb_env.open_db(shelf.encode(), txn=txn)
+            index_db = self.lmdb_env.open_db(
+                index_db_name(shelf, name).encode(), txn=txn
+            )
+            index = _make_index(name, index_db, spec, key)
+            meta_key = packb((shelf, name))
+            stored = txn.get(meta_key, db=meta_db)
+            if rebuild or stored is None or unpackb(stored) != spec:
+                txn.drop(index_db, delete=False)
+                store = ShelfStore(txn, shelf_db, indexes={name: index})
+                for item_key, value in txn.cursor(db=shelf_db).iternext():
+                    store.add_index_entries(item_key, unpack_value(value))
+                txn.put(meta_key, packb(spec), db=meta_db)
+        self._cache_shelf_dbs({shelf: shelf_db})
+        self._register_index(shelf, index)
+
+    def _load_field_indexes(self) -> None:
+        with self.lmdb_env.begin() as txn:
+            if txn.get(_INDEX_META_DB) is None:
+                return
+        meta_db = self.lmdb_env.open_db(_INDEX_META_DB)
+        with self.lmdb_env.begin(db=meta_db) as txn:
+            specs = [(unpackb(k), unpackb(v)) for k, v in txn.cursor().iternext()]
+        for (shelf, name), spec in specs:
+            if spec["field"] is not None:
+                index_db = self.lmdb_env.open_db(index_db_name(shelf, name).encode())
+                self._register_index(shelf, _make_index(name, index_db, spec))
+
+    def set_codec(self, shelf: str, codec: str) -> None:
+        """Choose the value codec used for later writes to ``shelf``.
+
+        The choice is recorded in the database and loaded again when it is
+        reopened. Stored values are not rewritten; every value records its
+        codec, so values written with any codec stay readable.
+
+        Parameters
+        ----------
+        shelf : str
+            Shelf name.
+        codec : str
+            ``"msgpack"`` (uncompressed), ``"zlib"`` or ``"lzma"``.
+
+        Raises
+        ------
+        ValueError
+            If ``codec`` is not a known codec name.
+        """
+        value_codec = get_codec(codec)
+        with self.lmdb_env.begin(write=True) as txn:
+            meta_db = self.lmdb_env.open_db(_CODEC_META_DB, txn=txn)
+            txn.put(shelf.encode(), codec.encode(), db=meta_db)
+        self._codecs = {**self._codecs, shelf: value_codec}
+
+    def track_changes(self, shelf: str, *, enabled: bool = True) -> None:
+        """Record every later write to ``shelf`` in the change log.
+
+        Each put or delete appends a `Change(seq, shelf, key, op)` record in
+        the same transaction as the write, read back with `watch()`. The
+        choice is recorded in the database and loaded again when it is
+        reopened. Call this at startup, before any transaction is active,
+        like `create_index()`.
+
+        Parameters
+        ----------
+        shelf : str
+            Shelf name.
+        enabled : bool, optional
+            ``False`` stops recording writes to ``shelf``, by default
+            ``True``. Records already in the log are kept.
+        """
+        with self.lmdb_env.begin(write=True) as txn:
+            meta_db = self.lmdb_env.open_db(_CHANGES_META_DB, txn=txn)
+            changes_db = self.lmdb_env.open_db(_CHANGES_DB, txn=txn)
+            if enabled:
+                txn.put(shelf.encode(), b"", db=meta_db)
+            else:
+                txn.delete(shelf.encode(), db=meta_db)
+        self._changes_db = changes_db
+        if enabled:
+            self._tracked = self._tracked | {shelf}
+        else:
+            self._tracked = self._tracked - {shelf}
+
+    def _load_change_tracking(self) -> None:
+        with self.lmdb_env.begin() as txn:
+            if txn.get(_CHANGES_META_DB) is None:
+                return
+        meta_db = self.lmdb_env.open_db(_CHANGES_META_DB)
+        self._changes_db = self.lmdb_env.open_db(_CHANGES_DB)
+        with self.lmdb_env.begin(db=meta_db) as txn:
+            self._tracked = frozenset(
+                shelf.decode() for shelf in txn.cursor().iternext(values=False)
+            )
+
+    def watch(
+        self,
+        since: int = 0,
+        *,
+        limit: int | None = None,
+        poll: float | None = None,
+    ) -> Iterator[Change]:
+        """Yield the change log records numbered after ``since``, oldest first.
+
+        Records are read in batches, each in its own short read transaction,
+        so a slow consumer does not hold a snapshot open. Pass the ``seq`` of
+        the last record handled as ``since`` to resume.
+
+        Parameters
+        ----------
+        since : int, optional
+            Sequence number to start after, by default 0 for the whole log.
+        limit : int | None, optional
+            Maximum number of records to yield, by default no limit.
+        poll : float | None, optional
+            Once the log is read to its end, wait this many seconds and read
+            again instead of stopping, by default ``None``.
+
+        Returns
+        -------
+        Iterator[Change]
+            Change records in sequence order.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            batch = self._read_changes(
+                since,
+                _WATCH_BATCH if remaining is None else min(remaining, _WATCH_BATCH),
+            )
+            yield from batch
+            if batch:
+                since = batch[-1].seq
+                if remaining is not None:
+                    remaining -= len(batch)
+            if len(batch) < _WATCH_BATCH:
+                if poll is None:
+                    return
+                if not batch:
+                    time.sleep(poll)
+
+    def _read_changes(self, since: int, limit: int) -> list[Change]:
+        if self._changes_db is None:
+            return []
+        with self.transaction(write=False) as tx:
+            return read_changes(tx.tx, self._changes_db, since, limit)
+
+    def truncate_changes(self, before: int) -> int:
+        """Delete the change log records numbered below ``before``.
+
+        Sequence numbers keep increasing after truncation, even when every
+        record is deleted.
+
+        Returns
+        -------
+        int
+            Number of deleted records.
+        """
+        if self._changes_db is None:
+            return 0
+        with self.transaction(write=True) as tx:
+            return truncate_changes(tx.tx, self._changes_db, before)
+
+    def cache_columns(self, shelf: str, fields: Sequence[str]) -> None:
+        """Keep the value fields ``fields`` of ``shelf`` in a NumPy column cache.
+
+        Read transactions then evaluate field-expression filters and
+        `aggregate()` calls that only read cached fields as vectorized array
+        operations instead of decoding every value. The columns are built on
+        first use and rebuilt after any write is committed. The cache lives in
+        this process only; pass no fields to drop it.
+
+        Parameters
+        ----------
+        shelf : str
+            Shelf name.
+        fields : Sequence[str]
+            Dotted value field paths to cache.
+
+        Raises
+        ------
+        ImportError
+            If fields are given and NumPy is not installed.
+        """
+        columns = {
+            name: cache for name, cache in self._columns.items() if name != shelf
+        }
+        if fields:
+            columns[shelf] = ColumnCache(
+                (fields,) if isinstance(fields, str) else fields
+            )
+        self._columns = columns
+
+    def _load_codecs(self) -> None:
+        with self.lmdb_env.begin() as txn:
+            if txn.get(_CODEC_META_DB) is None:
+                return
+        meta_db = self.lmdb_env.open_db(_CODEC_META_DB)
+        with self.lmdb_env.begin(db=meta_db) as txn:
+            self._codecs = {
+                shelf.decode(): get_codec(codec.decode())
+                for shelf, codec in txn.cursor().iternext()
+            }
+
+    def _register_index(self, shelf: str, index: Index) -> None:
+        # Copy on write, like `_cache_shelf_dbs`.
+        shelf_indexes = {**self._indexes.get(shelf, {}), index.name: index}
+        self._indexes = {**self._indexes, shelf: shelf_indexes}
+
+    def _cache_shelf_dbs(self, handles: dict[str, LmdbDatabase]) -> None:
+        # Copy on write: transactions keep the mapping they started with,
+        # because a handle committed after a transaction began is not valid
+        # inside that transaction.
+        if handles:
+            self._shelf_dbs = {**self._shelf_dbs, **handles}
+
+    def transaction(
+        self,
+        *,
+        write: bool = True,
+        buffers: bool = False,
+    ) -> Transaction:
         """Create a transaction wrapper.
 
         Parameters
         ----------
         write : bool, optional
             Whether to create a writable transaction, by default ``True``.
+        buffers : bool, optional
+            Read values as zero-copy LMDB buffers that are decoded lazily, by
+            default ``False``. Only supported for read-only transactions.
 
         Returns
         -------
         Transaction
             Transaction bound to this database environment.
+
+        Raises
+        ------
+        ValueError
+            If ``buffers`` is requested for a writable transaction.
         """
-        tx = self.lmdb_env.begin(write=write)
-        return Transaction(self.lmdb_env, tx, write=write)
+        if write and buffers:
+            raise ValueError("buffers=True requires a read-only transaction")
+        with self._txn_state:
+            self._txn_state.wait_for(lambda: not self._resizing)
+            self._active += 1
+        try:
+            tx = self.lmdb_env.begin(write=write, buffers=buffers)
+        except BaseException:
+            self._end_transaction()
+            raise
+        return Transaction(self.lmdb_env, tx, write=write, db=self, buffers=buffers)
+
+    def _end_transaction(self) -> None:
+        with self._txn_state:
+            self._active -= 1
+            self._txn_state.notify_all()
+
+    def sync(self) -> None:
+        """Force a flush of committed data to disk."""
+        self.lmdb_env.sync(True)
+        self._last_sync = time.monotonic()
+
+    def _after_commit(self) -> None:
+        interval = self._profile.sync_interval
+        if interval is not None and time.monotonic() - self._last_sync >= interval:
+            self.sync()
 
     def close(self) -> None:
         """Close the underlying LMDB environment."""
+        if self._profile.sync_interval is not None:
+            self.sync()
         self.lmdb_env.close()
 
     def __enter__(self) -> DB:
@@ -116,6 +864,11 @@ class Transaction:
         Underlying LMDB transaction object.
     write : bool, optional
         Whether this transaction is writable, by default ``False``.
+    db : DB | None, optional
+        Owning database, used to grow the memory map after a map-full error.
+    buffers : bool, optional
+        Whether ``tx`` was opened with ``buffers=True``, by default ``False``.
+        Shelves then wrap values in lazily decoded `LazyValue` objects.
 
     Notes
     -----
@@ -124,6 +877,10 @@ class Transaction:
     - If no exception occurred and transaction is writable, commit is attempted.
     - If commit fails, the transaction is aborted and ``RuntimeError`` is raised.
     - Otherwise, the transaction is aborted.
+    - If the failure was a full memory map, the owning database grows the map
+      after the abort so that a retried transaction can succeed. Growth does
+      not wait for other transactions; when some are open, the map stays as it
+      is and the original error is raised with a note.
     """
 
     def __init__(
@@ -131,10 +888,25 @@ class Transaction:
         lmdb_env: LmdbEnvironment,
         tx: LmdbTransaction,
         write: bool = False,
+        *,
+        db: DB | None = None,
+        buffers: bool = False,
     ) -> None:
         self._lmdb_env: LmdbEnvironment = lmdb_env
         self._tx: LmdbTransaction = tx
         self._is_write = write
+        self._db = db
+        self._buffers = buffers
+        self._shelf_dbs: dict[str, LmdbDatabase] = {} if db is None else db._shelf_dbs
+        self._indexes: dict[str, dict[str, Index]] = {} if db is None else db._indexes
+        self._codecs: dict[str, Codec] = {} if db is None else db._codecs
+        self._columns: dict[str, ColumnCache] = {} if db is None else db._columns
+        self._sort_buffer = DEFAULT_SORT_BUFFER if db is None else db._sort_buffer
+        self._tracked: frozenset[str] = frozenset() if db is None else db._tracked
+        self._changes_db = None if db is None else db._changes_db
+        self._change_log: ChangeLog | None = None
+        self._opened_shelf_dbs: dict[str, LmdbDatabase] = {}
+        self._ended = False
 
     @property
     def tx(self) -> LmdbTransaction:
@@ -160,7 +932,26 @@ class Transaction:
 
     def commit(self) -> None:
         """Commit the transaction."""
-        self.tx.commit()
+        try:
+            self.tx.commit()
+        finally:
+            # A failed commit also ends the LMDB transaction.
+            self._end()
+        if self._db is not None:
+            if self.is_write:
+                self._db._cache_shelf_dbs(self._opened_shelf_dbs)
+            self._db._after_commit()
+
+    def abort(self) -> None:
+        """Abort the transaction, discarding its writes."""
+        self.tx.abort()
+        self._end()
+
+    def _end(self) -> None:
+        if not self._ended:
+            self._ended = True
+            if self._db is not None:
+                self._db._end_transaction()
 
     def __enter__(self) -> Transaction:
         """Enter context manager scope.
@@ -191,13 +982,33 @@ class Transaction:
         """
         if exc_type is None and self.is_write:
             try:
-                self.tx.commit()
+                self.commit()
                 return
             except Exception as e:
-                self.tx.abort()
+                self.abort()
+                self._grow_if_map_full(e)
                 raise RuntimeError("Transaction commit error") from e
         else:
-            self.tx.abort()
+            self.abort()
+            if exc_value is not None:
+                self._grow_if_map_full(exc_value)
+
+    def _grow_if_map_full(self, exc: BaseException) -> None:
+        if self._db is None or not is_map_full_error(exc):
+            return
+        try:
+            self._db.grow_map_size()
+        except RuntimeError as growth_error:
+            # Keep the error in flight; growth is retried by run_transaction().
+            exc.add_note(f"map not grown: {growth_error}")
+
+    def _shelf_changes(self, name: str) -> ShelfChanges | None:
+        if not self.is_write or name not in self._tracked:
+            return None
+        if self._change_log is None:
+            # Shelves of one transaction share the log, and its numbering.
+            self._change_log = ChangeLog(self.tx, self._changes_db)
+        return ShelfChanges(self._change_log, name)
 
     def shelf(self, name: str) -> ShelfQuery:
         """Open a named shelf (LMDB named database) within this transaction.
@@ -212,6 +1023,24 @@ class Transaction:
         ShelfQuery
             Query wrapper bound to this transaction's named shelf.
         """
-
-        shelf = self._lmdb_env.open_db(name.encode(), txn=self.tx)
-        return ShelfQuery(ShelfCursor(self.tx, shelf), ShelfStore(self.tx, shelf))
+        shelf = self._shelf_dbs.get(name)
+        if shelf is None:
+            shelf = self._opened_shelf_dbs.get(name)
+        if shelf is None:
+            shelf = self._lmdb_env.open_db(name.encode(), txn=self.tx)
+            self._opened_shelf_dbs[name] = shelf
+        return ShelfQuery(
+            ShelfCursor(self.tx, shelf, lazy=self._buffers),
+            ShelfStore(
+                self.tx,
+                shelf,
+                lazy=self._buffers,
+                indexes=self._indexes.get(name),
+                codec=self._codecs.get(name, MSGPACK),
+                # Write transactions see their own uncommitted writes, which
+                # the columns of the last snapshot do not hold.
+                columns=None if self.is_write else self._columns.get(name),
+                sort_buffer=self._sort_buffer,
+                changes=self._shelf_changes(name),
+            ),
+        )
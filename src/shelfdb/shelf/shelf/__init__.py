@@ -1,4 +1,28 @@
+from .expr import Expr, F
 from .query import ShelfQuery
-from .schema import UNDEF, Item, MutationResult
+from .schema import (
+    UNDEF,
+    Change,
+    ChunkProgress,
+    Group,
+    Item,
+    Key,
+    MutationResult,
+    MutationSummary,
+    Page,
+)
 
-__all__ = ["UNDEF", "Item", "MutationResult", "ShelfQuery"]
+__all__ = [
+    "UNDEF",
+    "Change",
+    "ChunkProgress",
+    "Expr",
+    "F",
+    "Group",
+    "Item",
+    "Key",
+    "MutationResult",
+    "MutationSummary",
+    "Page",
+    "ShelfQuery",
+]
@@ -0,0 +1,252 @@
+"""Streaming aggregations over query results.
+
+`Aggregation` folds the items of one query run into per-field totals, so
+`ShelfQuery.aggregate()` and `GroupBy.agg()` read every item once and keep
+only the running totals in memory:
+
+- ``count`` counts items holding the field, or every item for ``True``
+- ``sum`` adds field values
+- ``min`` and ``max`` keep the smallest and largest field value
+- ``avg`` keeps a sum and a count
+
+Items missing a field, or holding ``None`` in it, are left out of that
+field's aggregations, so ``min``, ``max`` and ``avg`` of no values are
+``None`` and ``sum`` of no values is ``0``.
+
+`Aggregation.run_columns()` computes the same totals from cached NumPy
+columns (see `columns`) instead of item values.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, NamedTuple, cast
+
+from .index import MISSING, field_getter
+from .schema import Group, Item
+from .shelf import decode_value
+
+if TYPE_CHECKING:
+    from .columns import ColumnSet
+    from .query import ShelfQuery
+
+AGGREGATES = ("count", "sum", "min", "max", "avg")
+
+type FieldSpec = str | Sequence[str] | bool
+
+
+class _Field(NamedTuple):
+    """One aggregated field: the aggregate, its field path and extractor."""
+
+    op: str
+    path: str | None
+    extract: Callable[[Any], Any] | None
+
+
+class _Totals:
+    """Running totals of one group, one slot per aggregated field."""
+
+    __slots__ = ("counts", "totals")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.totals: list[Any] = [None] * size
+
+
+class Aggregation:
+    """Aggregations requested as ``op=field`` keyword arguments.
+
+    Each keyword names an aggregate from `AGGREGATES`; its value is a dotted
+    field path, a sequence of paths, or ``True`` with ``count`` to count
+    items. A single path reports one value per aggregate, a sequence one value
+    per path.
+
+    Raises
+    ------
+    TypeError
+        If no aggregation is requested.
+    ValueError
+        If an aggregate is unknown, ``True`` is used with an aggregate other
+        than ``count``, or ``False`` is given.
+    """
+
+    def __init__(self, fields: Mapping[str, FieldSpec]):
+        if not fields:
+            raise TypeError("aggregate() requires at least one aggregation")
+        self._fields: list[_Field] = []
+        # Per keyword, the field paths reported separately, or None for one value.
+        self._layout: list[tuple[str, tuple[str, ...] | None]] = []
+        for op, spec in fields.items():
+            if op not in AGGREGATES:
+                raise ValueError(f"unknown aggregation: {op}")
+            if isinstance(spec, bool):
+                if op != "count" or not spec:
+                    raise ValueError(f"{op} aggregation requires a field path")
+                self._fields.append(_Field(op, None, None))
+                self._layout.append((op, None))
+                continue
+            paths = (spec,) if isinstance(spec, str) else tuple(spec)
+            self._fields.extend(_Field(op, path, field_getter(path)) for path in paths)
+            self._layout.append((op, None if isinstance(spec, str) else paths))
+
+    @property
+    def reads_values(self) -> bool:
+        """Return whether any aggregation reads item values."""
+        return any(field.extract is not None for field in self._fields)
+
+    @property
+    def paths(self) -> set[str]:
+        """Return the field paths the aggregations read."""
+        return {field.path for field in self._fields if field.path is not None}
+
+    def run(self, items: Iterable[Item]) -> dict[str, Any]:
+        """Aggregate ``items`` in one pass."""
+        totals = _Totals(len(self._fields))
+        for item in items:
+            self._add(totals, item)
+        return self._result(totals)
+
+    def run_groups(
+        self, items: Iterable[Item], key: Callable[[Item], Any]
+    ) -> list[Group]:
+        """Aggregate ``items`` per ``key`` group in one pass.
+
+        Groups come back in the order the scan first reaches them.
+        """
+        groups: dict[Any, _Totals] = {}
+        for item in items:
+            group = key(item)
+            if (totals := groups.get(group)) is None:
+                totals = groups[group] = _Totals(len(self._fields))
+            self._add(totals, item)
+        return [Group(group, self._result(totals)) for group, totals in groups.items()]
+
+    def run_columns(self, columns: ColumnSet, positions: Any) -> dict[str, Any]:
+        """Aggregate the items at ``positions`` of the cached ``columns``.
+
+        ``columns`` must hold every field in `paths`.
+        """
+        totals = _Totals(len(self._fields))
+        for pos, (op, path, _) in enumerate(self._fields):
+            if path is None:
+                totals.counts[pos] = len(positions)
+                continue
+            column = columns.columns[path]
+            values = column.values[positions][column.present[positions]]
+            if values.dtype == object:
+                values = values[[field is not None for field in values.tolist()]]
+            totals.counts[pos] = count = len(values)
+            if not count or op == "count":
+                continue
+            if op in ("sum", "avg"):
+                totals.totals[pos] = _column_sum(values)
+            else:
+                total = values.min() if op == "min" else values.max()
+                totals.totals[pos] = total.item() if values.dtype != object else total
+        return self._result(totals)
+
+    def _add(self, totals: _Totals, item: Item) -> None:
+        value = decode_value(item.value)
+        counts, running = totals.counts, totals.totals
+        for pos, (op, _, extract) in enumerate(self._fields):
+            if extract is None:
+                counts[pos] += 1
+                continue
+            field = extract(value)
+            if field is MISSING or field is None:
+                continue
+            counts[pos] += 1
+            current = running[pos]
+            if op in ("sum", "avg"):
+                running[pos] = field if current is None else current + field
+            elif op == "min":
+                if current is None or field < current:
+                    running[pos] = field
+            elif op == "max":
+                if current is None or field > current:
+                    running[pos] = field
+
+    def _result(self, totals: _Totals) -> dict[str, Any]:
+        values = []
+        for pos, (op, _, _) in enumerate(self._fields):
+            count, total = totals.counts[pos], totals.totals[pos]
+            if op == "count":
+                values.append(count)
+            elif op == "sum":
+                values.append(0 if total is None else total)
+            elif op == "avg":
+                values.append(None if not count else total / count)
+            else:
+                values.append(total)
+        result: dict[str, Any] = {}
+        pos = 0
+        for op, paths in self._layout:
+            if paths is None:
+                result[op] = values[pos]
+                pos += 1
+            else:
+                result[op] = dict(zip(paths, values[pos : pos + len(paths)]))
+                pos += len(paths)
+        return result
+
+
+def _column_sum(values: Any) -> Any:
+    if values.dtype == object:
+        return sum(values.tolist()[1:], values[0])
+    if values.dtype.kind in "iub":
+        # Sum in Python when int64 could overflow.
+        peak = max(abs(int(values.min())), abs(int(values.max())))
+        if peak * len(values) >= 1 << 63:
+            return sum(values.tolist())
+    return values.sum().item()
+
+
+def group_key(
+    key: str | Sequence[str] | Callable[[Item], Any],
+) -> Callable[[Item], Any]:
+    """Return the group key function for a field path, paths, or item function.
+
+    Items missing a grouped field fall in the ``None`` group for that field.
+    """
+    if isinstance(key, str):
+        extract = field_getter(key)
+
+        def by_field(item: Item) -> Any:
+            field = extract(decode_value(item.value))
+            return None if field is MISSING else field
+
+        return by_field
+    if not isinstance(key, Sequence):
+        return key
+    # Narrowing can not rule out callable sequences, so name the paths' type.
+    getters = tuple(field_getter(path) for path in cast(Sequence[str], key))
+
+    def by_fields(item: Item) -> Any:
+        value = decode_value(item.value)
+        return tuple(
+            None if field is MISSING else field
+            for field in (get(value) for get in getters)
+        )
+
+    return by_fields
+
+
+class GroupBy:
+    """Grouped selection returned by `ShelfQuery.group_by()`."""
+
+    def __init__(
+        self, query: ShelfQuery, key: str | Sequence[str] | Callable[[Item], Any]
+    ):
+        self._query = query
+        self._key = group_key(key)
+
+    def agg(self, **fields: FieldSpec) -> list[Group]:
+        """Aggregate the selected items of each group, like `ShelfQuery.aggregate()`.
+
+        Returns one `Group(key, aggregates)` per distinct group key, in the
+        order the scan first reaches each group.
+        """
+        aggregation = Aggregation(fields)
+        return aggregation.run_groups(
+            self._query._aggregate_items(True, ordered=True), self._key
+        )
@@ -0,0 +1,109 @@
+"""Append-only change log of shelf mutations.
+
+Shelves opted in with `DB.track_changes()` record every write in one LMDB
+named database shared by all shelves. Each record is keyed by its sequence
+number, packed as 8 big-endian bytes so records sort in write order, and
+holds the shelf name, the packed item key and the operation, `PUT` or
+`DELETE`.
+
+A `ChangeLog` appends records inside one write transaction, so a record is
+committed or aborted together with the write it describes. Sequence numbers
+increase by one per record, in commit order across transactions, because
+LMDB runs one write transaction at a time.
+
+Sequence number 0 never names a record. Truncation stores the last removed
+sequence number under it, so numbering continues after the log is emptied.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Any, Final, NamedTuple
+
+from .codec import packb, unpackb
+from .keycodec import unpack_key
+from .schema import Change
+
+PUT: Final = "put"
+DELETE: Final = "delete"
+
+_SEQ: Final = struct.Struct(">Q")
+_FLOOR_KEY: Final = _SEQ.pack(0)
+LmdbTransaction = Any
+
+
+def _last_seq(tx: LmdbTransaction, db: Any) -> int:
+    with tx.cursor(db=db) as cur:
+        if not cur.last():
+            return 0
+        key, value = cur.item()
+        if bytes(key) == _FLOOR_KEY:
+            return unpackb(value)
+        return _SEQ.unpack(key)[0]
+
+
+class ChangeLog:
+    """Appender of change records inside one write transaction.
+
+    The next sequence number is read from the log on the first append and
+    counted up from there.
+    """
+
+    def __init__(self, tx: LmdbTransaction, db: Any):
+        self._tx = tx
+        self._db = db
+        self._next: int | None = None
+
+    def append(self, shelf: str, key: bytes, op: str) -> int:
+        """Record ``op`` on the packed key ``key`` of ``shelf``; return its number."""
+        seq = _last_seq(self._tx, self._db) + 1 if self._next is None else self._next
+        # Sequence numbers only grow, so every record is appended at the end.
+        self._tx.put(_SEQ.pack(seq), packb([shelf, key, op]), db=self._db, append=True)
+        self._next = seq + 1
+        return seq
+
+
+class ShelfChanges(NamedTuple):
+    """The change log bound to the shelf whose writes it records."""
+
+    log: ChangeLog
+    shelf: str
+
+    def record(self, key: bytes, op: str) -> None:
+        """Record ``op`` on the packed item key ``key``."""
+        self.log.append(self.shelf, key, op)
+
+
+def read_changes(
+    tx: LmdbTransaction, db: Any, since: int, limit: int | None = None
+) -> list[Change]:
+    """Return up to ``limit`` records numbered after ``since``, oldest first."""
+    changes: list[Change] = []
+    if limit is not None and limit < 1:
+        return changes
+    with tx.cursor(db=db) as cur:
+        if not cur.set_range(_SEQ.pack(max(since, 0) + 1)):
+            return changes
+        for key, value in cur:
+            shelf, item_key, op = unpackb(value)
+            changes.append(Change(_SEQ.unpack(key)[0], shelf, unpack_key(item_key), op))
+            if len(changes) == limit:
+                break
+    return changes
+
+
+def truncate_changes(tx: LmdbTransaction, db: Any, before: int) -> int:
+    """Delete the records numbered below ``before``; return how many were deleted."""
+    removed = last = 0
+    with tx.cursor(db=db) as cur:
+        found = cur.set_range(_SEQ.pack(1))
+        while found and (seq := _SEQ.unpack(cur.key())[0]) < before:
+            last = seq
+            removed += 1
+            # Deleting moves the cursor to the following record, if any.
+            cur.delete()
+            found = bool(cur.key())
+    if removed and not found:
+        # The log is now empty; numbering continues after the floor.
+        tx.put(_FLOOR_KEY, packb(last), db=db)
+    return removed
@@ -0,0 +1,197 @@
+"""MessagePack serialization and value codecs for stored shelf values.
+
+`packb` and `unpackb` are the MessagePack serializers shared by the shelf layer
+and the network protocol. Packing reuses one `msgpack.Packer` per thread instead
+of building a new one for every value. Common Python values without a
+MessagePack type are stored as ext types and come back with their own type:
+
+- `datetime.datetime`, keeping naive values naive and aware values at their
+  UTC offset
+- `datetime.date`
+- `uuid.UUID`
+- `decimal.Decimal`
+- `set` and `frozenset`
+
+Other bytes-like values such as `bytearray` and `memoryview` pack as
+MessagePack ``bin`` and come back as `bytes`.
+
+Every shelf value is serialized with `packb`. A `Codec` may then compress the
+packed bytes:
+
+- ``msgpack`` stores packed bytes as they are
+- ``zlib`` compresses them with `zlib`
+- ``lzma`` compresses them with `lzma`, smaller but slower than ``zlib``
+
+Compressed values start with the marker byte ``0xc1``, which MessagePack never
+uses, followed by the codec tag. Plain MessagePack values carry no marker, so
+values written before codecs existed, or by a different codec, stay readable
+by `unpack_value` whatever codec a shelf currently writes with.
+"""
+
+from __future__ import annotations
+
+import lzma
+import struct
+import threading
+import zlib
+from collections.abc import Callable
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Final, NamedTuple
+from uuid import UUID
+
+import msgpack
+
+_MARKER: Final = 0xC1
+
+_EXT_DATETIME: Final = 1
+_EXT_DATE: Final = 2
+_EXT_UUID: Final = 3
+_EXT_DECIMAL: Final = 4
+_EXT_SET: Final = 5
+_EXT_FROZENSET: Final = 6
+
+_INT64: Final = struct.Struct(">q")
+_INT64_PAIR: Final = struct.Struct(">qq")
+_INT32: Final = struct.Struct(">i")
+_EPOCH: Final = datetime(1970, 1, 1)
+_MICROSECOND: Final = timedelta(microseconds=1)
+
+_packers = threading.local()
+
+
+def _default(value: Any) -> msgpack.ExtType:
+    # `datetime` is a subclass of `date`, so it is checked first.
+    if isinstance(value, datetime):
+        wall_clock = (value.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+        offset = value.utcoffset()
+        if offset is None:
+            return msgpack.ExtType(_EXT_DATETIME, _INT64.pack(wall_clock))
+        payload = _INT64_PAIR.pack(wall_clock, offset // _MICROSECOND)
+        return msgpack.ExtType(_EXT_DATETIME, payload)
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, _INT32.pack(value.toordinal()))
+    if isinstance(value, UUID):
+        return msgpack.ExtType(_EXT_UUID, value.bytes)
+    if isinstance(value, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(value).encode())
+    if isinstance(value, frozenset):
+        return msgpack.ExtType(_EXT_FROZENSET, _pack_nested(list(value)))
+    if isinstance(value, set):
+        return msgpack.ExtType(_EXT_SET, _pack_nested(list(value)))
+    raise TypeError(f"can not serialize {type(value).__name__!r} object")
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        if len(data) == _INT64.size:
+            return _EPOCH + _INT64.unpack(data)[0] * _MICROSECOND
+        wall_clock, offset = _INT64_PAIR.unpack(data)
+        tzinfo = timezone(offset * _MICROSECOND)
+        return (_EPOCH + wall_clock * _MICROSECOND).replace(tzinfo=tzinfo)
+    if code == _EXT_DATE:
+        return date.fromordinal(_INT32.unpack(data)[0])
+    if code == _EXT_UUID:
+        return UUID(bytes=bytes(data))
+    if code == _EXT_DECIMAL:
+        return Decimal(bytes(data).decode())
+    if code == _EXT_SET:
+        return set(_unpack_members(data))
+    if code == _EXT_FROZENSET:
+        return frozenset(_unpack_members(data))
+    return msgpack.ExtType(code, data)
+
+
+def _unpack_members(data: bytes) -> Any:
+    # Set members are hashable, so arrays inside them come back as tuples.
+    return msgpack.unpackb(data, raw=False, ext_hook=_ext_hook, use_list=False)
+
+
+def _pack_nested(value: Any) -> bytes:
+    # Runs inside the thread's packer while it is packing, so it can not
+    # reuse that packer.
+    return msgpack.packb(value, use_bin_type=True, default=_default)
+
+
+def packb(value: Any) -> bytes:
+    """Serialize a Python object to MessagePack bytes."""
+    # Packers keep an internal buffer, so each thread reuses its own.
+    try:
+        packer = _packers.packer
+    except AttributeError:
+        packer = _packers.packer = msgpack.Packer(use_bin_type=True, default=_default)
+    return packer.pack(value)
+
+
+def unpackb(value: bytes | memoryview) -> Any:
+    """Deserialize MessagePack bytes, or a buffer of them, into a Python object."""
+    return msgpack.unpackb(value, raw=False, ext_hook=_ext_hook)
+
+
+class Codec(NamedTuple):
+    """Value codec used to write shelf values.
+
+    Attributes
+    ----------
+    name : str
+        Codec name used by `DB.set_codec()`.
+    tag : int
+        Byte stored after the marker byte of compressed values.
+    compress : Callable[[bytes], bytes] | None
+        Compression applied to packed values, or ``None`` to store them as is.
+    decompress : Callable[[bytes | memoryview], bytes] | None
+        Inverse of ``compress``. It also reads zero-copy LMDB buffers.
+    """
+
+    name: str
+    tag: int
+    compress: Callable[[bytes], bytes] | None = None
+    decompress: Callable[[bytes | memoryview], bytes] | None = None
+
+    def pack(self, value: Any) -> bytes:
+        """Serialize ``value`` for storage.
+
+        Values that do not shrink when compressed are stored uncompressed.
+        """
+        packed = packb(value)
+        if self.compress is None:
+            return packed
+        compressed = self.compress(packed)
+        if len(compressed) + 2 >= len(packed):
+            return packed
+        return bytes((_MARKER, self.tag)) + compressed
+
+
+MSGPACK: Final = Codec("msgpack", 0)
+CODECS: Final = {
+    codec.name: codec
+    for codec in (
+        MSGPACK,
+        Codec("zlib", 1, zlib.compress, zlib.decompress),
+        Codec("lzma", 2, lzma.compress, lzma.decompress),
+    )
+}
+_CODECS_BY_TAG: Final = {codec.tag: codec for codec in CODECS.values()}
+
+
+def get_codec(name: str) -> Codec:
+    """Return the codec called ``name``.
+
+    Raises
+    ------
+    ValueError
+        If no codec has that name.
+    """
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"unknown value codec: {name}") from None
+
+
+def unpack_value(data: bytes | memoryview) -> Any:
+    """Deserialize a stored value written by any codec."""
+    if data[0] != _MARKER:
+        return unpackb(data)
+    decompress = _CODECS_BY_TAG[data[1]].decompress
+    assert decompress is not None
+    return unpackb(decompress(data[2:]))
@@ -0,0 +1,358 @@
+"""Optional NumPy column cache for vectorized filters and aggregates.
+
+`DB.cache_columns()` names value fields of a shelf to keep as NumPy arrays.
+A `ColumnCache` builds one `ColumnSet` per LMDB snapshot, on first use in a
+read transaction: every cached field becomes one array aligned with the
+shelf's key order, plus a mask of the items holding the field. The set is
+tagged with the id of the last committed write transaction, so any commit
+invalidates it and the next read transaction rebuilds it.
+
+Over those arrays, a field-expression `filter()` whose fields are all cached
+selects keys with one vectorized mask per comparison, and `aggregate()`
+reduces the selected slots without decoding any value. `ColumnCursor` scans
+the selected keys in place of the shelf scan.
+
+Results match the per-item evaluation in `expr` and `aggregate`. Comparisons
+NumPy can not vectorize, such as ordering a column of mixed types, fall back
+to comparing each cached value in Python.
+
+NumPy is not a dependency of shelfdb; it is imported when a cache is first
+configured.
+"""
+
+from __future__ import annotations
+
+import operator
+from bisect import bisect_left
+from collections.abc import Callable, Generator, Iterable, Sequence
+from datetime import datetime
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Final, NamedTuple
+
+from .codec import unpack_value
+from .expr import And, Compare, Exists, Expr, F, In, Not, Or
+from .index import MISSING, field_getter
+from .keycodec import unpack_key
+from .schema import Item, Key
+from .shelf import MergedCursor, ShelfCursor
+
+if TYPE_CHECKING:
+    from .shelf import ShelfStore
+
+LmdbTransaction = Any
+
+_OPERATORS: Final[dict[str, Callable[[Any, Any], Any]]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+}
+# Values NumPy compares against a whole array as one scalar.
+_SCALARS: Final = (bool, int, float, str, bytes, datetime, type(None))
+# Largest magnitude a float64 holds exactly, for int columns stored as floats.
+_EXACT_FLOAT: Final = 1 << 53
+
+
+def require_numpy() -> ModuleType:
+    """Return the ``numpy`` module.
+
+    Raises
+    ------
+    ImportError
+        If NumPy is not installed.
+    """
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImportError(
+            "column caching requires numpy; install shelfdb[columns]"
+        ) from exc
+    return numpy
+
+
+class Column(NamedTuple):
+    """Cached values of one field, one slot per shelf item in key order.
+
+    Attributes
+    ----------
+    values : numpy.ndarray
+        Field values. Numeric and bool fields get a native dtype, any other
+        mix of values an object array. Slots of items without the field hold
+        a filler value.
+    present : numpy.ndarray
+        Bool mask of the items holding the field.
+    """
+
+    values: Any
+    present: Any
+
+
+class ColumnSet(NamedTuple):
+    """Cached columns of one shelf snapshot.
+
+    Attributes
+    ----------
+    txn_id : int
+        Id of the LMDB snapshot the columns were read from.
+    packed : list[bytes]
+        Packed item keys in key order.
+    keys : list[Key]
+        Item keys, aligned with ``packed``.
+    columns : dict[str, Column]
+        Column per cached field path.
+    """
+
+    txn_id: int
+    packed: list[bytes]
+    keys: list[Key]
+    columns: dict[str, Column]
+
+    def covers(self, paths: Iterable[str]) -> bool:
+        """Return whether every field in ``paths`` is cached."""
+        return all(path in self.columns for path in paths)
+
+    def select(self, scan: ShelfCursor | MergedCursor, exprs: Sequence[Expr]) -> Any:
+        """Return the positions in ``scan`` matching every expression in ``exprs``.
+
+        Positions index ``keys`` and the columns, in ascending key order
+        whatever the scan direction.
+        """
+        np = require_numpy()
+        parts = []
+        for lo, hi in self._ranges(scan):
+            mask = np.ones(hi - lo, dtype=bool)
+            for expr in exprs:
+                mask &= self._mask(expr, lo, hi)
+            parts.append(np.flatnonzero(mask) + lo)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def _ranges(self, scan: ShelfCursor | MergedCursor) -> list[tuple[int, int]]:
+        # Ranges run in ascending key order; callers apply the direction.
+        scans = scan.asc().scans if isinstance(scan, MergedCursor) else (scan,)
+        ranges = []
+        for part in scans:
+            exact, start, stop = part.bounds
+            if exact is not None:
+                lo = bisect_left(self.packed, exact)
+                found = lo < len(self.packed) and self.packed[lo] == exact
+                ranges.append((lo, lo + found))
+                continue
+            lo = 0 if start is None else bisect_left(self.packed, start)
+            hi = len(self.packed) if stop is None else bisect_left(self.packed, stop)
+            ranges.append((lo, max(lo, hi)))
+        return ranges
+
+    def _mask(self, expr: Expr, lo: int, hi: int) -> Any:
+        if isinstance(expr, And):
+            mask = self._mask(expr.parts[0], lo, hi)
+            for part in expr.parts[1:]:
+                mask &= self._mask(part, lo, hi)
+            return mask
+        if isinstance(expr, Or):
+            mask = self._mask(expr.parts[0], lo, hi)
+            for part in expr.parts[1:]:
+                mask |= self._mask(part, lo, hi)
+            return mask
+        if isinstance(expr, Not):
+            return ~self._mask(expr.part, lo, hi)
+        column = self.columns[_path(expr)]
+        values, present = column.values[lo:hi], column.present[lo:hi]
+        if isinstance(expr, Exists):
+            return present.copy()
+        if isinstance(expr, F):
+            return present & values.astype(bool)
+        if isinstance(expr, In):
+            mask = require_numpy().zeros(hi - lo, dtype=bool)
+            for value in expr.values:
+                mask |= _compare_present(values, present, "eq", value)
+            return mask
+        assert isinstance(expr, Compare)
+        return _compare_present(values, present, expr.op, expr.value)
+
+
+def _compare_present(values: Any, present: Any, op: str, value: Any) -> Any:
+    if values.dtype != object or present.all():
+        return present & _compare(values, op, value)
+    # Filler slots of object columns hold None, which does not order.
+    mask = require_numpy().zeros(len(values), dtype=bool)
+    mask[present] = _compare(values[present], op, value)
+    return mask
+
+
+def _compare(values: Any, op: str, value: Any) -> Any:
+    np = require_numpy()
+    compare = _OPERATORS[op]
+    result = None
+    if isinstance(value, _SCALARS):
+        try:
+            with np.errstate(all="ignore"):
+                result = compare(values, value)
+        except (TypeError, OverflowError):
+            result = None
+    if isinstance(result, np.ndarray) and result.shape == values.shape:
+        return result.astype(bool, copy=False)
+    # Compare value by value, with the per-item rules of `expr.Compare`.
+    return np.fromiter(
+        (_compare_one(compare, field, value) for field in values.tolist()),
+        dtype=bool,
+        count=len(values),
+    )
+
+
+def _compare_one(compare: Callable[[Any, Any], Any], field: Any, value: Any) -> bool:
+    try:
+        return bool(compare(field, value))
+    except TypeError:
+        return False
+
+
+def _path(expr: Expr) -> str:
+    if not isinstance(expr, (F, Compare, In, Exists)):
+        raise TypeError(f"unsupported field expression: {expr!r}")
+    return expr.path
+
+
+def expr_paths(expr: Expr) -> set[str]:
+    """Return the field paths ``expr`` reads."""
+    if isinstance(expr, (And, Or)):
+        return set().union(*(expr_paths(part) for part in expr.parts))
+    if isinstance(expr, Not):
+        return expr_paths(expr.part)
+    return {_path(expr)}
+
+
+class ColumnCache:
+    """Column cache of the fields ``fields`` of one shelf.
+
+    The cache keeps the `ColumnSet` of the latest snapshot it was asked for
+    and rebuilds it when a transaction reads a different snapshot.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        require_numpy()
+        self.fields = tuple(fields)
+        self._columns: ColumnSet | None = None
+
+    def load(self, tx: LmdbTransaction, db: Any) -> ColumnSet:
+        """Return the columns of the snapshot ``tx`` reads, building them if needed.
+
+        ``tx`` must be a read transaction, whose id is the id of the last
+        write transaction committed before it began.
+        """
+        columns = self._columns
+        txn_id = tx.id()
+        if columns is None or columns.txn_id != txn_id:
+            columns = self._columns = self._build(txn_id, ShelfCursor(tx, db))
+        return columns
+
+    def _build(self, txn_id: int, scan: ShelfCursor) -> ColumnSet:
+        getters = tuple(field_getter(path) for path in self.fields)
+        packed: list[bytes] = []
+        fields: list[list[Any]] = [[] for _ in self.fields]
+        for key, raw in scan.raw():
+            packed.append(key)
+            value = unpack_value(raw)
+            for extract, found in zip(getters, fields):
+                found.append(extract(value))
+        return ColumnSet(
+            txn_id,
+            packed,
+            [unpack_key(key) for key in packed],
+            {path: _column(found) for path, found in zip(self.fields, fields)},
+        )
+
+
+def _column(found: list[Any]) -> Column:
+    np = require_numpy()
+    size = len(found)
+    present = np.fromiter((field is not MISSING for field in found), bool, size)
+    kinds = {type(field) for field in found if field is not MISSING}
+    if kinds and kinds <= {bool}:
+        return Column(
+            np.fromiter((field is True for field in found), bool, size), present
+        )
+    if kinds and kinds <= {int, float}:
+        numbers = [0 if field is MISSING else field for field in found]
+        try:
+            if kinds == {int}:
+                return Column(np.array(numbers, dtype=np.int64), present)
+            # Mixed ints only become floats when every int converts exactly.
+            if all(
+                abs(number) <= _EXACT_FLOAT for number in numbers if type(number) is int
+            ):
+                return Column(np.array(numbers, dtype=np.float64), present)
+        except OverflowError:
+            pass
+    values = np.empty(size, dtype=object)
+    for pos, field in enumerate(found):
+        values[pos] = None if field is MISSING else field
+    return Column(values, present)
+
+
+class ColumnCursor:
+    """Scan of the keys of ``scan`` whose cached columns match ``expr``.
+
+    Keys come from the `ColumnSet`, in the direction of ``scan``, and values
+    are read from the shelf by key.
+    """
+
+    def __init__(
+        self,
+        columns: ColumnSet,
+        scan: ShelfCursor | MergedCursor,
+        expr: Expr,
+        store: ShelfStore,
+    ):
+        self._columns = columns
+        self._scan = scan
+        self._expr = expr
+        self._store = store
+
+    @property
+    def lazy(self) -> bool:
+        """Return whether loaded values are wrapped in `LazyValue`."""
+        return self._scan.lazy
+
+    @property
+    def descending(self) -> bool:
+        """Return whether keys are scanned in descending order."""
+        return self._scan.descending
+
+    @property
+    def primary(self) -> ShelfCursor:
+        """Return the plain shelf scan the selection narrows."""
+        return self._scan.primary
+
+    def asc(self) -> ColumnCursor:
+        """Return a copied column scan with ascending order."""
+        return ColumnCursor(self._columns, self._scan.asc(), self._expr, self._store)
+
+    def desc(self) -> ColumnCursor:
+        """Return a copied column scan with descending order."""
+        return ColumnCursor(self._columns, self._scan.desc(), self._expr, self._store)
+
+    def describe(self) -> str:
+        """Return the narrowed scan and the vectorized expression as text."""
+        return f"columns {self._scan.describe()} where {self._expr!r}"
+
+    def _positions(self) -> list[int]:
+        positions = self._columns.select(self._scan, (self._expr,)).tolist()
+        return positions[::-1] if self.descending else positions
+
+    def keys(self) -> Generator[Key, None, None]:
+        """Iterate the selected keys in scan order."""
+        keys = self._columns.keys
+        for pos in self._positions():
+            yield keys[pos]
+
+    def items(self) -> Generator[Item, None, None]:
+        """Iterate the selected items, loading each value by key."""
+        for key in self.keys():
+            if (value := self._store.get(key, MISSING)) is not MISSING:
+                yield Item(key, value)
+
+    def count(self) -> int:
+        """Count the selected keys."""
+        return len(self._columns.select(self._scan, (self._expr,)))
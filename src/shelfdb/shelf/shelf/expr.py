@@ -0,0 +1,316 @@
+"""Declarative field expressions for `ShelfQuery.filter()`.
+
+`F("meta.tenant")` names a dotted value field. Comparing it builds an
+expression, and ``&``, ``|`` and ``~`` combine expressions:
+
+    (F("meta.tenant") == "acme") & F("active")
+
+Python binds ``&`` and ``|`` tighter than comparisons, so each comparison
+needs its own parentheses. A bare `F` tests that the field is truthy.
+
+Unlike a lambda, an expression is plain data. `Expr.to_wire()` turns it into
+nested lists that MessagePack or any other codec carries as is, and
+`from_wire()` rebuilds it on the server. `Expr.compile()` turns it into a
+predicate over item values, and the query planner reads its equality and
+range tests to pick an index scan.
+
+Comparisons on a missing field, or between values Python can not order,
+are false.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
+from typing import Any, Final
+
+from .index import MISSING, field_getter
+from .schema import Item
+from .shelf import decode_value
+
+type Predicate = Callable[[Any], bool]
+
+_COMPARISONS: Final[dict[str, tuple[str, Callable[[Any, Any], bool]]]] = {
+    "eq": ("==", lambda field, value: field == value),
+    "ne": ("!=", lambda field, value: field != value),
+    "lt": ("<", lambda field, value: field < value),
+    "le": ("<=", lambda field, value: field <= value),
+    "gt": (">", lambda field, value: field > value),
+    "ge": (">=", lambda field, value: field >= value),
+}
+
+
+class Expr(ABC):
+    """Base class of field expressions."""
+
+    __slots__ = ()
+
+    def __and__(self, other: Expr) -> Expr:
+        return And((self, _expr(other)))
+
+    def __or__(self, other: Expr) -> Expr:
+        return Or((self, _expr(other)))
+
+    def __invert__(self) -> Expr:
+        return Not(self)
+
+    def __bool__(self) -> bool:
+        raise TypeError("combine field expressions with &, | and ~, not and/or/not")
+
+    @abstractmethod
+    def to_wire(self) -> list[Any]:
+        """Return the expression as nested lists of plain values."""
+
+    @abstractmethod
+    def compile(self) -> Predicate:
+        """Return a predicate testing a decoded item value."""
+
+    def matches(self) -> Callable[[Item], bool]:
+        """Return a predicate testing an item, for use as a filter function."""
+        predicate = self.compile()
+        return lambda item: predicate(decode_value(item.value))
+
+    def conjuncts(self) -> tuple[Expr, ...]:
+        """Return the expressions that must all hold for this one to hold."""
+        return (self,)
+
+
+def _expr(value: Any) -> Expr:
+    if not isinstance(value, Expr):
+        raise TypeError(f"expected a field expression, got {type(value).__name__}")
+    return value
+
+
+class F(Expr):
+    """Reference to the dotted value field ``path``, true when the field is."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    # Comparisons build expressions, so fields can not be dict keys.
+    __hash__ = None  # type: ignore[assignment]
+
+    def __eq__(self, value: Any) -> Compare:  # type: ignore[override]
+        return Compare("eq", self.path, value)
+
+    def __ne__(self, value: Any) -> Compare:  # type: ignore[override]
+        return Compare("ne", self.path, value)
+
+    def __lt__(self, value: Any) -> Compare:
+        return Compare("lt", self.path, value)
+
+    def __le__(self, value: Any) -> Compare:
+        return Compare("le", self.path, value)
+
+    def __gt__(self, value: Any) -> Compare:
+        return Compare("gt", self.path, value)
+
+    def __ge__(self, value: Any) -> Compare:
+        return Compare("ge", self.path, value)
+
+    def isin(self, values: Iterable[Any]) -> In:
+        """Return an expression true when the field equals one of ``values``."""
+        return In(self.path, tuple(values))
+
+    def exists(self) -> Exists:
+        """Return an expression true when the field is present."""
+        return Exists(self.path)
+
+    def to_wire(self) -> list[Any]:
+        return ["field", self.path]
+
+    def compile(self) -> Predicate:
+        extract = field_getter(self.path)
+        return lambda value: (field := extract(value)) is not MISSING and bool(field)
+
+    def __repr__(self) -> str:
+        return f"F({self.path!r})"
+
+
+class Compare(Expr):
+    """Comparison of the field ``path`` with ``value``."""
+
+    __slots__ = ("op", "path", "value")
+
+    def __init__(self, op: str, path: str, value: Any):
+        if op not in _COMPARISONS:
+            raise ValueError(f"unknown comparison: {op}")
+        self.op = op
+        self.path = path
+        self.value = value
+
+    def to_wire(self) -> list[Any]:
+        return [self.op, self.path, self.value]
+
+    def compile(self) -> Predicate:
+        extract = field_getter(self.path)
+        compare = _COMPARISONS[self.op][1]
+        expected = self.value
+
+        def predicate(value: Any) -> bool:
+            if (field := extract(value)) is MISSING:
+                return False
+            try:
+                return bool(compare(field, expected))
+            except TypeError:
+                return False
+
+        return predicate
+
+    def __repr__(self) -> str:
+        return f"F({self.path!r}) {_COMPARISONS[self.op][0]} {self.value!r}"
+
+
+class In(Expr):
+    """Membership test of the field ``path`` in ``values``."""
+
+    __slots__ = ("path", "values")
+
+    def __init__(self, path: str, values: tuple[Any, ...]):
+        self.path = path
+        self.values = values
+
+    def to_wire(self) -> list[Any]:
+        return ["in", self.path, list(self.values)]
+
+    def compile(self) -> Predicate:
+        extract = field_getter(self.path)
+        values = self.values
+        return lambda value: (field := extract(value)) is not MISSING and any(
+            field == expected for expected in values
+        )
+
+    def __repr__(self) -> str:
+        return f"F({self.path!r}).isin({list(self.values)!r})"
+
+
+class Exists(Expr):
+    """Presence test of the field ``path``."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def to_wire(self) -> list[Any]:
+        return ["exists", self.path]
+
+    def compile(self) -> Predicate:
+        extract = field_getter(self.path)
+        return lambda value: extract(value) is not MISSING
+
+    def __repr__(self) -> str:
+        return f"F({self.path!r}).exists()"
+
+
+class And(Expr):
+    """Expression true when all ``parts`` are."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: tuple[Expr, ...]):
+        # Nested conjunctions flatten, so `a & b & c` is one node.
+        self.parts = tuple(sub for part in parts for sub in part.conjuncts())
+
+    def to_wire(self) -> list[Any]:
+        return ["and", *(part.to_wire() for part in self.parts)]
+
+    def compile(self) -> Predicate:
+        predicates = tuple(part.compile() for part in self.parts)
+        return lambda value: all(predicate(value) for predicate in predicates)
+
+    def conjuncts(self) -> tuple[Expr, ...]:
+        return self.parts
+
+    def __repr__(self) -> str:
+        return " & ".join(_group(part) for part in self.parts)
+
+
+class Or(Expr):
+    """Expression true when any of ``parts`` is."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: tuple[Expr, ...]):
+        self.parts = tuple(
+            sub
+            for part in parts
+            for sub in (part.parts if isinstance(part, Or) else (part,))
+        )
+
+    def to_wire(self) -> list[Any]:
+        return ["or", *(part.to_wire() for part in self.parts)]
+
+    def compile(self) -> Predicate:
+        predicates = tuple(part.compile() for part in self.parts)
+        return lambda value: any(predicate(value) for predicate in predicates)
+
+    def __repr__(self) -> str:
+        return " | ".join(_group(part) for part in self.parts)
+
+
+class Not(Expr):
+    """Negation of ``part``."""
+
+    __slots__ = ("part",)
+
+    def __init__(self, part: Expr):
+        self.part = part
+
+    def to_wire(self) -> list[Any]:
+        return ["not", self.part.to_wire()]
+
+    def compile(self) -> Predicate:
+        predicate = self.part.compile()
+        return lambda value: not predicate(value)
+
+    def __repr__(self) -> str:
+        return f"~{_group(self.part)}"
+
+
+def _group(expr: Expr) -> str:
+    if isinstance(expr, (F, Exists, In, Not)):
+        return repr(expr)
+    return f"({expr!r})"
+
+
+def from_wire(data: Any) -> Expr:
+    """Rebuild an expression from `Expr.to_wire()` output.
+
+    Raises
+    ------
+    ValueError
+        If ``data`` is not a valid expression.
+    """
+    try:
+        op, *args = data
+        if op in _COMPARISONS:
+            path, value = args
+            return Compare(op, _path(path), value)
+        if op == "field":
+            (path,) = args
+            return F(_path(path))
+        if op == "exists":
+            (path,) = args
+            return Exists(_path(path))
+        if op == "in":
+            path, values = args
+            return In(_path(path), tuple(values))
+        if op == "and" and args:
+            return And(tuple(from_wire(part) for part in args))
+        if op == "or" and args:
+            return Or(tuple(from_wire(part) for part in args))
+        if op == "not":
+            (part,) = args
+            return Not(from_wire(part))
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"invalid field expression: {data!r}") from exc
+    raise ValueError(f"invalid field expression: {data!r}")
+
+
+def _path(path: Any) -> str:
+    if not isinstance(path, str):
+        raise TypeError("field paths are strings")
+    return path
@@ -0,0 +1,237 @@
+"""Secondary index definitions and index-backed scans.
+
+An `Index` stores one entry per indexed shelf item in a companion LMDB named
+database. The entry key is the `encode_key` encoding of the extracted value
+followed by the item key, so entries sort by value and then by key. The entry
+value is empty, or for a covering index the packed ``include`` fields. Entries
+are written by `ShelfStore` in the same transaction as the item.
+
+Composite indexes extract a tuple of fields. Their entries support
+prefix-equality scans with a range on the next component.
+
+`IndexCursor` walks an index range in index order and resolves the matching
+shelf items. It exposes the same scan interface as `ShelfCursor`, so
+`ShelfQuery` transforms run on top of it unchanged.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Generator, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from .keycodec import encode_key, encoded_length, unpack_key
+from .schema import Item, Key
+
+if TYPE_CHECKING:
+    from .shelf import ShelfCursor, ShelfStore
+
+INDEX_DB_PREFIX = "__shelfdb_index__"
+MISSING: Any = object()
+
+# Open index bounds. No index entry starts with 0x00. After a complete encoded
+# value comes a packed item key or the next encoded value, neither of which
+# starts with 0xff, while a str or bytes value continuing past an embedded null
+# does. Appended to an encoded value, INDEX_MAX thus ends the entries of exactly
+# that value.
+INDEX_MIN = b"\x00"
+INDEX_MAX = b"\xff"
+
+
+def index_db_name(shelf: str, name: str) -> str:
+    """Return the LMDB named database used by index ``name`` of ``shelf``."""
+    return f"{INDEX_DB_PREFIX}:{shelf}:{name}"
+
+
+def field_getter(path: str | Sequence[str]) -> Callable[[Any], Any]:
+    """Return an extractor for a dotted field path such as ``"meta.tenant"``.
+
+    A sequence of paths returns an extractor of the tuple of their values.
+    The extractor returns `MISSING` when any path segment is absent, so items
+    without the field are left out of the index.
+    """
+    if not isinstance(path, str):
+        getters = tuple(field_getter(part) for part in path)
+
+        def extract_all(value: Any) -> Any:
+            values = tuple(getter(value) for getter in getters)
+            return MISSING if MISSING in values else values
+
+        return extract_all
+
+    parts = tuple(path.split("."))
+
+    def extract(value: Any) -> Any:
+        for part in parts:
+            if not isinstance(value, Mapping) or part not in value:
+                return MISSING
+            value = value[part]
+        return value
+
+    return extract
+
+
+class Index(NamedTuple):
+    """Secondary index over the values of one shelf.
+
+    Attributes
+    ----------
+    name : str
+        Index name, unique per shelf.
+    db : Any
+        Opened LMDB named database holding the index entries.
+    extract : Callable[[Any], Any]
+        Returns the indexed value for a shelf value, or `MISSING`.
+    fields : tuple[str, ...] | None
+        Indexed field paths, in index order, or ``None`` for an index built
+        from a key function.
+    include : tuple[str, ...]
+        Field paths stored in each entry of a covering index.
+    """
+
+    name: str
+    db: Any
+    extract: Callable[[Any], Any]
+    fields: tuple[str, ...] | None = None
+    include: tuple[str, ...] = ()
+
+    def entry(self, value: Any) -> bytes | None:
+        """Return the encoded indexed value of ``value``, if it is indexed."""
+        if value is MISSING:
+            return None
+        indexed = self.extract(value)
+        if indexed is MISSING:
+            return None
+        return encode_key(indexed)
+
+    def cover(self, value: Any) -> dict[str, Any]:
+        """Return the ``include`` fields of ``value`` stored by the entry."""
+        covered = {}
+        for path in self.include:
+            if (field := field_getter(path)(value)) is not MISSING:
+                covered[path] = field
+        return covered
+
+    def sorted_by(self, by: tuple[str, ...], fixed: int) -> bool:
+        """Return whether index order sorts items by the fields ``by``.
+
+        ``fixed`` is the number of leading fields held equal by the scan, which
+        may then be left out of ``by``.
+        """
+        if self.fields is None:
+            return False
+        return any(by == self.fields[skip:] for skip in range(fixed + 1))
+
+
+class IndexCursor:
+    """Index-ordered scan that resolves matching shelf items.
+
+    ``scan`` walks a range of the index database. ``fixed`` counts the leading
+    index fields the range holds equal. With ``covered=True``, items carry the
+    covered fields stored in the index instead of the full shelf value.
+
+    Key selectors (`select_key()`, `select_keys_range()`) replace the index
+    scan with a plain scan of the shelf, like they replace each other on
+    `ShelfCursor`.
+    """
+
+    def __init__(
+        self,
+        index: Index,
+        scan: ShelfCursor,
+        primary: ShelfCursor,
+        store: ShelfStore,
+        *,
+        fixed: int = 0,
+        covered: bool = False,
+    ):
+        self._index = index
+        self._scan = scan
+        self._primary = primary
+        self._store = store
+        self._fixed = fixed
+        self._covered = covered
+
+    @property
+    def lazy(self) -> bool:
+        """Return whether resolved values are wrapped in `LazyValue`."""
+        return self._primary.lazy
+
+    @property
+    def descending(self) -> bool:
+        """Return whether the index is scanned in descending order."""
+        return self._scan.descending
+
+    @property
+    def primary(self) -> ShelfCursor:
+        """Return the plain shelf scan this index scan resolves against."""
+        return self._primary
+
+    def _copy(self, scan: ShelfCursor) -> IndexCursor:
+        return IndexCursor(
+            self._index,
+            scan,
+            self._primary,
+            self._store,
+            fixed=self._fixed,
+            covered=self._covered,
+        )
+
+    def sorted_by(self, by: tuple[str, ...]) -> bool:
+        """Return whether the scan yields items sorted by the fields ``by``."""
+        return self._index.sorted_by(by, self._fixed)
+
+    def covers(self, fields: Sequence[str]) -> bool:
+        """Return whether index entries store every field in ``fields``."""
+        return set(fields) <= set(self._index.include)
+
+    def with_covered(self) -> IndexCursor:
+        """Return a copied scan yielding covered fields instead of shelf values."""
+        return IndexCursor(
+            self._index,
+            self._scan,
+            self._primary,
+            self._store,
+            fixed=self._fixed,
+            covered=True,
+        )
+
+    def asc(self) -> IndexCursor:
+        """Return a copied index scan with ascending order."""
+        return self._copy(self._scan.asc())
+
+    def desc(self) -> IndexCursor:
+        """Return a copied index scan with descending order."""
+        return self._copy(self._scan.desc())
+
+    def select_key(self, key: Key) -> ShelfCursor:
+        """Return a plain shelf scan narrowed to one key."""
+        return self._primary.select_key(key)
+
+    def select_keys_range(self, start: Key, stop: Key | None = None) -> ShelfCursor:
+        """Return a plain shelf scan narrowed to ``[start, stop)``."""
+        return self._primary.select_keys_range(start, stop)
+
+    def describe(self) -> str:
+        """Return the index name and the index scan as text."""
+        covered = " covered" if self._covered else ""
+        return f"index {self._index.name}{covered} {self._scan.describe()}"
+
+    def keys(self) -> Generator[Key, None, None]:
+        """Iterate shelf keys in index order."""
+        for entry, _ in self._scan.raw():
+            yield unpack_key(entry[encoded_length(entry) :])
+
+    def items(self) -> Generator[Item, None, None]:
+        """Iterate loaded shelf items, or covered items, in index order."""
+        if self._covered:
+            for entry, value in self._scan.raw():
+                key = unpack_key(entry[encoded_length(entry) :])
+                yield Item(key, self._store.unpack(value))
+            return
+        for key in self.keys():
+            if (value := self._store.get(key, MISSING)) is not MISSING:
+                yield Item(key, value)
+
+    def count(self) -> int:
+        """Count index entries in the selected range."""
+        return sum(1 for _ in self._scan.raw())
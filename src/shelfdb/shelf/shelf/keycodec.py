@@ -0,0 +1,260 @@
+"""Order-preserving binary encoding for shelf keys and index values.
+
+`encode_key` maps Python values to bytes whose lexicographic order matches the
+natural order of the values, so LMDB B-tree order is value order:
+
+- values of one type sort by value (``-1 < 0 < 2 < 10``)
+- ints and floats sort together by numeric value (``1 < 1.5 < 2``), and equal
+  numbers such as ``10`` and ``10.0`` encode to the same bytes
+- values of different types sort by a fixed type order: ``None``, bytes, str,
+  number, datetime, bool, tuple (or list)
+- aware datetimes sort by their UTC instant; naive datetimes sort by their
+  wall-clock value
+- tuples sort element by element, and a tuple sorts before every longer tuple
+  it is a prefix of
+
+Encodings are self-delimiting: a decoder always finds where one ends. One
+encoding can still be a prefix of another, since str and bytes end in a
+``0x00`` terminator and an embedded null encodes as ``0x00 0xff``, so ``"a"``
+encodes to a prefix of ``"a\x00b"``. No encoding starts with ``0x00`` or
+``0xff``, so ``encoded + b"\xff"`` bounds the byte strings that continue
+``encoded`` with another encoding or a packed key, and sorts before the longer
+values ``encoded`` is a prefix of.
+
+`pack_key` and `unpack_key` apply the encoding to shelf item keys. String keys
+keep their plain UTF-8 bytes, so existing shelves stay readable. Keys of other
+types get a ``0xfe`` marker byte, which never occurs in UTF-8, followed by
+their encoding. Typed keys therefore sort after every string key. Since equal
+numbers share one encoding, a float key with an integral value, such as
+``10.0``, is the same key as the int and reads back as ``10``. The marker
+is not ``0xff``: index entries append the packed key to an encoded value, and
+``0xff`` after a str or bytes terminator would read as an escaped null byte.
+
+`prefix_range` turns a key prefix into the packed key range holding exactly
+the keys that start with it.
+"""
+
+from __future__ import annotations
+
+import struct
+from datetime import UTC, datetime, timedelta
+from typing import Any, Final
+
+from .schema import Key
+
+_END: Final = 0x00
+_NULL: Final = 0x01
+_BYTES: Final = 0x02
+_STR: Final = 0x03
+_NUMBER: Final = 0x20
+_DATETIME: Final = 0x24
+_FALSE: Final = 0x26
+_TRUE: Final = 0x27
+_TUPLE: Final = 0x30
+
+_MAX_INT_BYTES: Final = 8
+_DOUBLE: Final = struct.Struct(">d")
+_UINT64: Final = struct.Struct(">Q")
+_REMAINDER: Final = struct.Struct(">H")
+_REMAINDER_BIAS: Final = 1 << 15
+_INT_LIMIT: Final = 1 << (8 * _MAX_INT_BYTES)
+_TYPED_KEY: Final = 0xFE
+_INT64_BIAS: Final = 1 << 63
+_MICROSECOND: Final = timedelta(microseconds=1)
+_EPOCH: Final = datetime(1970, 1, 1)
+_EPOCH_UTC: Final = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def _escape(data: bytes) -> bytes:
+    return data.replace(b"\x00", b"\x00\xff") + b"\x00"
+
+
+def _encode_number(value: int | float) -> bytes:
+    if isinstance(value, int) and abs(value) >= _INT_LIMIT:
+        raise ValueError("integer keys must fit in 8 bytes")
+    # Numbers sort by their nearest double, then by the remainder of ints a
+    # double can not hold exactly. Adding 0.0 turns -0.0 into 0.0.
+    approx = float(value) + 0.0
+    remainder = value - int(approx) if isinstance(value, int) else 0
+    (bits,) = _UINT64.unpack(_DOUBLE.pack(approx))
+    if bits & (1 << 63):
+        bits ^= (1 << 64) - 1
+    else:
+        bits ^= 1 << 63
+    return (
+        bytes((_NUMBER,))
+        + _UINT64.pack(bits)
+        + _REMAINDER.pack(remainder + _REMAINDER_BIAS)
+    )
+
+
+def _encode_datetime(value: datetime) -> bytes:
+    aware = value.utcoffset() is not None
+    micros = (value - (_EPOCH_UTC if aware else _EPOCH)) // _MICROSECOND
+    # Aware values come back in UTC; the trailing flag keeps naive ones naive.
+    return bytes((_DATETIME,)) + _UINT64.pack(micros + _INT64_BIAS) + bytes((aware,))
+
+
+def encode_prefix(values: tuple[Any, ...]) -> bytes:
+    """Encode the leading elements of a tuple without closing it.
+
+    Every tuple that starts with ``values`` encodes to bytes starting with the
+    result, so it can bound a range scan over composite values.
+    """
+    return bytes((_TUPLE,)) + b"".join(encode_key(value) for value in values)
+
+
+def encode_key(value: Any) -> bytes:
+    """Encode ``value`` into order-preserving bytes.
+
+    Raises
+    ------
+    TypeError
+        If ``value`` has an unsupported type.
+    ValueError
+        If an integer does not fit in 8 bytes.
+    """
+    if value is None:
+        return bytes((_NULL,))
+    if value is True:
+        return bytes((_TRUE,))
+    if value is False:
+        return bytes((_FALSE,))
+    if isinstance(value, (int, float)):
+        return _encode_number(value)
+    if isinstance(value, datetime):
+        return _encode_datetime(value)
+    if isinstance(value, str):
+        return bytes((_STR,)) + _escape(value.encode())
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes((_BYTES,)) + _escape(bytes(value))
+    if isinstance(value, (tuple, list)):
+        # Lists encode like tuples, as tuples arrive as lists over MessagePack.
+        return encode_prefix(tuple(value)) + bytes((_END,))
+    raise TypeError(f"unsupported key type: {type(value).__name__}")
+
+
+def _decode_escaped(data: bytes, pos: int) -> tuple[bytes, int]:
+    out = bytearray()
+    while True:
+        end = data.index(b"\x00", pos)
+        out += data[pos:end]
+        if end + 1 < len(data) and data[end + 1] == 0xFF:
+            out += b"\x00"
+            pos = end + 2
+            continue
+        return bytes(out), end + 1
+
+
+def _decode_at(data: bytes, pos: int) -> tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == _NULL:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _BYTES:
+        return _decode_escaped(data, pos)
+    if tag == _STR:
+        raw, pos = _decode_escaped(data, pos)
+        return raw.decode(), pos
+    if tag == _NUMBER:
+        (bits,) = _UINT64.unpack_from(data, pos)
+        if bits & (1 << 63):
+            bits ^= 1 << 63
+        else:
+            bits ^= (1 << 64) - 1
+        approx = _DOUBLE.unpack(_UINT64.pack(bits))[0]
+        remainder = _REMAINDER.unpack_from(data, pos + _UINT64.size)[0]
+        remainder -= _REMAINDER_BIAS
+        pos += _UINT64.size + _REMAINDER.size
+        # Integral numbers in the int range decode as ints, like `10.0 == 10`.
+        if remainder or (approx.is_integer() and abs(approx) < _INT_LIMIT):
+            return int(approx) + remainder, pos
+        return approx, pos
+    if tag == _TUPLE:
+        elements = []
+        while data[pos] != _END:
+            element, pos = _decode_at(data, pos)
+            elements.append(element)
+        return tuple(elements), pos + 1
+    if tag == _DATETIME:
+        (biased,) = _UINT64.unpack_from(data, pos)
+        aware = data[pos + _UINT64.size]
+        delta = (biased - _INT64_BIAS) * _MICROSECOND
+        return (_EPOCH_UTC if aware else _EPOCH) + delta, pos + _UINT64.size + 1
+    raise ValueError(f"unknown key type tag: {tag:#x}")
+
+
+def decode_key(data: bytes) -> Any:
+    """Decode bytes produced by `encode_key`."""
+    value, pos = _decode_at(data, 0)
+    if pos != len(data):
+        raise ValueError("trailing bytes after encoded key")
+    return value
+
+
+def encoded_length(data: bytes) -> int:
+    """Return the length of the encoded value at the start of ``data``."""
+    return _decode_at(data, 0)[1]
+
+
+def pack_key(key: Key) -> bytes:
+    """Encode a shelf item key into its LMDB key bytes.
+
+    Raises
+    ------
+    TypeError
+        If ``key`` has an unsupported type.
+    ValueError
+        If an integer does not fit in 8 bytes.
+    """
+    if type(key) is str:
+        return key.encode()
+    return bytes((_TYPED_KEY,)) + encode_key(key)
+
+
+def unpack_key(data: bytes) -> Key:
+    """Decode LMDB key bytes produced by `pack_key`."""
+    if data and data[0] == _TYPED_KEY:
+        return decode_key(data[1:])
+    return data.decode()
+
+
+def _successor(data: bytes) -> bytes | None:
+    # The smallest byte string greater than every string starting with `data`.
+    stripped = data.rstrip(b"\xff")
+    if not stripped:
+        return None
+    return stripped[:-1] + bytes((stripped[-1] + 1,))
+
+
+def prefix_range(prefix: str | bytes | tuple[Any, ...]) -> tuple[bytes, bytes | None]:
+    """Return the packed key range ``[start, stop)`` of keys starting with ``prefix``.
+
+    A str prefix matches str keys, a bytes prefix bytes keys, and a tuple
+    prefix the tuple keys whose leading elements equal it. ``stop`` is
+    ``None`` when the range runs to the end of the shelf.
+
+    Raises
+    ------
+    TypeError
+        If ``prefix`` is not a str, bytes or tuple.
+    """
+    if isinstance(prefix, str):
+        start = prefix.encode()
+        # UTF-8 never contains 0xfe, so only the empty prefix reaches typed keys.
+        return start, _successor(start) if start else bytes((_TYPED_KEY,))
+    if isinstance(prefix, (bytes, bytearray, memoryview)):
+        escaped = bytes(prefix).replace(b"\x00", b"\x00\xff")
+        start = bytes((_TYPED_KEY, _BYTES)) + escaped
+    elif isinstance(prefix, (tuple, list)):
+        start = bytes((_TYPED_KEY,)) + encode_prefix(tuple(prefix))
+        # Whole elements must match, so stop before a last str or bytes
+        # element continuing past an embedded null.
+        return start, start + b"\xff"
+    else:
+        raise TypeError(f"unsupported key prefix type: {type(prefix).__name__}")
+    return start, _successor(start)
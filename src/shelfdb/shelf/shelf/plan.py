@@ -0,0 +1,585 @@
+"""Inspectable plan nodes for `ShelfQuery` pipelines and the plan optimizer.
+
+`ShelfQuery` records each transform as a plan node rather than an opaque
+function. Before a query runs, `optimize()` rewrites the recorded nodes for
+the scan they run on:
+
+- a field-expression `filter()` over cached columns (see `columns`) selects
+  matching keys with vectorized masks instead of testing each value
+- a field-expression `filter()` over a whole-shelf scan reads matching items
+  through an index whose fields its equality tests fix, which keeps key
+  order; when the caller does not need order, range tests and leading
+  fields of composite indexes also select an index range
+- a default `sort()` over a key scan, or a `sort(by=...)` over an index ordered
+  by those fields, reuses the scan order instead of sorting, walking the scan
+  backwards when only per-item steps run before it
+- a slice right after a sort turns the sort into a bounded heap selection;
+  other sorts past their memory budget merge sorted runs spilled to disk
+- slices move ahead of `keys()` and `items()` toward the scan, and slices that
+  skip items also move ahead of loads, so skipped items are never loaded
+- loads whose values nothing reads are dropped, values that are already
+  loaded are not loaded again, and `keys()` over key-only items is skipped
+- a leading `items(fields=...)` projection over an index scan that covers
+  those fields reads the index entries instead of shelf values
+- a filter loads its own input in the same step, and when the first step
+  loads values the scan yields them straight from the cursor
+
+`Plan.explain()` renders the chosen plan, one step per line.
+"""
+
+from __future__ import annotations
+
+import heapq
+from builtins import filter as bfilter
+from collections.abc import Callable, Iterator
+from itertools import islice
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from .columns import ColumnCursor, expr_paths
+from .expr import Compare, Expr
+from .index import INDEX_MAX, INDEX_MIN, MISSING, Index, IndexCursor, field_getter
+from .keycodec import encode_key, encode_prefix, pack_key
+from .schema import UNDEF, Item
+from .shelf import MergedCursor, ShelfCursor, ShelfStore, decode_value
+from .spill import DEFAULT_SORT_BUFFER, spill_sorted
+
+# Scans a query selects. Planning may narrow one into a `ColumnCursor`, which
+# only lives in the plan and so has no selector methods.
+type Selection = ShelfCursor | MergedCursor | IndexCursor
+type Cursor = Selection | ColumnCursor
+type Loader = Callable[[Iterator[Item]], Iterator[Item]]
+type Node = Keys | Load | Project | Filter | FilterKeys | Slice | Sort | TopK
+
+
+class Keys(NamedTuple):
+    """Drop item values, as `keys()` does."""
+
+    keeps_count = True
+    keeps_order = True
+    per_item = True
+    reads_values = False
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        return (Item(item.key, UNDEF) for item in items)
+
+    def describe(self) -> str:
+        return "keys"
+
+
+class Load(NamedTuple):
+    """Load the value of each key-only item, as `items()` does."""
+
+    keeps_count = True
+    keeps_order = True
+    per_item = True
+    reads_values = False
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        return load(items)
+
+    def describe(self) -> str:
+        return "load"
+
+
+class Project(NamedTuple):
+    """Replace each value with its ``fields``, loading it first unless ``load`` is off.
+
+    Projected values map each field path to its value, like covering index
+    entries, and leave out missing fields. With ``covered``, values already
+    are covering index entries, so fields are looked up by path directly.
+    """
+
+    fields: tuple[str, ...]
+    load: bool = True
+    covered: bool = False
+
+    keeps_count = True
+    keeps_order = True
+    per_item = True
+    reads_values = True
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        items = load(items) if self.load else items
+        if self.covered:
+            fields = self.fields
+            for item in items:
+                value = item.value
+                yield Item(
+                    item.key, {path: value[path] for path in fields if path in value}
+                )
+            return
+        getters = tuple((path, field_getter(path)) for path in self.fields)
+        for item in items:
+            value = decode_value(item.value)
+            projected = {}
+            for path, get in getters:
+                if (field := get(value)) is not MISSING:
+                    projected[path] = field
+            yield Item(item.key, projected)
+
+    def describe(self) -> str:
+        source = " from index" if self.covered else ""
+        return f"project{'+load' if self.load else ''} {', '.join(self.fields)}{source}"
+
+
+class Filter(NamedTuple):
+    """Keep items matching ``fn``, loading their values first unless ``load`` is off.
+
+    ``expr`` is the field expression ``fn`` evaluates, if any.
+    """
+
+    fn: Callable[[Item], bool]
+    load: bool = True
+    expr: Expr | None = None
+
+    keeps_count = False
+    keeps_order = True
+    per_item = True
+    reads_values = True
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        return bfilter(self.fn, load(items) if self.load else items)
+
+    def describe(self) -> str:
+        test = _name(self.fn) if self.expr is None else repr(self.expr)
+        return f"filter{'+load' if self.load else ''} {test}"
+
+
+class FilterKeys(NamedTuple):
+    """Keep items whose key matches ``fn``, without loading values."""
+
+    fn: Callable[[Any], bool]
+
+    keeps_count = False
+    keeps_order = True
+    per_item = True
+    reads_values = False
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        fn = self.fn
+        return (item for item in items if fn(item.key))
+
+    def describe(self) -> str:
+        return f"filter keys {_name(self.fn)}"
+
+
+class Slice(NamedTuple):
+    """Slice the item stream, as `slice()` does."""
+
+    start: int | None = None
+    stop: int | None = None
+    step: int | None = None
+
+    keeps_count = False
+    keeps_order = True
+    per_item = False
+    reads_values = False
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        if self.step is None:
+            return islice(items, self.start, self.stop)
+        return islice(items, self.start, self.stop, self.step)
+
+    def describe(self) -> str:
+        bounds = ":".join(
+            "" if bound is None else str(bound)
+            for bound in (self.start, self.stop, self.step)
+        )
+        return f"slice [{bounds.removesuffix(':')}]"
+
+
+class Sort(NamedTuple):
+    """Sort items by ``key``, or by key order when ``key`` is ``None``.
+
+    ``by`` records the value fields ``key`` extracts for `sort(by=...)`, so the
+    optimizer can match them against index order. Past ``buffer`` items, the
+    sort spills sorted runs to disk and merges them (see `spill`).
+    """
+
+    key: Callable[[Item], Any] | None = None
+    reverse: bool = False
+    by: tuple[str, ...] | None = None
+    load: bool = True
+    buffer: int | None = DEFAULT_SORT_BUFFER
+
+    keeps_count = True
+    keeps_order = False
+    per_item = False
+
+    @property
+    def reads_values(self) -> bool:
+        """Return whether the sort key reads item values."""
+        return self.key is not None
+
+    def sort_key(self) -> Callable[[Item], Any]:
+        """Return the key function the sort orders items by."""
+        return _packed_key if self.key is None else self.key
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        items = load(items) if self.load else items
+        yield from spill_sorted(
+            items, self.sort_key(), reverse=self.reverse, buffer=self.buffer
+        )
+
+    def describe(self) -> str:
+        return f"sort{'+load' if self.load else ''} {_sort_order(self)}"
+
+
+class TopK(NamedTuple):
+    """Select the first ``count`` items a `Sort` with the same fields would yield."""
+
+    key: Callable[[Item], Any] | None = None
+    reverse: bool = False
+    by: tuple[str, ...] | None = None
+    load: bool = True
+    count: int = 0
+
+    keeps_count = False
+    keeps_order = False
+    per_item = False
+
+    @property
+    def reads_values(self) -> bool:
+        """Return whether the sort key reads item values."""
+        return self.key is not None
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        items = load(items) if self.load else items
+        select = heapq.nlargest if self.reverse else heapq.nsmallest
+        # Both selections are stable, like `sorted()`.
+        sort_key = _packed_key if self.key is None else self.key
+        yield from select(self.count, items, key=sort_key)
+
+    def describe(self) -> str:
+        return f"top{'+load' if self.load else ''} {self.count} {_sort_order(self)}"
+
+
+class Plan(NamedTuple):
+    """Optimized query plan returned by `optimize()`.
+
+    Attributes
+    ----------
+    cursor : Cursor
+        Scan the plan reads, possibly reversed by the optimizer.
+    scan_values : bool
+        Whether the scan yields loaded items instead of key-only items.
+    nodes : tuple[Node, ...]
+        Steps applied to the scanned items, in order.
+    """
+
+    cursor: Cursor
+    scan_values: bool
+    nodes: tuple[Node, ...]
+
+    def run(self, items: Iterator[Item], load: Loader) -> Iterator[Item]:
+        """Apply the plan steps to ``items`` scanned from ``cursor``."""
+        for node in self.nodes:
+            items = node.run(items, load)
+        return items
+
+    def explain(self) -> str:
+        """Return the plan as text, the scan first and then one step per line."""
+        scan = self.cursor.describe()
+        lines = [f"{scan} with values" if self.scan_values else scan]
+        lines.extend(node.describe() for node in self.nodes)
+        return "\n".join(lines)
+
+
+def optimize(
+    cursor: Selection,
+    nodes: tuple[Node, ...],
+    *,
+    values: bool = True,
+    ordered: bool = True,
+    store: ShelfStore | None = None,
+) -> Plan:
+    """Return the plan that runs ``nodes`` over ``cursor`` with the least work.
+
+    Pass ``values=False`` when the caller only reads keys or counts items, so
+    values that only the final items would carry are never loaded, and
+    ``ordered=False`` when it does not depend on the order of the items.
+    With ``store``, field-expression filters may switch to its indexes.
+    """
+    scan, steps = _reuse_scan_order(cursor, list(nodes))
+    if store is not None:
+        scan = _match_index(scan, steps, store, ordered)
+        scan, steps = _match_columns(scan, steps, store)
+    steps = _push_slices(_select_top(steps))
+    steps = _drop_dead_loads(steps, values)
+    scan, steps = _cover_projection(scan, steps)
+    scan_values = bool(steps) and _loads_input(steps[0])
+    return Plan(scan, scan_values, tuple(_skip_loaded(steps, scan_values)))
+
+
+def _reuse_scan_order(cursor: Cursor, nodes: list[Node]) -> tuple[Cursor, list[Node]]:
+    for pos, node in enumerate(nodes):
+        if isinstance(node, Sort) and _scan_sorted(cursor, node):
+            # The skipped sort still loads values, like the sort it replaces.
+            if cursor.descending == node.reverse:
+                nodes[pos] = Load()
+            elif all(earlier.per_item for earlier in nodes[:pos]):
+                # Walking the scan backwards selects the same items in the
+                # requested order.
+                cursor = cursor.desc() if node.reverse else cursor.asc()
+                nodes[pos] = Load()
+        if not nodes[pos].keeps_order:
+            break
+    return cursor, nodes
+
+
+def _scan_sorted(cursor: Cursor, sort: Sort) -> bool:
+    if sort.by is not None:
+        return isinstance(cursor, IndexCursor) and cursor.sorted_by(sort.by)
+    return sort.key is None and not isinstance(cursor, IndexCursor)
+
+
+def _match_index(
+    cursor: Cursor, nodes: list[Node], store: ShelfStore, ordered: bool
+) -> Cursor:
+    # Only whole-shelf scans switch, so the index range alone bounds the scan.
+    if not isinstance(cursor, ShelfCursor) or cursor.bounds != (None, None, None):
+        return cursor
+    expr = _leading_expr(nodes)
+    if expr is None:
+        return cursor
+    equal: dict[str, Any] = {}
+    lower: dict[str, Any] = {}
+    upper: dict[str, tuple[Any, bool]] = {}
+    for test in expr.conjuncts():
+        if not isinstance(test, Compare) or not _indexable(test.value, test.op):
+            continue
+        if test.op == "eq":
+            equal.setdefault(test.path, test.value)
+        elif test.op in ("gt", "ge"):
+            lower.setdefault(test.path, test.value)
+        elif test.op in ("lt", "le"):
+            upper.setdefault(test.path, (test.value, test.op == "le"))
+    best: tuple[int, Index, int] | None = None
+    for index in store.indexes:
+        if index.fields is None:
+            continue
+        fixed = 0
+        while fixed < len(index.fields) and index.fields[fixed] in equal:
+            fixed += 1
+        if fixed == len(index.fields):
+            # Entries sharing every indexed value sort by key, so a full
+            # equality match yields items in scan order.
+            score = 2 * fixed
+        elif ordered:
+            continue
+        else:
+            ranged = index.fields[fixed] in lower or index.fields[fixed] in upper
+            # Items missing any indexed field have no entry, so the index
+            # only holds every match when the filter tests each field.
+            if fixed + ranged < len(index.fields):
+                continue
+            score = 2 * fixed + ranged
+        if score and (best is None or score > best[0]):
+            best = (score, index, fixed)
+    if best is None:
+        return cursor
+    _, index, fixed = best
+    assert index.fields is not None
+    prefix = tuple(equal[path] for path in index.fields[:fixed])
+    if fixed == len(index.fields):
+        start = encode_key(prefix[0] if fixed == 1 else prefix)
+        return _index_cursor(store, index, cursor, start, start + INDEX_MAX, fixed)
+    path = index.fields[fixed]
+    base = encode_prefix(prefix) if len(index.fields) > 1 else b""
+    start = base + encode_key(lower[path]) if path in lower else base or INDEX_MIN
+    if path in upper:
+        bound, inclusive = upper[path]
+        stop: bytes | None = base + encode_key(bound)
+        if inclusive:
+            stop += INDEX_MAX
+    else:
+        stop = base + INDEX_MAX if base else None
+    return _index_cursor(store, index, cursor, start, stop, fixed)
+
+
+def _match_columns(
+    cursor: Cursor, nodes: list[Node], store: ShelfStore
+) -> tuple[Cursor, list[Node]]:
+    if not isinstance(cursor, (ShelfCursor, MergedCursor)):
+        return cursor, nodes
+    pos = _leading_filter(nodes)
+    if pos is None:
+        return cursor, nodes
+    expr = _filter_expr(nodes[pos])
+    columns = store.columns(expr_paths(expr))
+    if columns is None:
+        return cursor, nodes
+    # The column scan applies the filter exactly; the load it did remains.
+    nodes[pos] = Load()
+    return ColumnCursor(columns, cursor, expr, store), nodes
+
+
+def _leading_expr(nodes: list[Node]) -> Expr | None:
+    pos = _leading_filter(nodes)
+    return None if pos is None else _filter_expr(nodes[pos])
+
+
+def _filter_expr(node: Node) -> Expr:
+    assert isinstance(node, Filter) and node.expr is not None
+    return node.expr
+
+
+def _leading_filter(nodes: list[Node]) -> int | None:
+    # Steps before the filter must not depend on which items the scan yields.
+    for pos, node in enumerate(nodes):
+        if isinstance(node, Filter) and node.expr is not None:
+            return pos
+        if not isinstance(node, (Keys, Load, Filter, FilterKeys)):
+            return None
+    return None
+
+
+def _indexable(value: Any, op: str) -> bool:
+    # Index entries keep bool values apart from numbers, while Python
+    # compares ``True == 1``, so numeric tests always scan.
+    if value is None:
+        return op == "eq"
+    return isinstance(value, (str, bytes, datetime))
+
+
+def _index_cursor(
+    store: ShelfStore,
+    index: Index,
+    cursor: ShelfCursor,
+    start: bytes,
+    stop: bytes | None,
+    fixed: int,
+) -> IndexCursor:
+    return store.index_cursor(
+        index.name,
+        start,
+        stop,
+        primary=cursor,
+        descending=cursor.descending,
+        fixed=fixed,
+    )
+
+
+def _select_top(nodes: list[Node]) -> list[Node]:
+    steps: list[Node] = []
+    for node in nodes:
+        last = steps[-1] if steps else None
+        if (
+            isinstance(node, Slice)
+            and isinstance(last, Sort)
+            and node.step is None
+            and node.stop is not None
+            and node.stop >= 0
+            and (node.start is None or node.start >= 0)
+        ):
+            steps[-1] = TopK(last.key, last.reverse, last.by, last.load, node.stop)
+            if not node.start:
+                continue
+        steps.append(node)
+    return steps
+
+
+def _push_slices(nodes: list[Node]) -> list[Node]:
+    steps: list[Node] = []
+    for node in nodes:
+        pos = len(steps)
+        if isinstance(node, Slice):
+            # A slice that only stops early reads no more values after a load
+            # than before it; one that skips items saves loading them.
+            movable = (Keys, Load) if node.start else (Keys,)
+            while pos and isinstance(steps[pos - 1], movable):
+                pos -= 1
+        steps.insert(pos, node)
+    return steps
+
+
+def _drop_dead_loads(nodes: list[Node], values: bool) -> list[Node]:
+    # Walk backwards, tracking whether later steps read the values a step yields.
+    steps: list[Node] = []
+    live = values
+    for node in reversed(nodes):
+        if isinstance(node, (Load, Project)):
+            if not live:
+                continue
+        elif isinstance(node, (Sort, TopK)) and not node.reads_values:
+            node = node._replace(load=live)
+        steps.append(node)
+        if not isinstance(node, (FilterKeys, Slice)):
+            # Every other step either drops values or loads the ones it needs.
+            live = False
+    steps.reverse()
+    return steps
+
+
+def _loads_input(node: Node) -> bool:
+    if isinstance(node, Load):
+        return True
+    return isinstance(node, (Project, Filter, Sort, TopK)) and node.load
+
+
+def _cover_projection(cursor: Cursor, nodes: list[Node]) -> tuple[Cursor, list[Node]]:
+    # A leading projection of covered fields reads the index entries alone.
+    first = nodes[0] if nodes else None
+    if not isinstance(first, Project) or first.covered:
+        return cursor, nodes
+    if not isinstance(cursor, IndexCursor) or not cursor.covers(first.fields):
+        return cursor, nodes
+    return cursor.with_covered(), [first._replace(covered=True), *nodes[1:]]
+
+
+def _skip_loaded(nodes: list[Node], loaded: bool) -> list[Node]:
+    steps: list[Node] = []
+    for node in nodes:
+        if isinstance(node, Load):
+            if loaded:
+                continue
+            loaded = True
+        elif isinstance(node, Keys):
+            if not loaded:
+                continue
+            loaded = False
+        elif isinstance(node, (Project, Filter, Sort, TopK)) and node.load:
+            if loaded:
+                node = node._replace(load=False)
+            loaded = True
+        steps.append(node)
+    return steps
+
+
+def _name(fn: Callable[..., Any]) -> str:
+    return getattr(fn, "__qualname__", repr(fn))
+
+
+def _sort_order(sort: Sort | TopK) -> str:
+    if sort.by is not None:
+        order = f"by {', '.join(sort.by)}"
+    elif sort.key is None:
+        order = "by key order"
+    else:
+        order = f"by {_name(sort.key)}"
+    return f"{order} reverse" if sort.reverse else order
+
+
+def _packed_key(item: Item) -> bytes:
+    # Packed keys sort in scan order, even across key types.
+    return pack_key(item.key)
+
+
+def field_sort_key(fields: tuple[str, ...]) -> Callable[[Item], bytes]:
+    """Return a sort key ordering items by the value fields ``fields``.
+
+    Items missing a field sort as if it were ``None``.
+    """
+    getters = tuple(field_getter(path) for path in fields)
+
+    def sort_key(item: Item) -> bytes:
+        value = decode_value(item.value)
+        parts = tuple(
+            None if part is MISSING else part
+            for part in (get(value) for get in getters)
+        )
+        # Sort by the index encoding so field sorts match index order exactly.
+        return encode_key(parts[0] if len(parts) == 1 else parts)
+
+    return sort_key
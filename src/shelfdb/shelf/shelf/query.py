@@ -2,27 +2,63 @@
 
 `ShelfQuery` combines two layers cleanly:
 
-- selector methods (`key()`, `keys_range()`, `asc()`, `desc()`) copy the wrapped
-  cursor scan state
-- transform methods (`keys()`, `items()`, `filter()`, `slice()`, `sort()`) wrap
-  the selected stream without mutating cursor state
+- selector methods (`key()`, `keys_range()`, `prefix()`, `asc()`, `desc()`,
+  and `index(name).eq()` / `.range()`) copy the wrapped cursor scan state
+- transform methods (`keys()`, `items()`, `filter()`, `filter_keys()`,
+  `slice()`, `sort()`) wrap the selected stream without mutating cursor state
 - read/write helpers delegate to the internal store helper
+- `aggregate()` and `group_by().agg()` fold the selection into totals in one
+  streaming pass, or with vectorized array operations when the shelf caches
+  every field they read as a column (see `columns`)
+
+Transforms are recorded as inspectable plan nodes (see `plan`). Each run
+first compiles them with `optimize()`, which reuses scan order instead of
+sorting, turns `sort().slice()` into a heap selection, moves slices toward the
+scan and drops loads whose values nothing reads. `explain()` shows the result.
 
 Iteration starts from the copied shelf scan, yields key-only `Item(key, UNDEF)`
-entries by default, and then applies transforms.
+entries by default, and then applies the plan. When the first step needs
+values (`items()`, `filter()`, `sort()`), the scan yields loaded items straight
+from the cursor instead, so each value is read in the same pass as its key.
+
+`update()` and `delete()` over a shelf key scan run the query pipeline on a
+`WriteScan`, so each selected item is rewritten or removed at the cursor
+position in the same pass that reads it.
+
+Over a lazy (``buffers=True``) read transaction, values stay undecoded
+`LazyValue` wrappers while they move through the pipeline, and only the items
+the query finally yields are decoded.
 """
 
 from __future__ import annotations
 
-from builtins import filter as bfilter
-from collections.abc import Callable, Iterable, Iterator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
 from itertools import islice
 from typing import Any
 
-from .schema import UNDEF, Item, MutationResult
-from .shelf import ShelfCursor, ShelfStore
-
-type Transform = Callable[[Iterator[Item]], Iterator[Item]]
+from .aggregate import Aggregation, FieldSpec, GroupBy
+from .codec import packb, unpackb
+from .columns import ColumnSet, expr_paths
+from .expr import Expr
+from .index import INDEX_MAX, INDEX_MIN, MISSING, IndexCursor
+from .keycodec import encode_key, encode_prefix, pack_key, prefix_range, unpack_key
+from .plan import (
+    Filter,
+    FilterKeys,
+    Keys,
+    Load,
+    Node,
+    Plan,
+    Project,
+    Selection,
+    Slice,
+    Sort,
+    field_sort_key,
+    optimize,
+)
+from .schema import UNDEF, Item, Key, MutationResult, MutationSummary, Page
+from .shelf import MergedCursor, ShelfCursor, ShelfStore, decode_value
 
 
 class ShelfQuery:
@@ -37,14 +73,14 @@ class ShelfQuery:
 
     def __init__(
         self,
-        cursor: ShelfCursor | ShelfQuery,
+        cursor: Selection | ShelfQuery,
         store: ShelfStore | None = None,
-        transforms: tuple[Transform, ...] | None = None,
+        nodes: tuple[Node, ...] | None = None,
     ):
         if isinstance(cursor, ShelfQuery):
             self._cursor = cursor._cursor
             self._store = cursor._store
-            self._transforms = cursor._transforms if transforms is None else transforms
+            self._nodes = cursor._nodes if nodes is None else nodes
             return
 
         if store is None:
@@ -52,35 +88,53 @@ class ShelfQuery:
 
         self._cursor = cursor
         self._store = store
-        self._transforms = () if transforms is None else transforms
+        self._nodes = () if nodes is None else nodes
 
     def __iter__(self) -> Iterator[Item]:
-        """Iterate the current base scan, then apply transforms."""
-        items: Iterator[Item] = (Item(key, UNDEF) for key in self._cursor.keys())
-        for transform in self._transforms:
-            items = transform(items)
+        """Iterate the current base scan, then apply the optimized plan."""
+        return self._run(self._compile())
+
+    def _compile(self, *, values: bool = True, ordered: bool = True) -> Plan:
+        return optimize(
+            self._cursor, self._nodes, values=values, ordered=ordered, store=self._store
+        )
+
+    def _run(
+        self,
+        plan: Plan,
+        items: Iterator[Item] | None = None,
+        *,
+        decode: bool = True,
+    ) -> Iterator[Item]:
+        if items is None and plan.scan_values:
+            items = plan.cursor.items()
+        elif items is None:
+            items = (Item(key, UNDEF) for key in plan.cursor.keys())
+        items = plan.run(items, self._load_items)
+        if decode and plan.cursor.lazy:
+            items = (Item(item.key, decode_value(item.value)) for item in items)
         return items
 
     def _new(
         self,
         *,
-        cursor: ShelfCursor | None = None,
+        cursor: Selection | None = None,
         store: ShelfStore | None = None,
-        transforms: tuple[Transform, ...] | None = None,
+        nodes: tuple[Node, ...] | None = None,
     ) -> ShelfQuery:
         return ShelfQuery(
             self._cursor if cursor is None else cursor,
             self._store if store is None else store,
-            self._transforms if transforms is None else transforms,
+            self._nodes if nodes is None else nodes,
         )
 
-    def _append_transform(self, transform: Transform) -> ShelfQuery:
-        return self._new(transforms=self._transforms + (transform,))
+    def _append(self, node: Node) -> ShelfQuery:
+        return self._new(nodes=self._nodes + (node,))
 
     def _load_items(self, items: Iterator[Item]) -> Iterator[Item]:
         for item in items:
             if item.value is UNDEF:
-                if (value := self._store.get(item.key)) is not None:
+                if (value := self._store.get(item.key, MISSING)) is not MISSING:
                     yield Item(item.key, value)
             else:
                 yield item
@@ -93,39 +147,133 @@ class ShelfQuery:
         """Return the query with descending base scan order."""
         return self._new(cursor=self._cursor.desc())
 
-    def key(self, key: str) -> ShelfQuery:
+    def key(self, key: Key) -> ShelfQuery:
         """Return the query narrowed to one key."""
         return self._new(cursor=self._cursor.select_key(key))
 
-    def keys_range(self, start: str, stop: str | None = None) -> ShelfQuery:
+    def keys_range(self, start: Key, stop: Key | None = None) -> ShelfQuery:
         """Return the query narrowed to keys in ``[start, stop)``."""
         return self._new(cursor=self._cursor.select_keys_range(start, stop))
 
+    def prefix(self, *prefixes: str | bytes | tuple[Any, ...]) -> ShelfQuery:
+        """Return the query narrowed to keys starting with any of ``prefixes``.
+
+        Each prefix becomes one seek-and-scan range that ends at the first key
+        without the prefix. Several prefixes are scanned in key order, and a
+        prefix inside another one is only scanned once.
+
+        Raises
+        ------
+        TypeError
+            If no prefix is given, or a prefix is not a str, bytes or tuple.
+        """
+        if not prefixes:
+            raise TypeError("prefix() requires at least one prefix")
+        ranges: list[tuple[bytes, bytes | None]] = []
+        for start, stop in sorted(map(prefix_range, prefixes)):
+            # Prefix ranges either nest or are disjoint.
+            last_stop = ranges[-1][1] if ranges else b""
+            if last_stop is None or start < last_stop:
+                continue
+            ranges.append((start, stop))
+        primary = self._cursor.primary
+        parts = tuple(primary.select_raw_range(start, stop) for start, stop in ranges)
+        return self._new(cursor=parts[0] if len(parts) == 1 else MergedCursor(parts))
+
+    def index(self, name: str, *, covered: bool = False) -> IndexSelector:
+        """Return a selector over the secondary index called ``name``.
+
+        With ``covered=True``, item values are the ``include`` fields stored in
+        the index, so shelf values are never read.
+
+        Raises
+        ------
+        ValueError
+            If the shelf has no such index, or ``covered`` is requested for an
+            index without ``include`` fields.
+        """
+        if covered and not self._store.index(name).include:
+            raise ValueError(f"index {name} does not cover any fields")
+        return IndexSelector(self, name, covered)
+
+    def _select_index(
+        self,
+        name: str,
+        start: bytes,
+        stop: bytes | None,
+        *,
+        fixed: int,
+        covered: bool,
+    ) -> ShelfQuery:
+        cursor = self._store.index_cursor(
+            name,
+            start,
+            stop,
+            primary=self._cursor.primary,
+            descending=self._cursor.descending,
+            fixed=fixed,
+            covered=covered,
+        )
+        return self._new(cursor=cursor)
+
     def keys(self) -> ShelfQuery:
         """Project the current query to key-only items."""
+        return self._append(Keys())
 
-        def transform(items: Iterator[Item]) -> Iterator[Item]:
-            yield from (Item(item.key, UNDEF) for item in items)
+    def items(self, *, fields: Sequence[str] | None = None) -> ShelfQuery:
+        """Project the current query to loaded key/value items.
 
-        return self._append_transform(transform)
-
-    def items(self) -> ShelfQuery:
-        """Project the current query to loaded key/value items."""
-        return self._append_transform(self._load_items)
+        With ``fields``, each value becomes a dict of those dotted field paths,
+        keyed by path, without missing fields, so less data reaches the
+        caller. Over an index scan whose entries cover ``fields``, the values
+        come from the index without reading the shelf.
+        """
+        if fields is None:
+            return self._append(Load())
+        return self._append(
+            Project((fields,) if isinstance(fields, str) else tuple(fields))
+        )
 
-    def put(self, key: str, value: Any) -> MutationResult:
+    def put(self, key: Key, value: Any) -> MutationResult:
         """Store a single key/value pair in the current shelf."""
         return self._store.put(key, value)
 
-    def put_many(self, items: Iterable[Item]) -> list[MutationResult]:
-        """Store multiple key/value pairs in the current shelf."""
-        return self._store.put_many(items)
+    def put_many(
+        self,
+        items: Iterable[Item],
+        *,
+        bulk: bool = False,
+        results: bool = True,
+    ) -> list[MutationResult] | MutationSummary:
+        """Store multiple key/value pairs in the current shelf.
+
+        Use ``bulk=True`` for large loads, ideally sorted by key, and
+        ``results=False`` to receive a `MutationSummary` instead of per-item
+        results.
+        """
+        return self._store.put_many(items, bulk=bulk, results=results)
 
-    def filter(self, fn: Callable[[Item], bool]) -> ShelfQuery:
-        """Filter the current query results."""
-        return self._append_transform(
-            lambda items: bfilter(fn, self._load_items(items))
-        )
+    def filter(self, fn: Callable[[Item], bool] | Expr) -> ShelfQuery:
+        """Filter the current query results.
+
+        ``fn`` is a function of the item, or a field expression such as
+        ``(F("meta.tenant") == "acme") & F("active")``. An expression over a
+        whole-shelf scan reads matching items through an index when one
+        covers its equality tests, or for order-free actions such as
+        `count()` and `aggregate()`, its range tests.
+        """
+        if isinstance(fn, Expr):
+            return self._append(Filter(fn.matches(), expr=fn))
+        return self._append(Filter(fn))
+
+    def filter_keys(self, fn: Callable[[Key], bool]) -> ShelfQuery:
+        """Filter the current query results by key alone.
+
+        ``fn`` receives each item key. Unlike `filter()`, no value is loaded
+        to run it, so ``filter_keys(...).slice(0, 100).items()`` only reads the
+        100 values it returns.
+        """
+        return self._append(FilterKeys(fn))
 
     def slice(
         self,
@@ -133,43 +281,138 @@ class ShelfQuery:
         stop: int | None = None,
         step: int | None = None,
     ) -> ShelfQuery:
-        """Slice the current query results."""
-
-        def transform(items: Iterator[Item]) -> Iterator[Item]:
-            if step is None:
-                yield from islice(items, start, stop)
-            else:
-                yield from islice(items, start, stop, step)
+        """Slice the current query results.
 
-        return self._append_transform(transform)
+        Right after `sort()`, a slice with non-negative ``start`` and ``stop``
+        and no ``step`` keeps only the first ``stop`` sorted items in a heap
+        instead of sorting every item.
+        """
+        return self._append(Slice(start, stop, step))
 
     def sort(
         self,
         key: Callable[[Item], Any] | None = None,
         reverse: bool = False,
+        *,
+        by: str | tuple[str, ...] | None = None,
+        buffer: int | None = None,
     ) -> ShelfQuery:
-        """Sort the current query results."""
-
-        def transform(items: Iterator[Item]) -> Iterator[Item]:
-            loaded_items = tuple(self._load_items(items))
-            if key is None:
-                yield from sorted(
-                    loaded_items,
-                    key=lambda item: item.key,
-                    reverse=reverse,
-                )
-            else:
-                yield from sorted(loaded_items, key=key, reverse=reverse)
+        """Sort the current query results.
 
-        return self._append_transform(transform)
+        ``by`` sorts by dotted value fields instead of ``key``, in index order.
+        Items missing a field sort as if it were ``None``. When the query scans
+        an index ordered by those fields, no sorting is done. Without ``key``
+        or ``by``, items sort by key, which a key scan already yields in order.
+
+        Past ``buffer`` items, by default the database's ``sort_buffer``,
+        sorted runs are spilled to temporary files and merged as the results
+        stream, so memory use stays bounded however many items are sorted.
+
+        Raises
+        ------
+        ValueError
+            If both ``key`` and ``by`` are given, or ``buffer`` is not
+            positive.
+        """
+        if buffer is None:
+            buffer = self._store.sort_buffer
+        elif buffer < 1:
+            raise ValueError("sort buffer must be positive")
+        if by is None:
+            return self._append(Sort(key, reverse, buffer=buffer))
+        if key is not None:
+            raise ValueError("sort accepts key or by, not both")
+        fields = (by,) if isinstance(by, str) else tuple(by)
+        return self._append(
+            Sort(field_sort_key(fields), reverse, fields, buffer=buffer)
+        )
+
+    def explain(self) -> str:
+        """Return the optimized plan the query runs, one step per line.
+
+        The first line is the scan, with its direction and raw key bounds, and
+        ends in ``with values`` when the scan reads values along with keys.
+        Each following line is one step applied to the scanned items.
+        """
+        return self._compile().explain()
 
     def count(self) -> int:
-        """Return the number of selected items."""
-        return sum(1 for _ in self)
+        """Return the number of selected items.
+
+        When no transform can change the number of items, the count comes from
+        the cursor, which answers whole-shelf scans from LMDB B-tree stats.
+        """
+        if all(node.keeps_count for node in self._nodes):
+            return self._cursor.count()
+        plan = self._compile(values=False, ordered=False)
+        return sum(1 for _ in self._run(plan))
 
     def exists(self) -> bool:
         """Return ``True`` when at least one item is selected."""
-        return next(iter(self), None) is not None
+        items = self._run(self._compile(values=False, ordered=False))
+        return next(items, None) is not None
+
+    def aggregate(self, **fields: FieldSpec) -> dict[str, Any]:
+        """Aggregate value fields of the selected items in one pass.
+
+        Each keyword names an aggregate (``count``, ``sum``, ``min``, ``max``
+        or ``avg``) and its value is the dotted field path it reads, or a list
+        of paths. ``count=True`` counts the selected items.
+
+        Only running totals are kept, so memory use does not grow with the
+        selection. Items missing a field, or holding ``None`` in it, are
+        left out of that field's aggregates.
+
+        Returns
+        -------
+        dict[str, Any]
+            One result per keyword, or for a list of paths one result per path.
+
+        Raises
+        ------
+        TypeError
+            If no aggregate is requested.
+        ValueError
+            If an aggregate is unknown, or ``True`` is used with another
+            aggregate than ``count``.
+        """
+        aggregation = Aggregation(fields)
+        if (selection := self._column_selection(aggregation.paths)) is not None:
+            return aggregation.run_columns(*selection)
+        items = self._aggregate_items(aggregation.reads_values, ordered=False)
+        return aggregation.run(items)
+
+    def _column_selection(self, paths: set[str]) -> tuple[ColumnSet, Any] | None:
+        # Cached columns answer scans narrowed only by field expressions.
+        if not isinstance(self._cursor, (ShelfCursor, MergedCursor)):
+            return None
+        exprs = []
+        for node in self._nodes:
+            if isinstance(node, Filter) and node.expr is not None:
+                exprs.append(node.expr)
+            elif not isinstance(node, (Keys, Load)):
+                return None
+        for expr in exprs:
+            paths = paths | expr_paths(expr)
+        if not paths or (columns := self._store.columns(paths)) is None:
+            return None
+        return columns, columns.select(self._cursor, exprs)
+
+    def group_by(self, key: str | Sequence[str] | Callable[[Item], Any]) -> GroupBy:
+        """Group the selected items for `GroupBy.agg()`.
+
+        ``key`` is a dotted field path, a sequence of paths grouping by their
+        tuple of values, or a function of the item. Items missing a grouped
+        field fall in its ``None`` group.
+        """
+        return GroupBy(self, key)
+
+    def _aggregate_items(self, values: bool, *, ordered: bool) -> Iterator[Item]:
+        # Aggregates decode values themselves, so lazy values stay undecoded
+        # until a field is read.
+        query = self.items() if values else self
+        plan = query._compile(values=values, ordered=ordered)
+        return query._run(plan, decode=False)
 
     def item(self) -> Item:
         """Return the single selected item.
@@ -187,14 +430,191 @@ class ShelfQuery:
             raise ValueError("expected exactly one selected item, found many")
         return first
 
-    def update(self, fn: Callable[[Item], Any]) -> list[MutationResult]:
-        """Update the selected items using ``fn``."""
-        results: list[MutationResult] = []
-        for item in self.items():
-            results.append(self._store.put(item.key, fn(item)))
-        return results
-
-    def delete(self) -> list[MutationResult]:
-        """Delete the selected items."""
-        keys = tuple(item.key for item in self)
-        return self._store.delete(keys)
+    def update(
+        self,
+        fn: Callable[[Item], Any],
+        *,
+        results: bool = True,
+    ) -> list[MutationResult] | MutationSummary:
+        """Update the selected items using ``fn``.
+
+        Over a shelf key scan, each item is rewritten at the cursor position
+        as the scan reaches it. ``results=False`` returns a `MutationSummary`
+        instead of one `MutationResult` per item, so memory use stays flat
+        however many items are updated.
+
+        To update more items than one transaction should hold, use
+        `DB.update_chunked()`.
+        """
+        return _collect(self._update_mutations(fn), results)
+
+    def delete(self, *, results: bool = True) -> list[MutationResult] | MutationSummary:
+        """Delete the selected items.
+
+        Over a shelf key scan, each item is deleted at the cursor position as
+        the scan reaches it. ``results=False`` returns a `MutationSummary`
+        instead of one `MutationResult` per item.
+
+        To delete more items than one transaction should hold, use
+        `DB.delete_chunked()`.
+        """
+        return _collect(self._delete_mutations(), results)
+
+    def _update_mutations(
+        self, fn: Callable[[Item], Any], *, ordered: bool = False
+    ) -> Generator[MutationResult, None, None]:
+        plan = self.items()._compile(ordered=ordered)
+        if isinstance(plan.cursor, (ShelfCursor, MergedCursor)):
+            scan = self._store.write_scan(plan.cursor, values=plan.scan_values)
+            for item in self._run(plan, iter(scan)):
+                yield MutationResult(key=item.key, ok=scan.replace(item.key, fn(item)))
+            return
+        # Writes move index entries under an index scan, and other scans have
+        # no shelf cursor to write at, so the selection is read in full first.
+        for item in tuple(self._run(plan)):
+            yield self._store.put(item.key, fn(item))
+
+    def _delete_mutations(
+        self, *, ordered: bool = False
+    ) -> Generator[MutationResult, None, None]:
+        plan = self._compile(values=False, ordered=ordered)
+        if isinstance(plan.cursor, (ShelfCursor, MergedCursor)):
+            scan = self._store.write_scan(plan.cursor, values=plan.scan_values)
+            for item in self._run(plan, iter(scan)):
+                yield MutationResult(key=item.key, ok=scan.delete(item.key))
+            return
+        # Deletes move index entries under an index scan, and other scans have
+        # no shelf cursor to write at, so the selected keys are read in full
+        # first. Each key is deleted as its result is taken, so callers that
+        # stop early leave the rest in place.
+        keys = tuple(item.key for item in self._run(plan))
+        for key in keys:
+            yield from self._store.delete((key,))
+
+    def page(self, size: int, after: str | None = None) -> Page:
+        """Return up to ``size`` selected items and a token for the next page.
+
+        Pass ``Page.token`` back as ``after`` to get the next page. The token
+        records the last key, so the next page seeks straight past it instead
+        of skipping earlier items, and items written meanwhile do not shift
+        page boundaries. ``token`` is ``None`` on the last page.
+
+        Raises
+        ------
+        ValueError
+            If ``size`` is not positive, ``after`` is not a token for this
+            selection and direction, or the selection scans an index or uses
+            `slice()` or `sort()`.
+        """
+        if size < 1:
+            raise ValueError("page size must be positive")
+        scope = [self._cursor.descending, _scan_bounds(self._cursor)]
+        query = self._resume_after(None)
+        if after is not None:
+            query = query._resume_after(_read_page_token(after, scope))
+        items = list(islice(query, size + 1))
+        if len(items) <= size:
+            return Page(items, None)
+        items.pop()
+        return Page(items, _page_token(items[-1].key, scope))
+
+    def _resume_after(self, key: Key | None) -> ShelfQuery:
+        """Return the query narrowed to items its scan reaches after ``key``.
+
+        Raises
+        ------
+        ValueError
+            If the selection can not be resumed by key: it scans an index, or
+            uses `slice()` or `sort()`, whose output depends on earlier items.
+        """
+        if isinstance(self._cursor, IndexCursor):
+            raise ValueError("resuming by key requires a key scan, not an index")
+        if not all(node.per_item for node in self._nodes):
+            raise ValueError("resuming by key does not support slice() or sort()")
+        if key is None:
+            return self
+        return self._new(cursor=self._cursor.select_after(key))
+
+
+def _scan_bounds(cursor: Selection) -> list[list[bytes | None]]:
+    scans = cursor.scans if isinstance(cursor, MergedCursor) else (cursor,)
+    return [list(scan.bounds) for scan in scans if isinstance(scan, ShelfCursor)]
+
+
+def _page_token(key: Key, scope: list[Any]) -> str:
+    return urlsafe_b64encode(packb([pack_key(key), *scope])).decode()
+
+
+def _read_page_token(token: str, scope: list[Any]) -> Key:
+    try:
+        key, *token_scope = unpackb(urlsafe_b64decode(token))
+    except Exception as exc:
+        raise ValueError("invalid page token") from exc
+    if token_scope != scope:
+        raise ValueError("page token belongs to a different selection or order")
+    return unpack_key(key)
+
+
+def _collect(
+    mutations: Iterable[MutationResult], results: bool
+) -> list[MutationResult] | MutationSummary:
+    if results:
+        return list(mutations)
+    total = ok_count = 0
+    for mutation in mutations:
+        total += 1
+        ok_count += mutation.ok
+    return MutationSummary(total=total, ok=ok_count)
+
+
+class IndexSelector:
+    """Selector over one secondary index, returned by `ShelfQuery.index()`.
+
+    Both selectors replace the query's base scan with an index scan. Items come
+    back in index order, following the query's `asc()` / `desc()` direction.
+    """
+
+    def __init__(self, query: ShelfQuery, name: str, covered: bool = False):
+        self._query = query
+        self._name = name
+        self._covered = covered
+        self._width = len(query._store.index(name).fields or (None,))
+
+    def eq(self, value: Any) -> ShelfQuery:
+        """Select items whose indexed value equals ``value``.
+
+        For a composite index, ``value`` is the full tuple of field values.
+        """
+        start = encode_key(value)
+        return self._select(start, start + INDEX_MAX, self._width)
+
+    def range(
+        self,
+        start: Any = None,
+        stop: Any = None,
+        *,
+        prefix: tuple[Any, ...] = (),
+    ) -> ShelfQuery:
+        """Select items whose indexed value is in ``[start, stop)``.
+
+        ``None`` leaves that side of the range open. On a composite index,
+        ``prefix`` holds the leading field values equal, and ``start`` and
+        ``stop`` then bound the next field.
+        """
+        if not prefix:
+            return self._select(
+                INDEX_MIN if start is None else encode_key(start),
+                None if stop is None else encode_key(stop),
+                0,
+            )
+        base = encode_prefix(tuple(prefix))
+        return self._select(
+            base if start is None else base + encode_key(start),
+            base + (INDEX_MAX if stop is None else encode_key(stop)),
+            len(prefix),
+        )
+
+    def _select(self, start: bytes, stop: bytes | None, fixed: int) -> ShelfQuery:
+        return self._query._select_index(
+            self._name, start, stop, fixed=fixed, covered=self._covered
+        )
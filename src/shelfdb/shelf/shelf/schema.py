@@ -4,14 +4,21 @@ This module defines the lightweight value objects shared by the shelf and query
 layers:
 
 - `UNDEF` as the package-local sentinel for key-only items
+- `Key` as the type of shelf item keys
 - `Item` as the common key/value pair shape
 - `MutationResult` as the common mutation result shape
+- `MutationSummary` as the aggregate shape for batch mutations
+- `ChunkProgress` as the progress shape for chunked bulk mutations
+- `Page` as one page of keyset-paginated query results
+- `Group` as the aggregates of one group of query results
+- `Change` as one record of the shelf change log
 
 It does not contain LMDB access logic or query behavior.
 """
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any, NamedTuple
 
 
@@ -24,19 +31,21 @@ class _UndefType:
 
 UNDEF = _UndefType()
 
+type Key = str | bytes | int | float | datetime | tuple[Any, ...]
+
 
 class Item(NamedTuple):
     """Shelf key/value pair.
 
     Attributes
     ----------
-    key : str
-        String key in the shelf.
+    key : Key
+        Key in the shelf.
     value : Any
         Python value stored for the key.
     """
 
-    key: str
+    key: Key
     value: Any
 
 
@@ -45,11 +54,109 @@ class MutationResult(NamedTuple):
 
     Attributes
     ----------
-    key : str
+    key : Key
         Key that was written.
     ok : bool
         ``True`` if the write succeeded, otherwise ``False``.
     """
 
-    key: str
+    key: Key
     ok: bool
+
+
+class MutationSummary(NamedTuple):
+    """Aggregate result for a batch of shelf mutations.
+
+    Returned instead of per-item `MutationResult` lists when a caller opts out
+    of per-item results.
+
+    Attributes
+    ----------
+    total : int
+        Number of mutations attempted.
+    ok : int
+        Number of mutations that succeeded.
+    """
+
+    total: int
+    ok: int
+
+
+class ChunkProgress(NamedTuple):
+    """Progress of a bulk mutation that commits in chunks.
+
+    Reported after every committed chunk and returned when the run stops.
+
+    Attributes
+    ----------
+    chunks : int
+        Number of transactions committed so far.
+    total : int
+        Number of mutations attempted so far.
+    ok : int
+        Number of mutations that succeeded so far.
+    last_key : Key | None
+        Key of the last mutated item. Pass it as ``after`` to resume an
+        interrupted run.
+    done : bool
+        ``True`` once the selection is exhausted.
+    """
+
+    chunks: int
+    total: int
+    ok: int
+    last_key: Key | None
+    done: bool
+
+
+class Page(NamedTuple):
+    """One page of query results.
+
+    Attributes
+    ----------
+    items : list[Item]
+        Items of this page, in scan order.
+    token : str | None
+        Opaque continuation token to pass as ``after`` for the next page, or
+        ``None`` on the last page.
+    """
+
+    items: list[Item]
+    token: str | None
+
+
+class Group(NamedTuple):
+    """Aggregates of the query results sharing one group key.
+
+    Attributes
+    ----------
+    key : Any
+        Group key shared by the aggregated items.
+    aggregates : dict[str, Any]
+        Aggregation results, shaped like the result of
+        `ShelfQuery.aggregate()`.
+    """
+
+    key: Any
+    aggregates: dict[str, Any]
+
+
+class Change(NamedTuple):
+    """One mutation recorded in the change log.
+
+    Attributes
+    ----------
+    seq : int
+        Sequence number of the record, increasing in commit order.
+    shelf : str
+        Name of the shelf that was written.
+    key : Key
+        Key of the written item.
+    op : str
+        ``"put"`` or ``"delete"``.
+    """
+
+    seq: int
+    shelf: str
+    key: Key
+    op: str
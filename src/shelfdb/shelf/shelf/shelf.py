@@ -1,36 +1,117 @@
 """Low-level LMDB-backed shelf cursor and store helpers.
 
 `ShelfCursor` is an internal helper used by `ShelfQuery`. It owns copied scan
-state plus cursor-backed key scanning.
+state plus cursor-backed key and key/value scanning. `MergedCursor` chains
+several disjoint `ShelfCursor` ranges in key order.
 
-`ShelfStore` owns point reads and writes for the same shelf.
+`ShelfStore` owns point reads and writes for the same shelf, and keeps the
+shelf's secondary indexes up to date in the same transaction. It writes values
+with the shelf's `Codec`; reads accept values written by any codec. When the
+shelf tracks changes, every write is also recorded in the change log (see
+`changes`). In read transactions it also hands out the shelf's optional
+column cache (see `columns`).
 
-Neither helper defines query transforms such as `filter()`, `slice()`,
+Both helpers can run in lazy mode over a ``buffers=True`` read transaction.
+Values are then wrapped in `LazyValue`, which keeps the LMDB memoryview and
+only decodes it when the value is first accessed.
+
+`WriteScan` walks a `ShelfCursor` scan once inside a write transaction and
+deletes or replaces items at the cursor position, so bulk mutations need
+neither a key list nor a second lookup per key.
+
+None of these helpers define query transforms such as `filter()`, `slice()`,
 `sort()`, `keys()`, or `items()`.
 """
 
 from __future__ import annotations
 
-from collections.abc import Generator, Iterable
-from typing import Any, NamedTuple, cast
+from collections.abc import Generator, Iterable, Iterator, Mapping, Sequence
+from itertools import batched
+from typing import TYPE_CHECKING, Any, NamedTuple, cast
 
-import msgpack
+from .changes import DELETE, PUT
+from .codec import MSGPACK, Codec, packb, unpack_value
+from .index import MISSING, Index, IndexCursor
+from .keycodec import pack_key, unpack_key
+from .schema import UNDEF, Item, Key, MutationResult, MutationSummary
 
-from .schema import Item, MutationResult
+if TYPE_CHECKING:
+    from .changes import ShelfChanges
+    from .columns import ColumnCache, ColumnSet
 
 _KEEP = object()
+_BULK_CHUNK_SIZE = 10_000
 LmdbTransaction = Any
 LmdbCursor = Any
 
 
-def packb(value: Any) -> bytes:
-    """Serialize a Python object to MessagePack bytes."""
-    return msgpack.packb(value, use_bin_type=True)
+class LazyValue:
+    """Packed shelf value that decodes from an LMDB buffer on first access.
+
+    The buffer points into the memory map of a read-only transaction, so a
+    `LazyValue` is only valid until that transaction ends. `ShelfQuery`
+    decodes every value it yields, so lazy values only reach user code inside
+    callbacks such as ``filter()`` predicates and ``sort()`` keys.
+    """
+
+    __slots__ = ("_buffer", "_value")
+
+    def __init__(self, buffer: memoryview):
+        # The buffer is dropped once decoded, so it is only set until then.
+        self._buffer: memoryview | None = buffer
+        self._value: Any = None
+
+    def decode(self) -> Any:
+        """Return the decoded value, decoding it once on first call."""
+        if self._buffer is not None:
+            self._value = unpack_value(self._buffer)
+            self._buffer = None
+        return self._value
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.decode()[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.decode()
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.decode())
+
+    def __len__(self) -> int:
+        return len(self.decode())
+
+    def __bool__(self) -> bool:
+        return bool(self.decode())
 
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyValue):
+            other = other.decode()
+        return self.decode() == other
 
-def unpackb(value: bytes) -> Any:
-    """Deserialize MessagePack bytes into a Python object."""
-    return msgpack.unpackb(value, raw=False)
+    __hash__ = None  # type: ignore[assignment]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.decode(), name)
+
+    def __repr__(self) -> str:
+        return f"LazyValue({self.decode()!r})"
+
+
+def decode_value(value: Any) -> Any:
+    """Return ``value`` with a `LazyValue` wrapper decoded."""
+    if isinstance(value, LazyValue):
+        return value.decode()
+    return value
+
+
+def _is_append_order(pairs: list[tuple[bytes, bytes]], last_key: bytes | None) -> bool:
+    """Return ``True`` when ``pairs`` can be appended after ``last_key``."""
+    previous = last_key
+    for key, _ in pairs:
+        if previous is not None and key <= previous:
+            return False
+        previous = key
+    return True
 
 
 class _ShelfHandle(NamedTuple):
@@ -38,6 +119,13 @@ class _ShelfHandle(NamedTuple):
 
     tx: LmdbTransaction
     db: Any
+    lazy: bool = False
+
+    def unpack(self, value: Any) -> Any:
+        """Decode ``value`` now, or wrap it in `LazyValue` in lazy mode."""
+        if self.lazy:
+            return LazyValue(value)
+        return unpack_value(value)
 
 
 class ShelfCursor:
@@ -48,6 +136,9 @@ class ShelfCursor:
     methods do not mutate in place; they return copied `ShelfCursor` instances
     with updated scan state. Iteration always opens a fresh cursor and replays
     the configured scan.
+
+    Scan bounds are stored as raw LMDB key bytes, so the same scan logic also
+    walks index databases.
     """
 
     def __init__(
@@ -55,12 +146,13 @@ class ShelfCursor:
         tx: LmdbTransaction,
         db: Any,
         *,
-        exact_key: str | None = None,
-        start: str | None = None,
-        stop: str | None = None,
+        exact_key: bytes | None = None,
+        start: bytes | None = None,
+        stop: bytes | None = None,
         descending: bool = False,
+        lazy: bool = False,
     ):
-        self._handle = _ShelfHandle(tx, db)
+        self._handle = _ShelfHandle(tx, db, lazy)
         self._exact_key = exact_key
         self._start = start
         self._stop = stop
@@ -69,9 +161,9 @@ class ShelfCursor:
     def _copy(
         self,
         *,
-        exact_key: str | None | object = _KEEP,
-        start: str | None | object = _KEEP,
-        stop: str | None | object = _KEEP,
+        exact_key: bytes | None | object = _KEEP,
+        start: bytes | None | object = _KEEP,
+        stop: bytes | None | object = _KEEP,
         descending: bool | object = _KEEP,
     ) -> ShelfCursor:
         shelf = object.__new__(ShelfCursor)
@@ -84,6 +176,26 @@ class ShelfCursor:
         )
         return shelf
 
+    @property
+    def lazy(self) -> bool:
+        """Return whether scanned values are wrapped in `LazyValue`."""
+        return self._handle.lazy
+
+    @property
+    def descending(self) -> bool:
+        """Return whether the scan runs in descending order."""
+        return self._descending
+
+    @property
+    def primary(self) -> ShelfCursor:
+        """Return this scan; it already walks the shelf itself."""
+        return self
+
+    @property
+    def bounds(self) -> tuple[bytes | None, bytes | None, bytes | None]:
+        """Return the raw ``(exact_key, start, stop)`` scan bounds."""
+        return self._exact_key, self._start, self._stop
+
     def asc(self) -> ShelfCursor:
         """Return a copied shelf scan with ascending order."""
         return self._copy(descending=False)
@@ -92,14 +204,56 @@ class ShelfCursor:
         """Return a copied shelf scan with descending order."""
         return self._copy(descending=True)
 
-    def select_key(self, key: str) -> ShelfCursor:
+    def select_key(self, key: Key) -> ShelfCursor:
         """Return a copied shelf scan narrowed to one key."""
-        return self._copy(exact_key=key, start=None, stop=None)
+        return self._copy(exact_key=pack_key(key), start=None, stop=None)
 
-    def select_keys_range(self, start: str, stop: str | None = None) -> ShelfCursor:
+    def select_keys_range(self, start: Key, stop: Key | None = None) -> ShelfCursor:
         """Return a copied shelf scan narrowed to ``[start, stop)``."""
+        return self._copy(
+            exact_key=None,
+            start=pack_key(start),
+            stop=None if stop is None else pack_key(stop),
+        )
+
+    def select_raw_range(self, start: bytes, stop: bytes | None = None) -> ShelfCursor:
+        """Return a copied scan narrowed to raw key bytes in ``[start, stop)``."""
         return self._copy(exact_key=None, start=start, stop=stop)
 
+    def select_after(self, key: Key) -> ShelfCursor:
+        """Return a copied scan narrowed to keys the scan reaches after ``key``."""
+        key_bytes = pack_key(key)
+        if self._exact_key is not None:
+            if self._descending and self._exact_key < key_bytes:
+                return self
+            if not self._descending and self._exact_key > key_bytes:
+                return self
+            # An empty range: the only selected key was already passed.
+            return self._copy(exact_key=None, start=key_bytes, stop=key_bytes)
+        if self._descending:
+            stop = key_bytes if self._stop is None else min(self._stop, key_bytes)
+            # Descending scans only seek to ``stop`` when ``start`` is set.
+            start = b"" if self._start is None else self._start
+            return self._copy(start=start, stop=stop)
+        # ``key + 0x00`` is the smallest byte string after ``key``.
+        start = key_bytes + b"\x00"
+        return self._copy(
+            start=start if self._start is None else max(self._start, start)
+        )
+
+    def describe(self) -> str:
+        """Return the scan direction and raw bounds as text."""
+        return f"scan {'desc' if self._descending else 'asc'} {self._describe_range()}"
+
+    def _describe_range(self) -> str:
+        if self._exact_key is not None:
+            return f"key {self._exact_key!r}"
+        if self._start is None and self._stop is None:
+            return "all"
+        start = "start" if self._start is None else repr(self._start)
+        stop = "end" if self._stop is None else repr(self._stop)
+        return f"[{start}, {stop})"
+
     def _cursor(self) -> LmdbCursor:
         """Create an LMDB cursor for this shelf."""
         return self._handle.tx.cursor(db=self._handle.db)
@@ -107,7 +261,7 @@ class ShelfCursor:
     def _position_cursor(self, cur: LmdbCursor) -> bool:
         """Position ``cur`` at the first key for the current scan."""
         if self._exact_key is not None:
-            return cur.set_key(self._exact_key.encode())
+            return cur.set_key(self._exact_key)
 
         if self._start is None:
             if self._descending:
@@ -115,22 +269,22 @@ class ShelfCursor:
             return cur.first()
 
         if not self._descending:
-            return cur.set_range(self._start.encode())
+            return cur.set_range(self._start)
 
         if self._stop is None:
             return cur.last()
 
-        if not cur.set_range(self._stop.encode()):
+        if not cur.set_range(self._stop):
             return cur.last()
         return cur.prev()
 
     def _key_in_bounds(self, key: bytes) -> bool:
         """Return ``True`` when ``key`` still belongs to the current scan."""
         if self._exact_key is not None:
-            return key == self._exact_key.encode()
+            return key == self._exact_key
         if self._descending:
-            return self._start is None or key >= self._start.encode()
-        return self._stop is None or key < self._stop.encode()
+            return self._start is None or key >= self._start
+        return self._stop is None or key < self._stop
 
     def _advance_cursor(self, cur: LmdbCursor) -> bool:
         """Advance ``cur`` according to the current scan direction."""
@@ -138,23 +292,143 @@ class ShelfCursor:
             return cur.prev()
         return cur.next()
 
-    def _iter_keys(self, cur: LmdbCursor) -> Generator[str, None, None]:
+    def _iter_keys(self, cur: LmdbCursor) -> Generator[Key, None, None]:
         """Yield keys from ``cur`` until the current scan goes out of bounds."""
         while True:
-            key = cur.key()
+            key = bytes(cur.key())
             if not self._key_in_bounds(key):
                 break
-            yield key.decode()
+            yield unpack_key(key)
             if not self._advance_cursor(cur):
                 break
 
-    def keys(self) -> Generator[str, None, None]:
+    def _iter_items(self, cur: LmdbCursor) -> Generator[Item, None, None]:
+        """Yield loaded items from ``cur`` until the scan goes out of bounds.
+
+        Key and value are read from the same cursor position, so no second
+        B-tree lookup is needed per key.
+        """
+        while True:
+            key, value = cur.item()
+            key = bytes(key)
+            if not self._key_in_bounds(key):
+                break
+            yield Item(unpack_key(key), self._handle.unpack(value))
+            if not self._advance_cursor(cur):
+                break
+
+    def raw(self) -> Generator[tuple[bytes, Any], None, None]:
+        """Iterate raw ``(key, value)`` pairs selected by the current scan."""
+        with self._cursor() as cur:
+            if not self._position_cursor(cur):
+                return
+            while True:
+                key, value = cur.item()
+                key = bytes(key)
+                if not self._key_in_bounds(key):
+                    break
+                yield key, value
+                if not self._advance_cursor(cur):
+                    break
+
+    def keys(self) -> Generator[Key, None, None]:
         """Iterate keys selected by the current scan state."""
         with self._cursor() as cur:
             if not self._position_cursor(cur):
                 return
             yield from self._iter_keys(cur)
 
+    def items(self) -> Generator[Item, None, None]:
+        """Iterate loaded items selected by the current scan state."""
+        with self._cursor() as cur:
+            if not self._position_cursor(cur):
+                return
+            yield from self._iter_items(cur)
+
+    def count(self) -> int:
+        """Count keys selected by the current scan state.
+
+        A whole-shelf scan is answered from ``txn.stat(db)["entries"]`` without
+        walking any keys.
+        """
+        if self._exact_key is None and self._start is None:
+            return self._handle.tx.stat(self._handle.db)["entries"]
+        return sum(1 for _ in self.keys())
+
+
+class MergedCursor:
+    """Scan over several disjoint key ranges of one shelf, in key order.
+
+    ``parts`` are `ShelfCursor` ranges in ascending key order that do not
+    overlap, so walking them one after the other, or in reverse for a
+    descending scan, yields keys in scan order. Key selectors replace the
+    merged scan with a single plain scan, like they do on `IndexCursor`.
+    """
+
+    def __init__(self, parts: tuple[ShelfCursor, ...]):
+        self._parts = parts
+
+    @property
+    def lazy(self) -> bool:
+        """Return whether scanned values are wrapped in `LazyValue`."""
+        return self._parts[0].lazy
+
+    @property
+    def descending(self) -> bool:
+        """Return whether the scan runs in descending order."""
+        return self._parts[0].descending
+
+    @property
+    def primary(self) -> ShelfCursor:
+        """Return a plain shelf scan for key selectors to narrow."""
+        return self._parts[0]
+
+    @property
+    def scans(self) -> tuple[ShelfCursor, ...]:
+        """Return the ranges in scan order."""
+        if self.descending:
+            return self._parts[::-1]
+        return self._parts
+
+    def asc(self) -> MergedCursor:
+        """Return a copied merged scan with ascending order."""
+        return MergedCursor(tuple(part.asc() for part in self._parts))
+
+    def desc(self) -> MergedCursor:
+        """Return a copied merged scan with descending order."""
+        return MergedCursor(tuple(part.desc() for part in self._parts))
+
+    def select_key(self, key: Key) -> ShelfCursor:
+        """Return a plain shelf scan narrowed to one key."""
+        return self.primary.select_key(key)
+
+    def select_keys_range(self, start: Key, stop: Key | None = None) -> ShelfCursor:
+        """Return a plain shelf scan narrowed to ``[start, stop)``."""
+        return self.primary.select_keys_range(start, stop)
+
+    def select_after(self, key: Key) -> MergedCursor:
+        """Return a copied merged scan of the keys it reaches after ``key``."""
+        return MergedCursor(tuple(part.select_after(key) for part in self._parts))
+
+    def describe(self) -> str:
+        """Return the scan direction and the raw bounds of every range as text."""
+        ranges = " + ".join(part._describe_range() for part in self.scans)
+        return f"scan {'desc' if self.descending else 'asc'} {ranges}"
+
+    def keys(self) -> Generator[Key, None, None]:
+        """Iterate keys of every range in scan order."""
+        for scan in self.scans:
+            yield from scan.keys()
+
+    def items(self) -> Generator[Item, None, None]:
+        """Iterate loaded items of every range in scan order."""
+        for scan in self.scans:
+            yield from scan.items()
+
+    def count(self) -> int:
+        """Count keys in every range."""
+        return sum(part.count() for part in self._parts)
+
 
 class ShelfStore:
     """Internal direct LMDB point read/write helper for one shelf."""
@@ -163,47 +437,309 @@ class ShelfStore:
         self,
         tx: LmdbTransaction,
         db: Any,
+        *,
+        lazy: bool = False,
+        indexes: Mapping[str, Index] | None = None,
+        codec: Codec = MSGPACK,
+        columns: ColumnCache | None = None,
+        sort_buffer: int | None = None,
+        changes: ShelfChanges | None = None,
     ):
-        self._handle = _ShelfHandle(tx, db)
-
-    def get(self, key: str) -> Any | None:
-        """Return the unpacked value for ``key`` when present."""
-        value = self._handle.tx.get(key.encode(), db=self._handle.db)
-        if value is None:
+        self._handle = _ShelfHandle(tx, db, lazy)
+        self._indexes: Mapping[str, Index] = {} if indexes is None else indexes
+        self._codec = codec
+        self._columns = columns
+        self._sort_buffer = sort_buffer
+        self._changes = changes
+
+    def index(self, name: str) -> Index:
+        """Return the secondary index called ``name``.
+
+        Raises
+        ------
+        ValueError
+            If the shelf has no such index.
+        """
+        try:
+            return self._indexes[name]
+        except KeyError:
+            raise ValueError(f"unknown index: {name}") from None
+
+    @property
+    def indexes(self) -> tuple[Index, ...]:
+        """Return the secondary indexes of the shelf."""
+        return tuple(self._indexes.values())
+
+    @property
+    def sort_buffer(self) -> int | None:
+        """Return the items a sort holds in memory before spilling, if bounded."""
+        return self._sort_buffer
+
+    def columns(self, paths: Iterable[str]) -> ColumnSet | None:
+        """Return the shelf's cached columns if they hold every field in ``paths``.
+
+        Stores only get a column cache in read transactions. Without one, or
+        when a field is not cached, ``None`` is returned.
+        """
+        cache = self._columns
+        if cache is None or not set(paths) <= set(cache.fields):
             return None
-        return unpackb(value)
+        return cache.load(self._handle.tx, self._handle.db)
 
-    def put(self, key: str, value: Any) -> MutationResult:
-        """Store a single key/value pair."""
-        ok = cast(
+    def index_scan(self, name: str) -> ShelfCursor:
+        """Return an unbounded raw scan over the entries of index ``name``."""
+        return ShelfCursor(self._handle.tx, self.index(name).db)
+
+    def index_cursor(
+        self,
+        name: str,
+        start: bytes,
+        stop: bytes | None,
+        *,
+        primary: ShelfCursor,
+        descending: bool = False,
+        fixed: int = 0,
+        covered: bool = False,
+    ) -> IndexCursor:
+        """Return a scan of the index ``name`` entries in ``[start, stop)``.
+
+        ``primary`` is the plain shelf scan the index scan resolves against.
+        """
+        scan = self.index_scan(name).select_raw_range(start, stop)
+        if descending:
+            scan = scan.desc()
+        return IndexCursor(
+            self.index(name), scan, primary, self, fixed=fixed, covered=covered
+        )
+
+    def unpack(self, value: Any) -> Any:
+        """Unpack a value read through this store's transaction."""
+        return self._handle.unpack(value)
+
+    def _update_indexes(self, key: bytes, value: Any = MISSING) -> None:
+        """Move index entries of ``key`` from its stored value to ``value``.
+
+        Pass no ``value`` when ``key`` is being deleted.
+        """
+        tx = self._handle.tx
+        packed = tx.get(key, db=self._handle.db)
+        old_value = MISSING if packed is None else unpack_value(packed)
+        for index in self._indexes.values():
+            old_entry = index.entry(old_value)
+            new_entry = index.entry(value)
+            if old_entry is not None and old_entry != new_entry:
+                tx.delete(old_entry + key, db=index.db)
+            if new_entry is not None and (new_entry != old_entry or index.include):
+                self._put_index_entry(index, new_entry + key, value)
+
+    def _put_index_entry(self, index: Index, entry: bytes, value: Any) -> None:
+        covered = packb(index.cover(value)) if index.include else b""
+        self._handle.tx.put(entry, covered, db=index.db)
+
+    def add_index_entries(self, key: bytes, value: Any) -> None:
+        """Write index entries for a stored item that has none yet."""
+        for index in self._indexes.values():
+            if (entry := index.entry(value)) is not None:
+                self._put_index_entry(index, entry + key, value)
+
+    def _put(self, key: Key, value: Any) -> bool:
+        key_bytes = pack_key(key)
+        if self._indexes:
+            self._update_indexes(key_bytes, value)
+        if self._changes is not None:
+            self._changes.record(key_bytes, PUT)
+        return cast(
             bool,
-            self._handle.tx.put(
-                key.encode(),
-                packb(value),
-                db=self._handle.db,
-            ),
+            self._handle.tx.put(key_bytes, self._codec.pack(value), db=self._handle.db),
         )
-        return MutationResult(key=key, ok=ok)
 
-    def put_many(self, items: Iterable[Item]) -> list[MutationResult]:
-        """Store multiple key/value pairs."""
-        results: list[MutationResult] = []
+    def _delete(self, key: bytes) -> bool:
+        if self._indexes:
+            self._update_indexes(key)
+        deleted = cast(bool, self._handle.tx.delete(key, db=self._handle.db))
+        if deleted and self._changes is not None:
+            self._changes.record(key, DELETE)
+        return deleted
+
+    def write_scan(
+        self, cursor: ShelfCursor | MergedCursor, *, values: bool
+    ) -> WriteScan:
+        """Return a single-pass scan of ``cursor`` that can mutate its items."""
+        scans = cursor.scans if isinstance(cursor, MergedCursor) else (cursor,)
+        return WriteScan(scans, self, values=values)
+
+    def get(self, key: Key, default: Any = None) -> Any:
+        """Return the unpacked value for ``key``, or ``default`` when absent.
+
+        Stored values can be ``None``, so loads that must tell them apart from
+        absent keys pass `MISSING` as ``default``.
+        """
+        value = self._handle.tx.get(pack_key(key), db=self._handle.db)
+        if value is None:
+            return default
+        return self._handle.unpack(value)
+
+    def put(self, key: Key, value: Any) -> MutationResult:
+        """Store a single key/value pair."""
+        return MutationResult(key=key, ok=self._put(key, value))
+
+    def put_many(
+        self,
+        items: Iterable[Item],
+        *,
+        bulk: bool = False,
+        results: bool = True,
+    ) -> list[MutationResult] | MutationSummary:
+        """Store multiple key/value pairs.
+
+        ``bulk=True`` writes through LMDB cursor ``putmulti`` in chunks, using
+        append mode for chunks that are already in ascending key order after
+        the shelf's current last key. ``results=False`` returns a
+        `MutationSummary` instead of one `MutationResult` per item.
+        """
+        if bulk:
+            return self._put_many_bulk(items, results=results)
+
+        mutations: list[MutationResult] = []
+        total = ok_count = 0
         for key, value in items:
-            ok = cast(
-                bool,
-                self._handle.tx.put(
-                    key.encode(),
-                    packb(value),
-                    db=self._handle.db,
-                ),
-            )
-            results.append(MutationResult(key=key, ok=ok))
-        return results
-
-    def delete(self, keys: Iterable[str]) -> list[MutationResult]:
+            ok = self._put(key, value)
+            total += 1
+            ok_count += ok
+            if results:
+                mutations.append(MutationResult(key=key, ok=ok))
+        if results:
+            return mutations
+        return MutationSummary(total=total, ok=ok_count)
+
+    def _put_many_bulk(
+        self,
+        items: Iterable[Item],
+        *,
+        results: bool,
+    ) -> list[MutationResult] | MutationSummary:
+        mutations: list[MutationResult] = []
+        total = ok_count = 0
+        with self._handle.tx.cursor(db=self._handle.db) as cur:
+            last_key = cur.key() if cur.last() else None
+            for chunk in batched(items, _BULK_CHUNK_SIZE):
+                pairs = [
+                    (pack_key(key), self._codec.pack(value)) for key, value in chunk
+                ]
+                append = _is_append_order(pairs, last_key)
+                if self._indexes:
+                    # Index upkeep reads each stored value before it is
+                    # replaced, so indexed shelves write pair by pair.
+                    consumed = added = 0
+                    for (key, packed), (_, value) in zip(pairs, chunk):
+                        self._update_indexes(key, value)
+                        added += cur.put(key, packed, append=append)
+                        consumed += 1
+                else:
+                    consumed, added = cur.putmulti(pairs, append=append)
+                if self._changes is not None:
+                    for key, _ in pairs:
+                        self._changes.record(key, PUT)
+                total += consumed
+                ok_count += added
+                if cur.last():
+                    last_key = cur.key()
+                if results:
+                    # Overwriting putmulti only skips items in append mode, and
+                    # append mode is only used for verified ascending chunks.
+                    mutations.extend(
+                        MutationResult(key=key, ok=True) for key, _ in chunk
+                    )
+        if results:
+            return mutations
+        return MutationSummary(total=total, ok=ok_count)
+
+    def delete(self, keys: Iterable[Key]) -> list[MutationResult]:
         """Delete multiple keys without changing scan state."""
-        results: list[MutationResult] = []
-        for key in keys:
-            ok = cast(bool, self._handle.tx.delete(key.encode(), db=self._handle.db))
-            results.append(MutationResult(key=key, ok=ok))
-        return results
+        return [MutationResult(key=key, ok=self._delete(pack_key(key))) for key in keys]
+
+
+class WriteScan:
+    """Single cursor pass over shelf scans that mutates items in place.
+
+    ``scans`` are walked one after the other, each with one cursor. Iterating
+    yields the scanned items, with values when ``values`` is set and
+    `UNDEF` otherwise. `delete()` and `replace()` act at the cursor position
+    when given the key the scan yielded last, and fall back to point writes
+    otherwise. Callers can therefore pass items through transforms that drop or
+    reorder items before mutating them.
+    """
+
+    def __init__(
+        self, scans: Sequence[ShelfCursor], store: ShelfStore, *, values: bool
+    ):
+        self._scans = scans
+        self._scan = scans[0]
+        self._store = store
+        self._values = values
+        self._cur: LmdbCursor | None = None
+        self._current: bytes | None = None
+        self._moved = False
+
+    def __iter__(self) -> Iterator[Item]:
+        for scan in self._scans:
+            self._scan = scan
+            yield from self._walk(scan)
+
+    def _walk(self, scan: ShelfCursor) -> Iterator[Item]:
+        with scan._cursor() as cur:
+            if not scan._position_cursor(cur):
+                return
+            self._cur = cur
+            try:
+                while True:
+                    key, value = cur.item()
+                    key = bytes(key)
+                    if not scan._key_in_bounds(key):
+                        break
+                    self._current = key
+                    if self._values:
+                        yield Item(unpack_key(key), scan._handle.unpack(value))
+                    else:
+                        yield Item(unpack_key(key), UNDEF)
+                    self._current = None
+                    if self._moved:
+                        # Cursor delete already moved to the following key.
+                        self._moved = False
+                        if not cur.key():
+                            break
+                    elif not scan._advance_cursor(cur):
+                        break
+            finally:
+                self._cur = None
+                self._current = None
+
+    def _at_cursor(self, key: bytes) -> bool:
+        return self._cur is not None and key == self._current
+
+    def delete(self, key: Key) -> bool:
+        """Delete ``key``, at the cursor position when it was just yielded."""
+        key_bytes = pack_key(key)
+        if not self._at_cursor(key_bytes):
+            return self._store._delete(key_bytes)
+        if self._store._indexes:
+            self._store._update_indexes(key_bytes)
+        if self._store._changes is not None:
+            self._store._changes.record(key_bytes, DELETE)
+        cast(LmdbCursor, self._cur).delete()
+        self._current = None
+        # Descending scans step back from the following key as usual.
+        self._moved = not self._scan.descending
+        return True
+
+    def replace(self, key: Key, value: Any) -> bool:
+        """Store ``value`` for ``key``, at the cursor position when possible."""
+        key_bytes = pack_key(key)
+        if not self._at_cursor(key_bytes):
+            return self._store._put(key, value)
+        if self._store._indexes:
+            self._store._update_indexes(key_bytes, value)
+        if self._store._changes is not None:
+            self._store._changes.record(key_bytes, PUT)
+        packed = self._store._codec.pack(value)
+        return cast(bool, cast(LmdbCursor, self._cur).put(key_bytes, packed))
@@ -0,0 +1,106 @@
+"""Bounded-memory sorting for `sort()` over selections larger than memory.
+
+`spill_sorted()` sorts like `sorted()` while holding at most ``buffer`` items
+in memory. Items are collected into a buffer; when it fills, the buffer is
+sorted and written to a temporary file as one sorted run. Once the input
+ends, the runs and the last buffer are k-way merged with `heapq.merge()` and
+streamed, reading one item per run at a time.
+
+The merge keeps equal items in input order, so the result matches a stable
+`sorted()` call. Run files are deleted when the merge ends or is closed.
+
+Spilled items hold decoded values, since lazy values only stay readable
+inside their transaction's memory map.
+"""
+
+from __future__ import annotations
+
+import heapq
+import pickle
+import tempfile
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack
+from itertools import islice
+from typing import IO, Any, Final
+
+from .schema import Item
+from .shelf import decode_value
+
+# Items a sort holds in memory before it spills sorted runs to disk.
+DEFAULT_SORT_BUFFER: Final = 1_000_000
+
+type SortKey = Callable[[Item], Any]
+
+_END = object()
+
+
+def spill_sorted(
+    items: Iterable[Item],
+    key: SortKey,
+    *,
+    reverse: bool = False,
+    buffer: int | None = DEFAULT_SORT_BUFFER,
+) -> Iterator[Item]:
+    """Yield ``items`` sorted by ``key``, holding at most ``buffer`` in memory.
+
+    ``buffer=None`` sorts every item in memory.
+
+    Raises
+    ------
+    ValueError
+        If ``buffer`` is not positive.
+    """
+    if buffer is None:
+        yield from sorted(items, key=key, reverse=reverse)
+        return
+    if buffer < 1:
+        raise ValueError("sort buffer must be positive")
+    items = iter(items)
+    chunk = list(islice(items, buffer))
+    with ExitStack() as stack:
+        runs: list[Iterator[tuple[Any, Item]]] = []
+        while len(chunk) == buffer and (following := next(items, _END)) is not _END:
+            run = stack.enter_context(tempfile.TemporaryFile())
+            _write_run(run, _sort_keyed(chunk, key, reverse))
+            runs.append(_read_run(run))
+            # Refill in place, so two buffers are never held at once.
+            chunk.clear()
+            chunk.append(following)
+            chunk.extend(islice(items, buffer - 1))
+        if not runs:
+            yield from sorted(chunk, key=key, reverse=reverse)
+            return
+        runs.append(iter(_sort_keyed(chunk, key, reverse)))
+        del chunk
+        for _, item in heapq.merge(*runs, key=_first, reverse=reverse):
+            yield item
+
+
+def _sort_keyed(
+    chunk: list[Item], key: SortKey, reverse: bool
+) -> list[tuple[Any, Item]]:
+    return sorted(((key(item), item) for item in chunk), key=_first, reverse=reverse)
+
+
+def _first(pair: tuple[Any, Item]) -> Any:
+    return pair[0]
+
+
+def _write_run(run: IO[bytes], keyed: list[tuple[Any, Item]]) -> None:
+    pickler = pickle.Pickler(run, pickle.HIGHEST_PROTOCOL)
+    for sort_key, item in keyed:
+        pickler.dump((sort_key, item.key, decode_value(item.value)))
+        # The memo would otherwise keep every spilled object alive.
+        pickler.clear_memo()
+    run.flush()
+    run.seek(0)
+
+
+def _read_run(run: IO[bytes]) -> Iterator[tuple[Any, Item]]:
+    unpickler = pickle.Unpickler(run)
+    while True:
+        try:
+            sort_key, key, value = unpickler.load()
+        except EOFError:
+            return
+        yield sort_key, Item(key, value)
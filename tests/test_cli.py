@@ -1,13 +1,20 @@
 from pathlib import Path
 
 from shelfdb.cli import install_ai_skill, main
+from shelfdb.shelf.shelf.spill import DEFAULT_SORT_BUFFER
 
 
 def test_cli_server_defaults(monkeypatch):
     captured = {}
 
-    async def fake_run_server(*, db_path, url):
-        captured.update(db_path=db_path, url=url)
+    async def fake_run_server(*, db_path, url, max_map_size, profile, sort_buffer):
+        captured.update(
+            db_path=db_path,
+            url=url,
+            max_map_size=max_map_size,
+            profile=profile,
+            sort_buffer=sort_buffer,
+        )
 
     monkeypatch.setattr("shelfdb.cli.run_server", fake_run_server)
 
@@ -16,14 +23,23 @@ def test_cli_server_defaults(monkeypatch):
     assert captured == {
         "db_path": "db",
         "url": "tcp://127.0.0.1:31337",
+        "max_map_size": None,
+        "profile": "safe",
+        "sort_buffer": DEFAULT_SORT_BUFFER,
     }
 
 
 def test_cli_server_accepts_url_and_db_path(monkeypatch):
     captured = {}
 
-    async def fake_run_server(*, db_path, url):
-        captured.update(db_path=db_path, url=url)
+    async def fake_run_server(*, db_path, url, max_map_size, profile, sort_buffer):
+        captured.update(
+            db_path=db_path,
+            url=url,
+            max_map_size=max_map_size,
+            profile=profile,
+            sort_buffer=sort_buffer,
+        )
 
     monkeypatch.setattr("shelfdb.cli.run_server", fake_run_server)
 
@@ -40,14 +56,23 @@ def test_cli_server_accepts_url_and_db_path(monkeypatch):
     assert captured == {
         "db_path": "/tmp/db",
         "url": "tcp://0.0.0.0:9999",
+        "max_map_size": None,
+        "profile": "safe",
+        "sort_buffer": DEFAULT_SORT_BUFFER,
     }
 
 
 def test_cli_server_accepts_relative_unix_url(monkeypatch):
     captured = {}
 
-    async def fake_run_server(*, db_path, url):
-        captured.update(db_path=db_path, url=url)
+    async def fake_run_server(*, db_path, url, max_map_size, profile, sort_buffer):
+        captured.update(
+            db_path=db_path,
+            url=url,
+            max_map_size=max_map_size,
+            profile=profile,
+            sort_buffer=sort_buffer,
+        )
 
     monkeypatch.setattr("shelfdb.cli.run_server", fake_run_server)
 
@@ -56,9 +81,75 @@ def test_cli_server_accepts_relative_unix_url(monkeypatch):
     assert captured == {
         "db_path": "db",
         "url": "unix://tmp/shelfdb.sock",
+        "max_map_size": None,
+        "profile": "safe",
+        "sort_buffer": DEFAULT_SORT_BUFFER,
     }
 
 
+def test_cli_server_accepts_max_map_size(monkeypatch):
+    captured = {}
+
+    async def fake_run_server(*, db_path, url, max_map_size, profile, sort_buffer):
+        captured.update(
+            db_path=db_path,
+            url=url,
+            max_map_size=max_map_size,
+            profile=profile,
+            sort_buffer=sort_buffer,
+        )
+
+    monkeypatch.setattr("shelfdb.cli.run_server", fake_run_server)
+
+    main(["server", "--max-map-size", "8589934592"])
+
+    assert captured == {
+        "db_path": "db",
+        "url": "tcp://127.0.0.1:31337",
+        "max_map_size": 8589934592,
+        "profile": "safe",
+        "sort_buffer": DEFAULT_SORT_BUFFER,
+    }
+
+
+def test_cli_server_accepts_profile(monkeypatch):
+    captured = {}
+
+    async def fake_run_server(*, db_path, url, max_map_size, profile, sort_buffer):
+        captured.update(
+            db_path=db_path,
+            url=url,
+            max_map_size=max_map_size,
+            profile=profile,
+            sort_buffer=sort_buffer,
+        )
+
+    monkeypatch.setattr("shelfdb.cli.run_server", fake_run_server)
+
+    main(["server", "--profile", "fast-commit"])
+
+    assert captured == {
+        "db_path": "db",
+        "url": "tcp://127.0.0.1:31337",
+        "max_map_size": None,
+        "profile": "fast-commit",
+        "sort_buffer": DEFAULT_SORT_BUFFER,
+    }
+
+
+def test_cli_server_accepts_sort_buffer(monkeypatch):
+    captured = {}
+
+    async def fake_run_server(*, db_path, url, max_map_size, profile, sort_buffer):
+        captured.update(sort_buffer=sort_buffer)
+
+    monkeypatch.setattr("shelfdb.cli.run_server", fake_run_server)
+
+    main(["server", "--sort-buffer", "50000"])
+
+    assert captured == {"sort_buffer": 50000}
+
+
 def test_cli_ai_skill_install_uses_prompt_default(monkeypatch):
     installed = {}
 
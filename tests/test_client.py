@@ -1,9 +1,22 @@
 import asyncio
 from pathlib import Path
 
+import pytest
+
 from shelfdb.client import Client, ClientError
 from shelfdb.protocol import serve, serve_unix
-from shelfdb.shelf import DB, Item, MutationResult, UNDEF
+from shelfdb.shelf import (
+    DB,
+    UNDEF,
+    Change,
+    ChunkProgress,
+    F,
+    Group,
+    Item,
+    MutationResult,
+    MutationSummary,
+    Page,
+)
 
 
 def test_client_write_commit_and_read_back(tmp_path):
@@ -192,6 +205,10 @@ def test_client_remote_query_read_api(tmp_path):
                 users.put("bob", {"age": 25, "role": "user"})
                 users.put("carol", {"age": 20, "role": "user"})
                 users.put("dave", {"age": 35, "role": "admin"})
+            db.create_index("users", "age", field="age")
+            db.create_index(
+                "users", "role_age", field=("role", "age"), include=("age",)
+            )
 
             server = await serve(db, host="127.0.0.1", port=0)
             host, port = server.sockets[0].getsockname()[:2]
@@ -211,6 +228,41 @@ def test_client_remote_query_read_api(tmp_path):
                             Item("bob", UNDEF),
                             Item("carol", UNDEF),
                         ]
+                        assert await users.desc().prefix("c", "a").query() == [
+                            Item("carol", UNDEF),
+                            Item("alice", UNDEF),
+                        ]
+                        assert await users.filter_keys(
+                            lambda key: key.startswith("c")
+                        ).items().query() == [
+                            Item("carol", {"age": 20, "role": "user"})
+                        ]
+                        page = await users.desc().page(3).query()
+                        assert [item.key for item in page.items] == [
+                            "dave",
+                            "carol",
+                            "bob",
+                        ]
+                        assert await users.desc().page(3, after=page.token).query() == (
+                            Page([Item("alice", UNDEF)], None)
+                        )
+                        assert await users.key("bob").items(
+                            fields=["role"]
+                        ).query() == [Item("bob", {"role": "user"})]
+                        admins = (F("role") == "admin") & (F("age") > 30)
+                        assert await users.filter(admins).query() == [
+                            Item("dave", {"age": 35, "role": "admin"})
+                        ]
+                        assert await users.aggregate(
+                            count=True, avg="age", max="age"
+                        ).query() == {"count": 4, "avg": 27.5, "max": 35}
+                        assert await users.group_by("role").agg(min="age").query() == [
+                            Group("admin", {"min": 30}),
+                            Group("user", {"min": 20}),
+                        ]
+                        assert await users.items().sort().slice(
+                            0, 2
+                        ).explain().query() == ("scan asc all with values\nslice [0:2]")
                         assert (
                             await users.filter(
                                 lambda item: item.value["role"] == "admin"
@@ -221,6 +273,30 @@ def test_client_remote_query_read_api(tmp_path):
                             Item("dave", {"age": 35, "role": "admin"}),
                             Item("alice", {"age": 30, "role": "admin"}),
                         ]
+                        assert await users.index("age").range(
+                            25, 35
+                        ).keys().query() == [
+                            Item("bob", UNDEF),
+                            Item("alice", UNDEF),
+                        ]
+                        assert await users.index("age").eq(20).item().query() == Item(
+                            "carol", {"age": 20, "role": "user"}
+                        )
+                        assert await users.index("role_age", covered=True).range(
+                            prefix=("admin",)
+                        ).sort(by="age", reverse=True).query() == [
+                            Item("dave", {"age": 35}),
+                            Item("alice", {"age": 30}),
+                        ]
+                        sorted_keys = (
+                            await users.sort(by="age", buffer=1).keys().query()
+                        )
+                        assert [item.key for item in sorted_keys] == [
+                            "carol",
+                            "bob",
+                            "alice",
+                            "dave",
+                        ]
                 finally:
                     await client.close()
             finally:
@@ -260,6 +336,9 @@ def test_client_remote_query_write_api(tmp_path):
                         assert await users.key("bob").delete().query() == [
                             MutationResult("bob", True)
                         ]
+                        assert await users.keys_range("x").delete(
+                            results=False
+                        ).query() == MutationSummary(total=0, ok=0)
                 finally:
                     await client.close()
             finally:
@@ -278,3 +357,80 @@ def test_client_remote_query_write_api(tmp_path):
                     )
 
     asyncio.run(run())
+
+
+def test_client_runs_chunked_mutations_outside_a_transaction(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    async def run():
+        with DB(str(db_path)) as db:
+            with db.transaction(write=True) as tx:
+                tx.shelf("logs").put_many(Item(f"log{i}", {"n": i}) for i in range(7))
+            server = await serve(db, host="127.0.0.1", port=0)
+            host, port = server.sockets[0].getsockname()[:2]
+
+            try:
+                client = await Client.connect(f"tcp://{host}:{port}")
+                try:
+                    logs = client.query("logs").keys_range("log2")
+                    progress = await logs.delete(chunk_size=2, max_chunks=1).query()
+                    assert progress == ChunkProgress(1, 2, 2, "log3", False)
+                    assert await logs.delete(
+                        chunk_size=2, after=progress.last_key
+                    ).query() == ChunkProgress(2, 3, 3, "log6", True)
+                    assert await client.query("logs").update(
+                        lambda item: {"n": -item.value["n"]}, chunk_size=10
+                    ).query() == ChunkProgress(1, 2, 2, "log1", True)
+
+                    async with client.transaction(write=True) as tx:
+                        with pytest.raises(ClientError, match="outside a transaction"):
+                            await tx.shelf("logs").delete(chunk_size=2).query()
+                finally:
+                    await client.close()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+            with db.transaction(write=False) as tx:
+                assert list(tx.shelf("logs").items()) == [
+                    Item("log0", {"n": 0}),
+                    Item("log1", {"n": -1}),
+                ]
+
+    asyncio.run(run())
+
+
+def test_client_watches_and_truncates_the_change_log(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    async def run():
+        with DB(str(db_path)) as db:
+            db.track_changes("users")
+            server = await serve(db, host="127.0.0.1", port=0)
+            host, port = server.sockets[0].getsockname()[:2]
+
+            try:
+                client = await Client.connect(f"tcp://{host}:{port}")
+                try:
+                    assert await client.watch() == []
+                    async with client.transaction(write=True) as tx:
+                        await tx.put("users", "alice", {"age": 30})
+                        await tx.shelf("users").key("alice").delete().query()
+                        with pytest.raises(ClientError, match="outside a transaction"):
+                            await client.truncate_changes(2)
+                    assert await client.watch() == [
+                        Change(1, "users", "alice", "put"),
+                        Change(2, "users", "alice", "delete"),
+                    ]
+                    assert await client.watch(since=1, limit=5) == [
+                        Change(2, "users", "alice", "delete")
+                    ]
+                    assert await client.truncate_changes(2) == 1
+                    assert [change.seq for change in await client.watch()] == [2]
+                finally:
+                    await client.close()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+    asyncio.run(run())
@@ -1,7 +1,18 @@
+import threading
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+import lmdb
+import msgpack
 import pytest
 
-from shelfdb.shelf import DB, UNDEF, ShelfQuery
-from shelfdb.shelf.shelf import Item, MutationResult
+from shelfdb.shelf import DB, UNDEF, Change, ChunkProgress, F, Group, ShelfQuery
+from shelfdb.shelf.db import PROFILES
+from shelfdb.shelf.shelf import Item, MutationResult, MutationSummary, Page
+from shelfdb.shelf.shelf import spill as spill_module
+from shelfdb.shelf.shelf.expr import Expr, from_wire
+from shelfdb.shelf.shelf.shelf import LazyValue, ShelfCursor, ShelfStore
 
 
 def _seed_users(users) -> None:
@@ -276,3 +287,1356 @@ def test_item_raises_for_zero_or_many_results(tmp_path):
 
             with pytest.raises(ValueError):
                 tx.shelf("users").item()
+
+
+def test_value_pipelines_read_values_from_the_cursor(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            _seed_users(tx.shelf("users"))
+
+        with db.transaction(write=False) as tx:
+            users = tx.shelf("users")
+
+            def fail_get(self, key, default=None):
+                raise AssertionError(f"unexpected point lookup for {key!r}")
+
+            monkeypatch.setattr(ShelfStore, "get", fail_get)
+
+            assert list(users.keys_range("bob", "d").items()) == [
+                Item("bob", {"age": 25, "role": "user"}),
+                Item("carol", {"age": 20, "role": "user"}),
+            ]
+            assert list(users.desc().filter(lambda item: item.value["age"] > 25)) == [
+                Item("dave", {"age": 35, "role": "admin"}),
+                Item("alice", {"age": 30, "role": "admin"}),
+            ]
+            assert list(users.sort(key=lambda item: item.value["age"]).keys()) == [
+                Item("carol", UNDEF),
+                Item("bob", UNDEF),
+                Item("alice", UNDEF),
+                Item("dave", UNDEF),
+            ]
+            assert list(users.key("alice").items()) == [
+                Item("alice", {"age": 30, "role": "admin"}),
+            ]
+
+
+def test_key_only_pipelines_load_items_stored_as_none(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("notes").put_many([Item("m", 1), Item("n", None)])
+
+        with db.transaction(write=False) as tx:
+            notes = tx.shelf("notes")
+            assert list(notes.key("n").items()) == [Item("n", None)]
+            assert list(notes.key("n").keys().items()) == [Item("n", None)]
+            assert list(notes.filter_keys(lambda key: key > "m").items()) == [
+                Item("n", None)
+            ]
+            assert list(notes.keys().items()) == [Item("m", 1), Item("n", None)]
+
+
+def test_filter_keys_runs_before_any_value_is_loaded(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("flags").put_many(
+                Item(f"user{i}:{'active' if i % 2 else 'idle'}", {"id": i})
+                for i in range(10)
+            )
+
+        with db.transaction(write=True) as tx:
+            flags = tx.shelf("flags")
+            loaded = []
+            get = ShelfStore.get
+            monkeypatch.setattr(ShelfCursor, "items", None)
+            monkeypatch.setattr(
+                ShelfStore,
+                "get",
+                lambda store, key, *args: loaded.append(key) or get(store, key, *args),
+            )
+
+            active = flags.filter_keys(lambda key: key.endswith(":active"))
+            assert list(active.slice(0, 2).items()) == [
+                Item("user1:active", {"id": 1}),
+                Item("user3:active", {"id": 3}),
+            ]
+            assert loaded == ["user1:active", "user3:active"]
+            assert active.count() == 5
+            assert active.delete(results=False) == MutationSummary(total=5, ok=5)
+            assert len(loaded) == 2
+            monkeypatch.undo()
+
+            assert flags.count() == 5
+            assert list(flags.items().filter_keys(lambda key: key < "user3")) == [
+                Item("user0:idle", {"id": 0}),
+                Item("user2:idle", {"id": 2}),
+            ]
+
+
+def test_sort_then_slice_selects_top_items_with_a_heap(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            scores = tx.shelf("scores")
+            scores.put_many(Item(f"p{i:02}", {"score": i * 7 % 10}) for i in range(20))
+
+        with db.transaction(write=False) as tx:
+            scores = tx.shelf("scores")
+            by_score = lambda item: item.value["score"]  # noqa: E731
+            expected = {
+                (start, stop, reverse): list(
+                    scores.sort(key=by_score, reverse=reverse)
+                )[start:stop]
+                for start, stop in ((0, 3), (2, 5), (None, 0), (18, 40))
+                for reverse in (False, True)
+            }
+
+            def fail_sorted(*args, **kwargs):
+                raise AssertionError("expected a heap selection")
+
+            monkeypatch.setattr(spill_module, "sorted", fail_sorted, raising=False)
+            for (start, stop, reverse), items in expected.items():
+                query = scores.sort(key=by_score, reverse=reverse).slice(start, stop)
+                assert list(query) == items
+            assert [item.key for item in scores.sort(reverse=True).slice(0, 2)] == [
+                "p19",
+                "p18",
+            ]
+            with pytest.raises(AssertionError, match="heap"):
+                list(scores.sort(key=by_score).slice(0, 6, 2))
+
+
+def test_sort_past_its_buffer_merges_runs_spilled_to_disk(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+    runs = []
+    temporary_file = spill_module.tempfile.TemporaryFile
+    monkeypatch.setattr(
+        spill_module.tempfile,
+        "TemporaryFile",
+        lambda: runs.append(temporary_file()) or runs[-1],
+    )
+
+    with DB(str(db_path), sort_buffer=4) as db:
+        with db.transaction(write=True) as tx:
+            scores = tx.shelf("scores")
+            scores.put_many(Item(f"p{i:02}", {"score": i * 7 % 5}) for i in range(11))
+
+        with db.transaction(write=False, buffers=True) as tx:
+            scores = tx.shelf("scores")
+            by_score = lambda item: item.value["score"]  # noqa: E731
+            items = list(scores.items())
+            for reverse in (False, True):
+                expected = sorted(items, key=by_score, reverse=reverse)
+                assert list(scores.sort(by_score, reverse)) == expected
+            assert list(scores.sort(by="score", buffer=3)) == sorted(items, key=by_score)
+            # Equal scores keep key order across runs, like a stable sort.
+            assert [item.key for item in scores.sort(by_score)][:3] == [
+                "p00",
+                "p05",
+                "p10",
+            ]
+            assert len(runs) == 3 * 2 + 3
+            assert all(run.closed for run in runs)
+
+            assert list(scores.sort(by_score, buffer=11)) == sorted(items, key=by_score)
+            assert len(runs) == 9
+            with pytest.raises(ValueError, match="positive"):
+                scores.sort(buffer=0)
+
+
+def test_query_plans_skip_redundant_loads_and_sorts(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("users").put_many(Item(f"u{i}", {"id": i}) for i in range(6))
+
+        with db.transaction(write=False) as tx:
+            users = tx.shelf("users")
+            gets = []
+            get = ShelfStore.get
+            monkeypatch.setattr(
+                ShelfStore,
+                "get",
+                lambda self, key, *args: gets.append(key) or get(self, key, *args),
+            )
+            monkeypatch.setattr(spill_module, "sorted", None, raising=False)
+            even = lambda item: item.value["id"] % 2 == 0  # noqa: E731
+
+            assert users.items().keys().filter_keys(lambda key: key > "u3").count() == 2
+            assert users.items().filter(even).exists()
+            assert list(users.items().slice(4, 6)) == [
+                Item("u4", {"id": 4}),
+                Item("u5", {"id": 5}),
+            ]
+            assert gets == ["u4", "u5"]
+            assert [item.key for item in users.items().sort(reverse=True)] == [
+                f"u{i}" for i in range(5, -1, -1)
+            ]
+            assert [item.key for item in users.desc().filter(even).sort()] == [
+                "u0",
+                "u2",
+                "u4",
+            ]
+
+            assert users.items().sort(reverse=True).slice(1, 3).explain() == (
+                "scan desc all\nslice [1:3]\nload"
+            )
+            assert users.prefix("u1", "u4").desc().filter(even).keys().explain() == (
+                "scan desc [b'u4', b'u5') + [b'u1', b'u2') with values\n"
+                f"filter {even.__qualname__}\nkeys"
+            )
+            assert users.keys().filter(even).slice(0, 2).sort().explain() == (
+                f"scan asc all\nfilter+load {even.__qualname__}\nslice [0:2]"
+            )
+            assert users.filter(even).slice(0, 2).sort(reverse=True).explain() == (
+                f"scan asc all with values\nfilter {even.__qualname__}\nslice [0:2]\n"
+                "sort by key order reverse"
+            )
+            top = users.sort(key=even, reverse=True).slice(0, 2).keys()
+            assert top.explain() == (
+                f"scan asc all with values\ntop 2 by {even.__qualname__} reverse\nkeys"
+            )
+
+
+def test_aggregate_and_group_by_fold_the_selection_in_one_pass(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            orders = tx.shelf("orders")
+            orders.put_many(
+                [
+                    Item("o1", {"tenant": "acme", "total": 10, "meta": {"qty": 1}}),
+                    Item("o2", {"tenant": "beta", "total": 25}),
+                    Item("o3", {"tenant": "acme", "total": 5, "meta": {"qty": 4}}),
+                    Item("o4", {"tenant": "acme", "total": None}),
+                    Item("o5", {"total": 7}),
+                ]
+            )
+
+        with db.transaction(write=False, buffers=True) as tx:
+            orders = tx.shelf("orders")
+            assert orders.aggregate(
+                count=True, sum="total", min="total", max=["total", "meta.qty"]
+            ) == {
+                "count": 5,
+                "sum": 47,
+                "min": 5,
+                "max": {"total": 25, "meta.qty": 4},
+            }
+            assert orders.prefix("o1", "o3").aggregate(avg="total", count="meta.qty") == {
+                "avg": 7.5,
+                "count": 2,
+            }
+            assert orders.key("missing").aggregate(sum="total", avg="total") == {
+                "sum": 0,
+                "avg": None,
+            }
+            assert orders.group_by("tenant").agg(count=True, sum="total") == [
+                Group("acme", {"count": 3, "sum": 15}),
+                Group("beta", {"count": 1, "sum": 25}),
+                Group(None, {"count": 1, "sum": 7}),
+            ]
+            assert orders.filter(lambda item: item.value["total"]).group_by(
+                lambda item: item.key[-1] in "13"
+            ).agg(max="total") == [
+                Group(True, {"max": 10}),
+                Group(False, {"max": 25}),
+            ]
+            with pytest.raises(TypeError):
+                orders.aggregate()
+            with pytest.raises(ValueError, match="unknown aggregation"):
+                orders.aggregate(median="total")
+            with pytest.raises(ValueError, match="requires a field path"):
+                orders.aggregate(sum=True)
+            with pytest.raises(ValueError, match="requires a field path"):
+                orders.aggregate(count=False)
+
+
+def test_field_expressions_filter_and_pick_indexes(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("users").put_many(
+                Item(
+                    f"u{i}",
+                    {
+                        "name": "abcdef"[i],
+                        "age": 20 + i,
+                        "meta": {"tenant": "acme" if i % 2 else "beta"},
+                        "active": i != 3,
+                    },
+                )
+                for i in range(6)
+            )
+        db.create_index("users", "tenant", field="meta.tenant")
+        db.create_index("users", "tenant_name", field=("meta.tenant", "name"))
+
+        acme = (F("meta.tenant") == "acme") & F("active")
+        assert repr(acme) == "(F('meta.tenant') == 'acme') & F('active')"
+        assert repr(from_wire(acme.to_wire())) == repr(acme)
+        with pytest.raises(TypeError, match="combine field expressions"):
+            bool(F("age") > 1)
+        with pytest.raises(ValueError, match="invalid field expression"):
+            from_wire(["like", "name", "a%"])
+        with pytest.raises(TypeError, match="abstract"):
+            type("Like", (Expr,), {"to_wire": lambda self: []})()
+
+        with db.transaction(write=False) as tx:
+            users = tx.shelf("users")
+            assert [item.key for item in users.filter(acme)] == ["u1", "u5"]
+            assert [item.key for item in users.desc().filter(acme)] == ["u5", "u1"]
+            assert users.filter(acme).explain() == (
+                "index tenant scan asc [b'\\x03acme\\x00', b'\\x03acme\\x00\\xff') with values\n"
+                "filter (F('meta.tenant') == 'acme') & F('active')"
+            )
+            assert [item.key for item in users.filter(F("age") >= 23)] == ["u3", "u4", "u5"]
+            assert users.filter(F("age") >= 23).explain().startswith("scan asc all")
+            assert [
+                item.key
+                for item in users.filter(
+                    ~F("active") | F("name").isin(["a", "c"]) | (F("age") == 24)
+                )
+            ] == ["u0", "u2", "u3", "u4"]
+            assert users.filter(F("missing").exists() | (F("missing") != 1)).count() == 0
+
+            # Order-free actions also use range and prefix matches.
+            late = (F("meta.tenant") == "acme") & (F("name") >= "c")
+            assert users.filter(late).count() == 2
+            assert users.filter(late).aggregate(sum="age") == {"sum": 48}
+            assert users.filter(F("name") < "c").exists()
+
+        with db.transaction(write=True) as tx:
+            users = tx.shelf("users")
+            plan = users.filter(late)._compile(values=False, ordered=False)
+            assert plan.cursor.describe() == (
+                "index tenant_name scan asc [b'0\\x03acme\\x00\\x03c\\x00', "
+                "b'0\\x03acme\\x00\\xff')"
+            )
+            assert users.filter(late).delete(results=False) == MutationSummary(2, 2)
+            assert [item.key for item in users.index("tenant").eq("acme")] == ["u1"]
+
+
+def test_field_expressions_skip_indexes_missing_untested_fields(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("docs").put_many(
+                [
+                    Item("d1", {"tenant": "acme", "created": "2024-01"}),
+                    Item("d2", {"tenant": "acme"}),
+                    Item("d3", {"tenant": "beta", "created": "2024-02"}),
+                ]
+            )
+        db.create_index("docs", "tenant_created", field=("tenant", "created"))
+
+        with db.transaction(write=False) as tx:
+            docs = tx.shelf("docs")
+            acme = docs.filter(F("tenant") == "acme")
+            assert [item.key for item in acme] == ["d1", "d2"]
+            assert acme.count() == 2
+            assert acme.aggregate(count=True) == {"count": 2}
+            plan = acme._compile(values=False, ordered=False)
+            assert plan.cursor.describe() == "scan asc all"
+            # Testing every indexed field still uses the index.
+            recent = docs.filter((F("tenant") == "acme") & (F("created") >= "2024"))
+            assert [item.key for item in recent] == ["d1"]
+            assert recent.count() == 1
+            plan = recent._compile(values=False, ordered=False)
+            assert plan.cursor.describe().startswith("index tenant_created")
+
+
+def test_items_fields_project_values_and_read_covering_indexes(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("users").put_many(
+                [
+                    Item("alice", {"name": "Alice", "meta": {"tenant": "acme"}, "bio": "x" * 50}),
+                    Item("bob", {"name": "Bob", "bio": "y" * 50}),
+                ]
+            )
+        db.create_index("users", "by_name", field="name", include=("meta.tenant",))
+
+        with db.transaction(write=False, buffers=True) as tx:
+            users = tx.shelf("users")
+            assert list(users.items(fields=["name", "meta.tenant"])) == [
+                Item("alice", {"name": "Alice", "meta.tenant": "acme"}),
+                Item("bob", {"name": "Bob"}),
+            ]
+            assert list(users.filter(F("name") == "Bob").items(fields="bio")) == [
+                Item("bob", {"bio": "y" * 50})
+            ]
+
+            monkeypatch.setattr(ShelfStore, "get", None)
+            assert list(users.keys().items(fields=["name"]).keys()) == [
+                Item("alice", UNDEF),
+                Item("bob", UNDEF),
+            ]
+            covered = users.index("by_name").range("A").items(fields=["meta.tenant"])
+            assert list(covered) == [
+                Item("alice", {"meta.tenant": "acme"}),
+                Item("bob", {}),
+            ]
+            assert covered.explain().splitlines()[1:] == ["project meta.tenant from index"]
+
+
+def test_put_many_bulk_appends_sorted_input_and_can_skip_results(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            users = tx.shelf("users")
+            assert users.put_many(
+                [Item("alice", {"age": 30}), Item("bob", {"age": 25})],
+                bulk=True,
+            ) == [MutationResult("alice", True), MutationResult("bob", True)]
+            assert users.put_many(
+                [Item("dave", {"age": 35}), Item("carol", {"age": 20})],
+                bulk=True,
+                results=False,
+            ) == MutationSummary(total=2, ok=2)
+            assert users.put_many(
+                [Item("bob", {"age": 26}), Item("eve", {"age": 22})],
+                bulk=True,
+                results=False,
+            ) == MutationSummary(total=2, ok=2)
+
+        with db.transaction(write=False) as tx:
+            assert list(tx.shelf("users").items()) == [
+                Item("alice", {"age": 30}),
+                Item("bob", {"age": 26}),
+                Item("carol", {"age": 20}),
+                Item("dave", {"age": 35}),
+                Item("eve", {"age": 22}),
+            ]
+
+
+def test_range_update_and_delete_write_at_the_scan_cursor(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("logs").put_many(Item(f"log{i:02}", {"n": i}) for i in range(20))
+        db.create_index("logs", "n", field="n")
+
+        def no_point_writes(*args, **kwargs):
+            raise AssertionError("expected a cursor write")
+
+        monkeypatch.setattr(ShelfStore, "_put", no_point_writes)
+        monkeypatch.setattr(ShelfStore, "_delete", no_point_writes)
+        monkeypatch.setattr(ShelfStore, "get", no_point_writes)
+        with db.transaction(write=True) as tx:
+            logs = tx.shelf("logs")
+            assert logs.keys_range("log00", "log06").delete() == [
+                MutationResult(f"log{i:02}", True) for i in range(6)
+            ]
+            assert logs.desc().keys_range("log14").delete(results=False) == (
+                MutationSummary(total=6, ok=6)
+            )
+            assert logs.filter(lambda item: item.value["n"] % 2).update(
+                lambda item: {"n": item.value["n"] * 10}, results=False
+            ) == MutationSummary(total=4, ok=4)
+            assert logs.desc().slice(0, 2).delete() == [
+                MutationResult("log13", True),
+                MutationResult("log12", True),
+            ]
+        monkeypatch.undo()
+
+        with db.transaction(write=True) as tx:
+            logs = tx.shelf("logs")
+            # Reordered items fall back to point writes after the scan.
+            assert logs.sort(key=lambda item: -item.value["n"]).slice(0, 1).delete() == [
+                MutationResult("log11", True)
+            ]
+
+        with db.transaction(write=False) as tx:
+            logs = tx.shelf("logs")
+            assert list(logs.items()) == [
+                Item("log06", {"n": 6}),
+                Item("log07", {"n": 70}),
+                Item("log08", {"n": 8}),
+                Item("log09", {"n": 90}),
+                Item("log10", {"n": 10}),
+            ]
+            assert list(logs.index("n").range(9).keys()) == [
+                Item("log10", UNDEF),
+                Item("log07", UNDEF),
+                Item("log09", UNDEF),
+            ]
+
+
+def test_tracked_shelves_log_changes_in_the_writing_transaction(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        assert list(db.watch()) == []
+        db.track_changes("users")
+        with db.transaction(write=True) as tx:
+            users = tx.shelf("users")
+            users.put("alice", {"age": 30})
+            users.put_many([Item("bob", {"age": 25}), Item("carol", {"age": 20})])
+            users.put_many([Item("dave", {"age": 35})], bulk=True)
+            tx.shelf("logs").put("log0", {"n": 0})
+        with db.transaction(write=True) as tx:
+            users = tx.shelf("users")
+            users.key("eve").delete()
+            users.key("bob").delete()
+            users.keys_range("carol").update(lambda item: {"age": item.value["age"] + 1})
+        with pytest.raises(RuntimeError):
+            with db.transaction(write=True) as tx:
+                tx.shelf("users").put("frank", {"age": 40})
+                raise RuntimeError("abort")
+
+        assert list(db.watch()) == [
+            Change(1, "users", "alice", "put"),
+            Change(2, "users", "bob", "put"),
+            Change(3, "users", "carol", "put"),
+            Change(4, "users", "dave", "put"),
+            Change(5, "users", "bob", "delete"),
+            Change(6, "users", "carol", "put"),
+            Change(7, "users", "dave", "put"),
+        ]
+        assert [change.seq for change in db.watch(since=5, limit=1)] == [6]
+
+    with DB(str(db_path)) as db:
+        assert db.truncate_changes(7) == 6
+        assert [change.seq for change in db.watch()] == [7]
+        assert db.truncate_changes(100) == 1
+        assert list(db.watch()) == []
+        # Numbering continues past truncated records.
+        with db.transaction(write=True) as tx:
+            tx.shelf("users").put("alice", {"age": 31})
+        assert list(db.watch()) == [Change(8, "users", "alice", "put")]
+
+        db.track_changes("users", enabled=False)
+        with db.transaction(write=True) as tx:
+            tx.shelf("users").put("bob", {"age": 26})
+        assert [change.seq for change in db.watch()] == [8]
+
+
+def test_chunked_mutations_commit_per_chunk_and_resume(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("logs").put_many(Item(f"log{i:02}", {"n": i}) for i in range(25))
+
+        class Interrupted(Exception):
+            pass
+
+        reports = []
+
+        def stop_after_two_chunks(progress):
+            reports.append(progress)
+            if progress.chunks == 2:
+                raise Interrupted
+
+        with pytest.raises(Interrupted):
+            db.delete_chunked(
+                "logs",
+                lambda query: query.keys_range("log05").filter(
+                    lambda item: item.value["n"] % 2
+                ),
+                chunk_size=3,
+                progress=stop_after_two_chunks,
+            )
+        assert reports == [
+            ChunkProgress(chunks=1, total=3, ok=3, last_key="log09", done=False),
+            ChunkProgress(chunks=2, total=6, ok=6, last_key="log15", done=False),
+        ]
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("logs").count() == 19
+
+        # Restarting after the reported key finishes the run.
+        assert db.delete_chunked(
+            "logs",
+            lambda query: query.keys_range("log05").filter(
+                lambda item: item.value["n"] % 2
+            ),
+            chunk_size=3,
+            after=reports[-1].last_key,
+        ) == ChunkProgress(chunks=2, total=4, ok=4, last_key="log23", done=True)
+
+        assert db.update_chunked(
+            "logs",
+            lambda item: {"n": item.value["n"] + 100},
+            lambda query: query.desc(),
+            chunk_size=4,
+            max_chunks=2,
+        ) == ChunkProgress(chunks=2, total=8, ok=8, last_key="log10", done=False)
+        assert db.update_chunked(
+            "logs",
+            lambda item: {"n": item.value["n"] + 100},
+            lambda query: query.desc(),
+            chunk_size=4,
+            after="log10",
+        ) == ChunkProgress(chunks=2, total=7, ok=7, last_key="log00", done=True)
+
+        with db.transaction(write=False) as tx:
+            logs = tx.shelf("logs")
+            assert [item.value["n"] for item in logs.items()] == [
+                100, 101, 102, 103, 104, 106, 108, 110, 112, 114, 116, 118, 120,
+                122, 124,
+            ]
+
+        with pytest.raises(ValueError, match="slice"):
+            db.delete_chunked("logs", lambda query: query.slice(0, 2))
+        with pytest.raises(ValueError, match="chunk_size"):
+            db.delete_chunked("logs", chunk_size=0)
+
+
+def test_chunked_mutations_over_index_range_filters_resume_in_key_order(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            # Index order on "x" is the reverse of key order.
+            tx.shelf("w").put_many(
+                Item(f"k{i}", {"x": chr(ord("j") - i), "n": 0}) for i in range(10)
+            )
+        db.create_index("w", "x", field="x")
+
+        assert db.update_chunked(
+            "w",
+            lambda item: {**item.value, "n": item.value["n"] + 1},
+            lambda query: query.filter(F("x") >= "a"),
+            chunk_size=3,
+        ) == ChunkProgress(chunks=4, total=10, ok=10, last_key="k9", done=True)
+        with db.transaction(write=False) as tx:
+            assert [item.value["n"] for item in tx.shelf("w").items()] == [1] * 10
+
+        assert db.delete_chunked(
+            "w", lambda query: query.filter(F("x") >= "a"), chunk_size=3, max_chunks=1
+        ) == ChunkProgress(chunks=1, total=3, ok=3, last_key="k2", done=False)
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("w").count() == 7
+        assert db.delete_chunked(
+            "w", lambda query: query.filter(F("x") >= "a"), chunk_size=3, after="k2"
+        ) == ChunkProgress(chunks=3, total=7, ok=7, last_key="k9", done=True)
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("w").count() == 0
+
+        with db.transaction(write=True) as tx:
+            tx.shelf("w").put_many(Item(f"k{i}", {"x": "z"}) for i in range(5))
+        # An equality filter scans the index; chunks still bound the deletes.
+        assert db.delete_chunked(
+            "w", lambda query: query.filter(F("x") == "z"), chunk_size=2, max_chunks=1
+        ) == ChunkProgress(chunks=1, total=2, ok=2, last_key="k1", done=False)
+        with db.transaction(write=False) as tx:
+            assert [item.key for item in tx.shelf("w")] == ["k2", "k3", "k4"]
+
+
+def test_run_transaction_grows_full_map_and_retries(tmp_path):
+    db_path = tmp_path / "shelfdb"
+    documents = [Item(f"doc:{index:04d}", "x" * 512) for index in range(400)]
+
+    with DB(str(db_path), map_size=64 * 1024, max_map_size=4 * 1024 * 1024) as db:
+        result = db.run_transaction(
+            lambda tx: tx.shelf("docs").put_many(documents, results=False)
+        )
+        assert result == MutationSummary(total=400, ok=400)
+        assert db.map_size > 64 * 1024
+
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("docs").count() == 400
+
+
+def test_map_growth_waits_for_other_transactions_to_end(tmp_path):
+    db_path = tmp_path / "shelfdb"
+    documents = [Item(f"doc:{index:04d}", "x" * 512) for index in range(400)]
+
+    with DB(str(db_path), map_size=64 * 1024, max_map_size=4 * 1024 * 1024) as db:
+        started, release = threading.Event(), threading.Event()
+
+        def read():
+            with db.transaction(write=False):
+                started.set()
+                release.wait()
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        started.wait()
+        with pytest.raises(RuntimeError, match="other transactions are active"):
+            db.grow_map_size()
+        assert db.map_size == 64 * 1024
+
+        # Leaving a transaction neither waits nor masks the map-full error.
+        with pytest.raises(lmdb.MapFullError) as raised:  # type: ignore[attr-defined]
+            with db.transaction(write=True) as tx:
+                tx.shelf("docs").put_many(documents, results=False)
+        assert "map not grown" in raised.value.__notes__[0]
+        assert db.map_size == 64 * 1024
+
+        threading.Timer(0.1, release.set).start()
+        assert db.grow_map_size(timeout=10) == 128 * 1024
+        reader.join()
+
+        started.clear()
+        release.clear()
+        reader = threading.Thread(target=read)
+        reader.start()
+        started.wait()
+        # run_transaction() waits for the reader before growing the map.
+        threading.Timer(0.1, release.set).start()
+        result = db.run_transaction(
+            lambda tx: tx.shelf("docs").put_many(documents, results=False)
+        )
+        assert result == MutationSummary(total=400, ok=400)
+        reader.join()
+
+
+def test_full_map_without_growth_ceiling_still_fails(tmp_path):
+    db_path = tmp_path / "shelfdb"
+    documents = [Item(f"doc:{index:04d}", "x" * 512) for index in range(400)]
+
+    with DB(str(db_path), map_size=64 * 1024) as db:
+        with pytest.raises(lmdb.MapFullError):  # type: ignore[attr-defined]
+            db.run_transaction(lambda tx: tx.shelf("docs").put_many(documents))
+        assert db.map_size == 64 * 1024
+
+
+@pytest.mark.parametrize("profile", ["safe", "fast-commit", "bulk", "random-read"])
+def test_db_profiles_round_trip_data(tmp_path, profile):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path), profile=profile) as db:
+        assert db.profile == PROFILES[profile]
+        with db.transaction(write=True) as tx:
+            _seed_users(tx.shelf("users"))
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("users").count() == 4
+
+
+def test_db_rejects_unknown_profile(tmp_path):
+    with pytest.raises(ValueError, match="unknown database profile"):
+        DB(str(tmp_path / "shelfdb"), profile="turbo")
+
+
+def test_shelf_handles_are_cached_after_commit_or_open_shelves(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            _seed_users(tx.shelf("users"))
+
+    with DB(str(db_path)) as db:
+        db.open_shelves()
+        db.open_shelves(["posts"])
+
+        with db.transaction(write=True) as tx:
+            tx.shelf("tags").put("python", {"count": 1})
+
+        opened = []
+        open_db = db.lmdb_env.open_db
+
+        def counting_open_db(*args, **kwargs):
+            opened.append(args[0])
+            return open_db(*args, **kwargs)
+
+        monkeypatch.setattr(db, "lmdb_env", _EnvProxy(db.lmdb_env, counting_open_db))
+
+        for _ in range(3):
+            with db.transaction(write=False) as tx:
+                assert tx.shelf("users").count() == 4
+                assert tx.shelf("posts").count() == 0
+                assert tx.shelf("tags").key("python").item() == Item(
+                    "python", {"count": 1}
+                )
+
+        assert opened == []
+
+
+class _EnvProxy:
+    def __init__(self, env, open_db):
+        self._env = env
+        self.open_db = open_db
+
+    def __getattr__(self, name):
+        return getattr(self._env, name)
+
+
+def test_count_uses_btree_stats_only_for_unfiltered_whole_shelf(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            _seed_users(tx.shelf("users"))
+
+        with db.transaction(write=False) as tx:
+            users = tx.shelf("users")
+            assert users.keys_range("bob", "d").count() == 2
+            assert users.filter(lambda item: item.value["age"] > 25).count() == 2
+            assert users.slice(1, 2).count() == 1
+            assert users.key("missing").count() == 0
+
+            def fail_keys(self):
+                raise AssertionError("unexpected key scan")
+
+            monkeypatch.setattr(ShelfCursor, "keys", fail_keys)
+
+            assert users.count() == 4
+            assert users.desc().items().keys().count() == 4
+            assert users.sort(reverse=True).count() == 4
+
+
+def test_buffers_transaction_decodes_values_lazily(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            _seed_users(tx.shelf("users"))
+
+        with pytest.raises(ValueError):
+            db.transaction(write=True, buffers=True)
+
+        with db.transaction(write=False, buffers=True) as tx:
+            users = tx.shelf("users")
+            seen = []
+
+            def fn(item):
+                seen.append(item.value)
+                return item.key >= "c"
+
+            result = list(users.filter(fn))
+            assert result == [
+                Item("carol", {"age": 20, "role": "user"}),
+                Item("dave", {"age": 35, "role": "admin"}),
+            ]
+            assert all(isinstance(value, LazyValue) for value in seen)
+            assert all(type(item.value) is dict for item in result)
+            assert users.key("alice").item() == Item("alice", {"age": 30, "role": "admin"})
+            assert list(
+                users.filter(lambda item: item.value["role"] == "admin")
+                .sort(key=lambda item: item.value["age"])
+                .keys()
+            ) == [Item("alice", UNDEF), Item("dave", UNDEF)]
+
+
+def test_secondary_index_is_backfilled_and_maintained(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            _seed_users(tx.shelf("users"))
+            tx.shelf("users").put("erin", {"role": "guest"})
+
+        db.create_index("users", "age", field="age")
+        db.create_index("users", "role", key=lambda value: value["role"])
+        with pytest.raises(ValueError):
+            db.create_index("users", "bad")
+
+        with db.transaction(write=True) as tx:
+            users = tx.shelf("users")
+            users.put("frank", {"age": 25, "role": "user"})
+            users.key("alice").update(lambda item: {**item.value, "age": 40})
+            users.key("carol").delete()
+
+        with db.transaction(write=False) as tx:
+            users = tx.shelf("users")
+            assert list(users.index("age").eq(25).items()) == [
+                Item("bob", {"age": 25, "role": "user"}),
+                Item("frank", {"age": 25, "role": "user"}),
+            ]
+            assert list(users.index("age").range(30).keys()) == [
+                Item("dave", UNDEF),
+                Item("alice", UNDEF),
+            ]
+            assert list(users.desc().index("age").range(stop=40).keys()) == [
+                Item("dave", UNDEF),
+                Item("frank", UNDEF),
+                Item("bob", UNDEF),
+            ]
+            assert users.index("role").eq("admin").count() == 2
+            assert users.index("role").eq("guest").item() == Item("erin", {"role": "guest"})
+            with pytest.raises(ValueError, match="unknown index"):
+                users.index("missing")
+
+    with DB(str(db_path)) as db:
+        # Field indexes are loaded again on open; key callables are not.
+        with db.transaction(write=True) as tx:
+            tx.shelf("users").put("gina", {"age": 25})
+        with db.transaction(write=False) as tx:
+            users = tx.shelf("users")
+            assert users.index("age").eq(25).count() == 3
+            with pytest.raises(ValueError):
+                users.index("role")
+        db.open_shelves()
+        assert set(db._shelf_dbs) == {"users"}
+
+
+def test_composite_covering_index_scans_prefix_range_without_sorting(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            orders = tx.shelf("orders")
+            for i in range(6):
+                orders.put(
+                    f"o{i}",
+                    {"tenant": "acme" if i % 2 else "beta", "created": i, "total": i * 10},
+                )
+
+        db.create_index(
+            "orders", "tenant_created", field=("tenant", "created"), include=("total",)
+        )
+        with db.transaction(write=True) as tx:
+            tx.shelf("orders").key("o3").update(
+                lambda item: {**item.value, "total": 99}
+            )
+
+        with db.transaction(write=False) as tx:
+            orders = tx.shelf("orders")
+            # Covered index scans read neither shelf values nor sort in memory.
+            monkeypatch.setattr(ShelfStore, "get", None)
+            monkeypatch.setattr(spill_module, "sorted", None, raising=False)
+
+            latest = (
+                orders.index("tenant_created", covered=True)
+                .range(prefix=("acme",))
+                .sort(by="created", reverse=True)
+                .slice(0, 2)
+            )
+            assert list(latest) == [
+                Item("o5", {"total": 50}),
+                Item("o3", {"total": 99}),
+            ]
+            assert list(
+                orders.index("tenant_created").range(1, 5, prefix=("acme",)).keys()
+            ) == [Item("o1", UNDEF), Item("o3", UNDEF)]
+            assert list(
+                orders.index("tenant_created").eq(("beta", 2)).keys()
+            ) == [Item("o2", UNDEF)]
+            beta = orders.index("tenant_created", covered=True).range(prefix=("beta",))
+            by_tenant = beta.filter(lambda item: item.value["total"] > 0).sort(
+                by=("tenant", "created")
+            )
+            assert list(by_tenant) == [
+                Item("o2", {"total": 20}),
+                Item("o4", {"total": 40}),
+            ]
+
+        monkeypatch.undo()
+        with db.transaction(write=False) as tx:
+            orders = tx.shelf("orders")
+            assert list(orders.sort(by=("tenant", "created"), reverse=True).keys()) == [
+                Item("o4", UNDEF),
+                Item("o2", UNDEF),
+                Item("o0", UNDEF),
+                Item("o5", UNDEF),
+                Item("o3", UNDEF),
+                Item("o1", UNDEF),
+            ]
+
+
+def test_typed_keys_keep_natural_order(tmp_path):
+    db_path = tmp_path / "shelfdb"
+    created = datetime(2024, 5, 1, 12, 30, tzinfo=UTC)
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            events = tx.shelf("events")
+            for event_id in (10, 9, -1, 100, 0):
+                events.put(event_id, {"id": event_id})
+            events.put(created, {"at": "noon"})
+            events.put(("acme", 2), {"n": 2})
+            events.put("legacy", {"n": 0})
+            events.put_many([Item(7, {"id": 7}), Item(8, {"id": 8})], bulk=True)
+
+        with db.transaction(write=False) as tx:
+            events = tx.shelf("events")
+            assert list(events.keys_range(0, 11).keys()) == [
+                Item(0, UNDEF),
+                Item(7, UNDEF),
+                Item(8, UNDEF),
+                Item(9, UNDEF),
+                Item(10, UNDEF),
+            ]
+            assert [item.key for item in events.desc().keys_range(-5, 9)] == [8, 7, 0, -1]
+            assert events.key(created).item() == Item(created, {"at": "noon"})
+            assert events.key(("acme", 2)).item() == Item(("acme", 2), {"n": 2})
+            assert [item.key for item in events][:2] == ["legacy", -1]
+            assert [item.key for item in events.sort(reverse=True)][-2:] == [-1, "legacy"]
+
+
+def test_int_and_float_keys_sort_and_match_by_value(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            points = tx.shelf("points")
+            for key in (2, 1.5, 1, -0.5, 2**63 + 1, float(2**63)):
+                points.put(key, {"at": key})
+            points.put(("a", 1), {"n": 1})
+            points.put(("a", 1.5, "x"), {"n": 2})
+            points.put(("a", 2.0, "y"), {"n": 3})
+
+        with db.transaction(write=False) as tx:
+            points = tx.shelf("points")
+            assert [item.key for item in points.keys_range(1, 2)] == [1, 1.5]
+            assert [item.key for item in points.keys_range(-1, 2**63 + 2)] == [
+                -0.5,
+                1,
+                1.5,
+                2,
+                2**63,
+                2**63 + 1,
+            ]
+            assert points.key(2.0).item() == Item(2, {"at": 2})
+            assert [item.key for item in points.prefix(("a", 1.0))] == [("a", 1)]
+            assert [item.key for item in points.prefix(("a", 2))] == [("a", 2, "y")]
+
+        with db.transaction(write=True) as tx:
+            assert tx.shelf("points").put(1.0, {"at": "one"}) == MutationResult(1.0, True)
+            assert tx.shelf("points").key(1).item() == Item(1, {"at": "one"})
+
+
+def test_int_and_float_fields_index_and_sort_by_value(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("products").put_many(
+                [
+                    Item("p1", {"price": 10}),
+                    Item("p2", {"price": 12}),
+                    Item("p3", {"price": 10.5}),
+                    Item("p4", {"price": 4.0}),
+                ]
+            )
+        db.create_index("products", "price", field="price")
+
+        with db.transaction(write=False) as tx:
+            products = tx.shelf("products")
+            assert [item.key for item in products.index("price").range(5, 20)] == [
+                "p1",
+                "p3",
+                "p2",
+            ]
+            assert [item.key for item in products.index("price").eq(10.0)] == ["p1"]
+            assert [item.key for item in products.index("price").eq(4)] == ["p4"]
+            assert [item.value["price"] for item in products.sort(by="price")] == [
+                4.0,
+                10,
+                10.5,
+                12,
+            ]
+            assert [
+                item.key for item in products.filter((F("price") > 10) & (F("price") < 12.5))
+            ] == ["p2", "p3"]
+            assert products.filter(F("price") == 10.0).count() == 1
+
+
+def test_str_field_indexes_over_typed_keys(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            orders = tx.shelf("orders")
+            orders.put(1, {"tag": "x"})
+            orders.put(2, {"tag": "y"})
+            orders.put((b"a\x00", 3), {"tag": "x"})
+            orders.put(b"k", {"tag": b"x\x00"})
+        db.create_index("orders", "tag", field="tag")
+
+        with db.transaction(write=False) as tx:
+            orders = tx.shelf("orders")
+            assert [item.key for item in orders.filter(F("tag") == "x")] == [
+                1,
+                (b"a\x00", 3),
+            ]
+            assert [item.key for item in orders.index("tag").range("x", "z")] == [
+                1,
+                (b"a\x00", 3),
+                2,
+            ]
+            assert [item.key for item in orders.index("tag").eq(b"x\x00")] == [b"k"]
+
+
+def test_index_ranges_exclude_values_continuing_past_a_null(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("users").put_many(
+                [
+                    Item("u1", {"name": "a", "team": "x"}),
+                    Item("u2", {"name": "a\x00b", "team": "x"}),
+                    Item("u3", {"name": "a\x00", "team": "x"}),
+                    Item("u4", {"name": "b", "team": "x"}),
+                ]
+            )
+        db.create_index("users", "name", field="name")
+        db.create_index("users", "team_name", field=("team", "name"))
+
+        with db.transaction(write=False) as tx:
+            users = tx.shelf("users")
+            assert [item.key for item in users.index("name").eq("a")] == ["u1"]
+            assert [item.key for item in users.index("name").eq("a\x00")] == ["u3"]
+            team_name = users.index("team_name")
+            assert [item.key for item in team_name.eq(("x", "a"))] == ["u1"]
+            assert [item.key for item in team_name.range(stop="b", prefix=("x",))] == [
+                "u1",
+                "u3",
+                "u2",
+            ]
+            assert [item.key for item in users.filter(F("name") == "a")] == ["u1"]
+            assert users.filter(F("name") <= "a").count() == 1
+            assert users.filter(F("name") <= "a\x00").count() == 2
+
+
+def test_prefix_scans_merge_several_prefixes_in_key_order(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            keys = tx.shelf("keys")
+            for key in (
+                "tenant:acme:user:1",
+                "tenant:acme:user:2",
+                "tenant:acmf:user:1",
+                "tenant:beta:user:1",
+                "tenant:zeta:user:1",
+                "\U0010ffff",
+                "\U0010ffff:a",
+                ("acme", 1),
+                ("acme", 2),
+                ("beta", 1),
+                ("acme\x00b", 1),
+                b"a\x00b",
+                b"ab",
+            ):
+                keys.put(key, True)
+
+        with db.transaction(write=False) as tx:
+            keys = tx.shelf("keys")
+            assert [item.key for item in keys.prefix("tenant:acme:")] == [
+                "tenant:acme:user:1",
+                "tenant:acme:user:2",
+            ]
+            # 0xff-heavy UTF-8 prefixes still end at the last matching key.
+            assert keys.prefix("\U0010ffff").count() == 2
+            assert [item.key for item in keys.prefix(("acme",))] == [("acme", 1), ("acme", 2)]
+            assert [item.key for item in keys.prefix(b"a\x00")] == [b"a\x00b"]
+            assert keys.prefix("").count() == 7
+            merged = keys.prefix("tenant:zeta", "tenant:acme", "tenant:acme:user:2")
+            assert [item.key for item in merged] == [
+                "tenant:acme:user:1",
+                "tenant:acme:user:2",
+                "tenant:zeta:user:1",
+            ]
+            assert list(keys.desc().prefix("tenant:zeta", "tenant:acme").keys()) == [
+                Item("tenant:zeta:user:1", UNDEF),
+                Item("tenant:acme:user:2", UNDEF),
+                Item("tenant:acme:user:1", UNDEF),
+            ]
+            assert keys.prefix("tenant:zeta", "tenant:acme").key(("beta", 1)).exists()
+            with pytest.raises(TypeError):
+                keys.prefix(1)  # type: ignore[arg-type]
+
+        with db.transaction(write=True) as tx:
+            keys = tx.shelf("keys")
+            assert keys.prefix("tenant:acm", "tenant:zeta").delete(results=False) == (
+                MutationSummary(total=4, ok=4)
+            )
+        assert db.delete_chunked(
+            "keys",
+            lambda query: query.desc().prefix("\U0010ffff", ("acme",)),
+            chunk_size=3,
+        ) == ChunkProgress(chunks=2, total=4, ok=4, last_key="\U0010ffff", done=True)
+        with db.transaction(write=False) as tx:
+            assert [item.key for item in tx.shelf("keys")] == [
+                "tenant:beta:user:1",
+                b"a\x00b",
+                b"ab",
+                ("acme\x00b", 1),
+                ("beta", 1),
+            ]
+
+
+def test_page_tokens_seek_past_the_last_key(tmp_path, monkeypatch):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("posts").put_many(Item(f"post{i}", {"n": i}) for i in range(1, 9))
+
+        with db.transaction(write=True) as tx:
+            posts = tx.shelf("posts").keys_range("post2")
+            first = posts.page(3)
+            assert [item.key for item in first.items] == ["post2", "post3", "post4"]
+            # Writes before the token position do not shift the next page.
+            tx.shelf("posts").put("post20", {"n": 20})
+
+            steps = []
+            advance = ShelfCursor._advance_cursor
+            monkeypatch.setattr(
+                ShelfCursor,
+                "_advance_cursor",
+                lambda scan, cur: steps.append(1) or advance(scan, cur),
+            )
+            second = posts.page(3, after=first.token)
+            monkeypatch.undo()
+            assert [item.key for item in second.items] == ["post5", "post6", "post7"]
+            # The scan starts at post5 and reads one item past the page.
+            assert len(steps) == 3
+            last = posts.page(3, after=second.token)
+            assert last == Page([Item("post8", UNDEF)], None)
+
+            evens = posts.desc().items().filter(lambda item: item.value["n"] % 2 == 0)
+            page = evens.page(2)
+            assert [item.key for item in page.items] == ["post8", "post6"]
+            page = evens.page(2, after=page.token)
+            assert page.items == [Item("post4", {"n": 4}), Item("post20", {"n": 20})]
+            assert evens.page(2, after=page.token) == Page([Item("post2", {"n": 2})], None)
+
+            with pytest.raises(ValueError, match="different selection"):
+                posts.desc().page(2, after=first.token)
+            with pytest.raises(ValueError, match="different selection"):
+                tx.shelf("posts").page(2, after=first.token)
+            with pytest.raises(ValueError, match="invalid page token"):
+                posts.page(2, after="not a token")
+            with pytest.raises(ValueError, match="slice"):
+                posts.slice(0, 4).page(2)
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_shelf_codec_compresses_new_values_and_reads_mixed_data(tmp_path, codec):
+    db_path = tmp_path / "shelfdb"
+    document = {"meta": {"tenant": "acme"}, "history": ["created"] * 50}
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("docs").put("plain", document)
+        with pytest.raises(ValueError, match="unknown value codec"):
+            db.set_codec("docs", "snappy")
+        db.set_codec("docs", codec)
+        with db.transaction(write=True) as tx:
+            docs = tx.shelf("docs")
+            docs.put("packed", document)
+            docs.put("tiny", 1)
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("docs").put_many([Item("bulk", document)], bulk=True)
+
+        with db.transaction(write=False) as tx:
+            raw = tx.tx.get(b"packed", db=db.lmdb_env.open_db(b"docs", txn=tx.tx))
+            assert raw[0] == 0xC1
+            assert len(raw) < len(msgpack.packb(document))
+            assert list(tx.shelf("docs").items()) == [
+                Item("bulk", document),
+                Item("packed", document),
+                Item("plain", document),
+                Item("tiny", 1),
+            ]
+
+        with db.transaction(write=False, buffers=True) as tx:
+            docs = tx.shelf("docs")
+            assert list(docs.filter(lambda item: item.value == 1).keys()) == [
+                Item("tiny", UNDEF)
+            ]
+
+
+def test_shelf_values_keep_common_python_types(tmp_path):
+    db_path = tmp_path / "shelfdb"
+    value = {
+        "created": datetime(2024, 5, 1, 12, 30, tzinfo=UTC),
+        "day": date(2024, 5, 1),
+        "id": UUID("12345678-1234-5678-1234-567812345678"),
+        "total": Decimal("19.90"),
+        "tags": {"new", "sale"},
+    }
+
+    with DB(str(db_path)) as db:
+        db.set_codec("orders", "zlib")
+        with db.transaction(write=True) as tx:
+            tx.shelf("orders").put("o1", value)
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("orders").key("o1").item() == Item("o1", value)
+
+
+def test_cached_columns_vectorize_filters_and_aggregates(tmp_path):
+    pytest.importorskip("numpy")
+    db_path = tmp_path / "shelfdb"
+    products = [
+        Item("p1", {"price": 120, "stock": 3, "tag": "a", "rating": 4.5}),
+        Item("p2", {"price": 80, "stock": 0, "tag": "b"}),
+        Item("p3", {"price": 150.5, "tag": ["x"], "rating": None}),
+        Item("p4", {"price": None, "stock": 7, "tag": "a", "rating": 3}),
+        Item("p5", {"stock": 1, "tag": 5, "rating": 2.5}),
+    ]
+    queries = [
+        F("price") > 100,
+        (F("price") <= 120) & F("stock"),
+        (F("tag") == "a") | ~F("rating").exists(),
+        F("tag").isin(["b", 5]),
+        F("tag") >= "a",
+        F("price") == None,  # noqa: E711
+    ]
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("products").put_many(products)
+        with db.transaction(write=False) as tx:
+            shelf = tx.shelf("products")
+            expected = [list(shelf.filter(expr).keys()) for expr in queries]
+            totals = shelf.filter(F("stock") > 0).aggregate(
+                count=True, sum=["price", "stock"], avg="rating", min="price"
+            )
+
+        db.cache_columns("products", ["price", "stock", "tag", "rating"])
+        with db.transaction(write=False) as tx:
+            shelf = tx.shelf("products")
+            assert [list(shelf.filter(expr).keys()) for expr in queries] == expected
+            query = shelf.desc().filter(F("price") > 100).items()
+            assert query.explain() == (
+                "columns scan desc all where F('price') > 100 with values"
+            )
+            assert list(query) == [products[2], products[0]]
+            assert shelf.prefix("p4", "p5").filter(F("stock") > 0).count() == 2
+            assert [
+                item.key
+                for item in shelf.prefix("p1", "p4", "p5").desc().filter(F("stock") > 0)
+            ] == ["p5", "p4", "p1"]
+            # Selectors after a vectorized filter narrow the scan it runs over.
+            in_stock = shelf.filter(F("stock") > 0)
+            assert [item.key for item in in_stock.keys_range("p2")] == ["p4", "p5"]
+            assert in_stock.key("p1").count() == 1
+            first = in_stock.page(2)
+            assert [item.key for item in first.items] == ["p1", "p4"]
+            assert [item.key for item in in_stock.page(2, first.token).items] == ["p5"]
+            assert (
+                shelf.filter(F("stock") > 0).aggregate(
+                    count=True, sum=["price", "stock"], avg="rating", min="price"
+                )
+                == totals
+            )
+
+        with db.transaction(write=True) as tx:
+            shelf = tx.shelf("products")
+            assert shelf.filter(F("price") > 100).explain().startswith("scan")
+            shelf.put("p6", {"price": 500, "stock": 1})
+        with db.transaction(write=False) as tx:
+            shelf = tx.shelf("products")
+            assert [item.key for item in shelf.filter(F("price") > 130)] == ["p3", "p6"]
+            assert shelf.aggregate(max="price", sum="stock") == {"max": 500, "sum": 12}
+
+        db.cache_columns("products", [])
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("products").filter(F("price") > 1).explain().startswith(
+                "scan"
+            )
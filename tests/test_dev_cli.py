@@ -208,3 +208,51 @@ def test_docs_publish_mode_supports_custom_target_options(monkeypatch):
         "cwd": cli.repo_root(),
         "check": True,
     }
+
+
+def test_benchmark_renders_one_shelfdb_row_per_profile_and_codec(monkeypatch):
+    settings = cli.BenchmarkSettings(
+        backends=("shelfdb", "sqlite"),
+        sizes=(10,),
+        repeats=1,
+        warmup=0,
+        markdown="benchmark.md",
+        sample_size=5,
+        workers=1,
+        profiles=("safe", "bulk"),
+        codecs=("msgpack", "zlib"),
+    )
+    results = [
+        cli.run_benchmark_case(
+            cli.BenchmarkCaseSpec(
+                backend=backend,
+                operation="point_lookup",
+                size=10,
+                repeats=1,
+                warmup=0,
+                sample_size=5,
+                profile=profile,
+                codec=codec,
+            )
+        )
+        for backend, profile, codec in cli.benchmark_variants(settings)
+    ]
+
+    markdown = cli.render_benchmark_markdown(settings=settings, results=results)
+
+    assert [(result.profile, result.codec) for result in results] == [
+        ("safe", "msgpack"),
+        ("safe", "zlib"),
+        ("bulk", "msgpack"),
+        ("bulk", "zlib"),
+        ("safe", "msgpack"),
+    ]
+    assert "- ShelfDB profiles: safe, bulk" in markdown
+    assert "- ShelfDB value codecs: msgpack, zlib" in markdown
+    assert "| shelfdb | - |" in markdown
+    assert "| shelfdb (zlib) | - |" in markdown
+    assert "| shelfdb (bulk) | - |" in markdown
+    assert "| shelfdb (bulk, zlib) | - |" in markdown
+    assert "| sqlite | - |" in markdown
+    assert "| Size on disk |" in markdown
+    assert markdown.count(" MiB |") == 5
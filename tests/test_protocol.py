@@ -1,5 +1,8 @@
 import asyncio
 from asyncio import StreamReader
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
 
 from shelfdb.protocol import (
     MAX_FRAME_SIZE,
@@ -46,6 +49,25 @@ def test_response_uses_msgpack_round_trip():
     assert decode_response(encode_response(response)) == response
 
 
+def test_response_round_trips_common_python_values():
+    value = {
+        "at": datetime(2024, 5, 1, 12, 30, 0, 250),
+        "aware": datetime(2024, 5, 1, 12, 30, tzinfo=timezone(timedelta(hours=7))),
+        "day": date(2024, 5, 1),
+        "id": UUID("12345678-1234-5678-1234-567812345678"),
+        "price": Decimal("19.90"),
+        "tags": {"a", ("b", 1)},
+        "frozen": frozenset({1, 2}),
+    }
+
+    decoded = decode_response(encode_response({"ok": True, "result": value}))
+
+    assert decoded["result"] == value
+    assert {key: type(item) for key, item in decoded["result"].items()} == {
+        key: type(item) for key, item in value.items()
+    }
+
+
 def test_write_and_read_request_round_trip():
     async def run_round_trip():
         writer = DummyWriter()
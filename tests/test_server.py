@@ -1,8 +1,9 @@
 import asyncio
+import time
 from pathlib import Path
 
 from shelfdb.protocol import read_response, serve, serve_unix, write_request
-from shelfdb.shelf import DB
+from shelfdb.shelf import DB, Item
 
 
 async def _exchange(host: str, port: int, commands: list[dict]) -> list[dict]:
@@ -240,3 +241,67 @@ def test_server_handles_write_then_read_over_unix_socket(tmp_path):
         {"ok": True, "result": {"rolled_back": True}},
     ]
     assert Path(socket_path).exists() is False
+
+
+def _slow_negate(item):
+    time.sleep(0.02)
+    return {"n": -item.value["n"]}
+
+
+def test_server_serves_other_clients_during_chunked_mutations(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    async def run():
+        with DB(str(db_path)) as db:
+            with db.transaction(write=True) as tx:
+                tx.shelf("logs").put_many(
+                    Item(f"log{i:02}", {"n": i}) for i in range(20)
+                )
+            server = await serve(db, host="127.0.0.1", port=0)
+            host, port = server.sockets[0].getsockname()[:2]
+
+            try:
+                job = asyncio.create_task(
+                    _exchange(
+                        host,
+                        port,
+                        [
+                            {
+                                "cmd": "query",
+                                "shelf": "logs",
+                                "ops": [],
+                                "action": {
+                                    "op": "update",
+                                    "args": [_slow_negate],
+                                    "kwargs": {"chunk_size": 2},
+                                },
+                            }
+                        ],
+                    )
+                )
+                await asyncio.sleep(0.05)
+                read_responses = await _exchange(
+                    host,
+                    port,
+                    [
+                        {"cmd": "begin", "mode": "read"},
+                        {"cmd": "get", "shelf": "logs", "key": "log19"},
+                        {"cmd": "commit"},
+                    ],
+                )
+                assert not job.done()
+                assert read_responses[1] == {
+                    "ok": True,
+                    "result": {"key": "log19", "value": {"n": 19}},
+                }
+                (progress,) = await job
+                assert progress["ok"] is True
+                assert progress["result"]["total"] == 20
+            finally:
+                server.close()
+                await server.wait_closed()
+
+            with db.transaction(write=False) as tx:
+                assert tx.shelf("logs").key("log19").item() == Item("log19", {"n": -19})
+
+    asyncio.run(run())
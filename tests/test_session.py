@@ -98,6 +98,47 @@ def test_session_rejects_commands_without_active_transaction(tmp_path):
         }
 
 
+def test_session_reports_malformed_query_commands(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        session = Session(db)
+        malformed = [
+            {"cmd": "query", "shelf": "note"},
+            {"cmd": "query", "shelf": "note", "action": "delete"},
+            {"cmd": "query", "shelf": "note", "action": {"op": "delete", "kwargs": 2}},
+        ]
+        for command in malformed:
+            assert session.handle(command) == {
+                "ok": False,
+                "error": "no active transaction",
+            }
+        session.handle({"cmd": "begin", "mode": "write"})
+        for command in malformed:
+            assert session.handle(command)["ok"] is False
+        session.close()
+
+
+def test_session_watch_validates_limit(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        db.track_changes("note")
+        with db.transaction(write=True) as tx:
+            tx.shelf("note").put("a", 1)
+            tx.shelf("note").put("b", 2)
+
+        session = Session(db)
+        result = session.handle({"cmd": "watch", "limit": 1})
+        assert result["ok"] is True
+        assert len(result["result"]) == 1
+        for limit in ("10", -1, 1.5, True):
+            assert session.handle({"cmd": "watch", "limit": limit}) == {
+                "ok": False,
+                "error": "watch limit must be a non-negative integer",
+            }
+
+
 def test_session_close_rolls_back_uncommitted_write(tmp_path):
     db_path = tmp_path / "shelfdb"
 
@@ -250,3 +291,114 @@ def test_session_query_supports_write_actions(tmp_path):
             users = tx.shelf("users")
             assert users.key("alice").item() == Item("alice", {"age": 31})
             assert users.key("bob").exists() is False
+
+
+def test_session_query_put_many_can_return_summary(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        session = Session(db)
+        session.handle({"cmd": "begin", "mode": "write"})
+
+        result = session.handle(
+            {
+                "cmd": "query",
+                "shelf": "users",
+                "ops": [],
+                "action": {
+                    "op": "put_many",
+                    "args": [[Item("alice", {"age": 30}), Item("bob", {"age": 25})]],
+                    "kwargs": {"bulk": True, "results": False},
+                },
+            }
+        )
+        assert result == {
+            "ok": True,
+            "result": {"__shelfdb_type__": "summary", "total": 2, "ok": 2},
+        }
+        session.close()
+
+
+def test_session_replays_write_transaction_after_map_growth(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path), map_size=64 * 1024, max_map_size=4 * 1024 * 1024) as db:
+        session = Session(db)
+        session.handle({"cmd": "begin", "mode": "write"})
+        assert session.handle(
+            {"cmd": "put", "shelf": "note", "key": "first", "value": "hello"}
+        ) == {"ok": True, "result": {"key": "first", "ok": True}}
+
+        result = session.handle(
+            {
+                "cmd": "query",
+                "shelf": "note",
+                "ops": [],
+                "action": {
+                    "op": "put_many",
+                    "args": [[Item(f"doc:{index:04d}", "x" * 512) for index in range(400)]],
+                    "kwargs": {"results": False},
+                },
+            }
+        )
+        assert result["ok"] is True
+        assert result["result"] == {"__shelfdb_type__": "summary", "total": 400, "ok": 400}
+        assert result["retry"]["map_size"] > 64 * 1024
+        assert session.handle({"cmd": "commit"})["ok"] is True
+
+        with db.transaction(write=False) as tx:
+            assert tx.shelf("note").key("first").item() == Item("first", "hello")
+            assert tx.shelf("note").count() == 401
+
+
+def test_session_fails_map_growth_while_other_sessions_are_active(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path), map_size=64 * 1024, max_map_size=4 * 1024 * 1024) as db:
+        reader = Session(db)
+        reader.handle({"cmd": "begin", "mode": "read"})
+        writer = Session(db)
+        writer.handle({"cmd": "begin", "mode": "write"})
+
+        result = writer.handle(
+            {
+                "cmd": "query",
+                "shelf": "note",
+                "ops": [],
+                "action": {
+                    "op": "put_many",
+                    "args": [[Item(f"doc:{index:04d}", "x" * 512) for index in range(400)]],
+                    "kwargs": {"results": False},
+                },
+            }
+        )
+        assert result == {
+            "ok": False,
+            "error": "cannot grow the memory map while other transactions are active",
+        }
+        assert writer.active is False
+        assert db.map_size == 64 * 1024
+        reader.close()
+
+
+def test_session_read_transaction_can_use_buffers(tmp_path):
+    db_path = tmp_path / "shelfdb"
+
+    with DB(str(db_path)) as db:
+        with db.transaction(write=True) as tx:
+            tx.shelf("note").put("a", {"name": "hello"})
+
+        session = Session(db)
+        assert session.handle({"cmd": "begin", "mode": "write", "buffers": True}) == {
+            "ok": False,
+            "error": "buffers require a read transaction",
+        }
+        assert session.handle({"cmd": "begin", "mode": "read", "buffers": True}) == {
+            "ok": True,
+            "result": {"mode": "read"},
+        }
+        assert session.handle({"cmd": "get", "shelf": "note", "key": "a"}) == {
+            "ok": True,
+            "result": {"key": "a", "value": {"name": "hello"}},
+        }
+        session.close()